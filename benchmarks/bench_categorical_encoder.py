@@ -0,0 +1,62 @@
+"""Peak memory and fit/transform time of CategoricalEncoder output modes.
+
+Each mode runs in a forked child so its peak RSS is measured in isolation.
+
+    python benchmarks/bench_categorical_encoder.py --rows 3000000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from synthetic import make_transactions  # noqa: E402
+from feature_eng_process import CategoricalEncoder  # noqa: E402
+
+CATEGORICAL_COLS = ['ProductCategory', 'ChannelId', 'ProviderId', 'ProductId']
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(df, output, results):
+    baseline = peak_rss_mb()
+    encoder = CategoricalEncoder(categorical_cols=CATEGORICAL_COLS, output=output)
+    start = time.perf_counter()
+    encoder.fit(df)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = encoder.transform(df)
+    transform_s = time.perf_counter() - start
+
+    results.put((output, fit_s, transform_s, peak_rss_mb() - baseline,
+                 result.memory_usage(deep=False).sum() / 1e6, result.shape[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    args = parser.parse_args()
+
+    df = make_transactions(args.rows)[CATEGORICAL_COLS + ['Amount', 'Value']]
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+
+    print(f"{'output':<10}{'fit s':>8}{'transform s':>13}{'peak +MB':>10}{'result MB':>11}"
+          f"{'columns':>9}")
+    for output in ['dense', 'sparse', 'codes']:
+        child = context.Process(target=run_mode, args=(df, output, results))
+        child.start()
+        output, fit_s, transform_s, peak_mb, result_mb, n_cols = results.get()
+        child.join()
+        print(f"{output:<10}{fit_s:>8.2f}{transform_s:>13.2f}{peak_mb:>10.0f}{result_mb:>11.0f}"
+              f"{n_cols:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Load time and peak RSS of the typed Parquet/Arrow path against CSV.
+
+Each read runs in a forked child so its peak RSS is measured in isolation.
+
+    python benchmarks/bench_data_io.py --rows 1000000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from synthetic import make_transactions  # noqa: E402
+from data_io import read_table, write_table  # noqa: E402
+
+RFM_COLUMNS = ['CustomerId', 'TransactionStartTime', 'Amount']
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed_read(path, columns, results):
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    df = read_table(path, columns=columns)
+    elapsed = time.perf_counter() - start
+    results.put((elapsed, peak_rss_mb() - baseline, df.memory_usage(deep=True).sum() / 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = make_transactions(args.rows)
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {fmt: os.path.join(tmp, f"data.{fmt}") for fmt in ['csv', 'parquet', 'arrow']}
+        for path in paths.values():
+            write_table(df, path)
+        del df
+
+        print(f"{'format':<10}{'columns':<10}{'file MB':>9}{'load s':>9}{'peak +MB':>10}"
+              f"{'frame MB':>10}")
+        for fmt, path in paths.items():
+            file_mb = os.path.getsize(path) / 1e6
+            for label, columns in [('all', None), ('rfm', RFM_COLUMNS)]:
+                child = context.Process(target=timed_read, args=(path, columns, results))
+                child.start()
+                elapsed, peak_mb, frame_mb = results.get()
+                child.join()
+                print(f"{fmt:<10}{label:<10}{file_mb:>9.0f}{elapsed:>9.2f}{peak_mb:>10.0f}"
+                      f"{frame_mb:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Compare per-record /predict scoring against the vectorized /predict/batch path.
+
+Run from the project root:
+    python benchmarks/bench_predict_batch.py --rows 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from src.api.pydantic_models import FEATURE_FIELDS, CustomerData  # noqa: E402
+from src.api.batching import (  # noqa: E402
+    columns_to_matrix, feature_order, predict_proba_matrix, records_to_matrix
+)
+from inference_engine import compile_model  # noqa: E402
+
+
+def make_model(n_train=2000, random_state=42):
+    """RandomForest shaped like the registered model, fitted on random CustomerData rows."""
+    rng = np.random.default_rng(random_state)
+    names = list(FEATURE_FIELDS)
+    X = pd.DataFrame(rng.integers(0, 2, size=(n_train, len(names))), columns=names)
+    y = rng.integers(0, 2, size=n_train)
+    model = RandomForestClassifier(n_estimators=100, max_depth=5, random_state=random_state)
+    return model.fit(X, y)
+
+
+def make_records(n_rows, random_state=0):
+    rng = np.random.default_rng(random_state)
+    names = list(FEATURE_FIELDS)
+    values = rng.integers(0, 2, size=(n_rows, len(names)))
+    return [CustomerData(**dict(zip(names, row.tolist()))) for row in values]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    model = make_model()
+    names = feature_order(model)
+    records = make_records(args.rows)
+    columns = {name: [getattr(r, name) for r in records] for name in names}
+
+    start = time.perf_counter()
+    single = [model.predict_proba(pd.DataFrame([r.model_dump()]))[0][1] for r in records]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = predict_proba_matrix(model, records_to_matrix(records, names), names)
+    records_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columnar = predict_proba_matrix(model, columns_to_matrix(columns, names), names)
+    columns_s = time.perf_counter() - start
+
+    compiled = compile_model(model)
+    X = records_to_matrix(records, names)
+    start = time.perf_counter()
+    compiled_single = [compiled.predict_proba(row)[0, 1] for row in X]
+    compiled_single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled_batch = predict_proba_matrix(compiled, records_to_matrix(records, names), names)
+    compiled_batch_s = time.perf_counter() - start
+
+    assert np.allclose(single, batch) and np.allclose(batch, columnar)
+    assert np.allclose(batch, compiled_single) and np.allclose(batch, compiled_batch)
+
+    print(f"{'path':<22}{'seconds':>10}{'rows/sec':>14}")
+    for label, seconds in [("single-record", single_s),
+                           ("batch (records)", records_s),
+                           ("batch (columns)", columns_s),
+                           ("compiled single-row", compiled_single_s),
+                           ("compiled batch", compiled_batch_s)]:
+        print(f"{label:<22}{seconds:>10.3f}{args.rows / seconds:>14,.0f}")
+    print(f"⚡ Speedup (records): {single_s / records_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark per-record featurization: fitted pandas pipeline vs compiled TransformPlan.
+
+    python benchmarks/bench_transform_plan.py --rows 200000 --requests 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from synthetic import make_transactions  # noqa: E402
+from data_io import apply_schema  # noqa: E402
+from feature_eng_process import OutlierFlagger, build_feature_engineering_pipeline  # noqa: E402
+from transform_plan import TransformPlan  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000, help="rows to fit the pipeline on")
+    parser.add_argument("--requests", type=int, default=2_000, help="single-record calls to time")
+    args = parser.parse_args()
+
+    df = apply_schema(make_transactions(args.rows).drop(columns=['CountryCode']))
+    pipeline = build_feature_engineering_pipeline().fit(df)
+    flagger = OutlierFlagger().fit(df)
+    plan = TransformPlan.from_pipeline(pipeline, outlier_flagger=flagger)
+
+    sample = df.sample(args.requests, random_state=0)
+    raw = sample.astype(str).assign(Amount=sample['Amount'], Value=sample['Value'],
+                                    PricingStrategy=sample['PricingStrategy'],
+                                    FraudResult=sample['FraudResult'])
+    records = raw.to_dict(orient='records')
+
+    start = time.perf_counter()
+    for i in range(len(raw)):
+        expected = pipeline.transform(flagger.transform(raw.iloc[[i]]))
+    pandas_us = (time.perf_counter() - start) / len(raw) * 1e6
+
+    start = time.perf_counter()
+    for record in records:
+        actual = plan.transform_one(record)
+    plan_us = (time.perf_counter() - start) / len(records) * 1e6
+
+    expected = expected[plan.feature_names].to_numpy(np.float64)[0]
+    assert np.allclose(actual, expected, equal_nan=True), "plan output differs from pipeline"
+    print(f"pandas pipeline: {pandas_us:10.1f} us/record")
+    print(f"transform plan:  {plan_us:10.1f} us/record  ({pandas_us / plan_us:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
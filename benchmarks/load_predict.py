@@ -0,0 +1,96 @@
+"""Concurrent load generator for /predict: latency percentiles and throughput.
+
+By default it runs in-process, comparing the micro-batcher with scoring every
+request on its own in the threadpool. With --url it targets a running API:
+    python benchmarks/load_predict.py --requests 2000 --concurrency 64
+    python benchmarks/load_predict.py --url http://localhost:8000/predict
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_predict_batch import make_model, make_records  # noqa: E402
+from src.api.batching import (  # noqa: E402
+    MicroBatcher, feature_order, predict_proba_matrix, records_to_matrix
+)
+
+
+async def run_load(call, records, concurrency):
+    """Fire `records` through `call` with at most `concurrency` in flight."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(record):
+        async with semaphore:
+            start = time.perf_counter()
+            await call(record)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(r) for r in records))
+    return np.array(latencies) * 1000, time.perf_counter() - start
+
+
+def report(label, latencies_ms, elapsed):
+    p50, p99 = np.percentile(latencies_ms, [50, 99])
+    print(f"{label:<24}{p50:>10.2f}{p99:>10.2f}{len(latencies_ms) / elapsed:>14,.0f}")
+
+
+async def in_process(args):
+    model = make_model()
+    names = feature_order(model)
+    records = make_records(args.requests)
+
+    def score(batch):
+        return predict_proba_matrix(model, records_to_matrix(batch, names), names).tolist()
+
+    async def unbatched(record):
+        loop = asyncio.get_running_loop()
+        return (await loop.run_in_executor(None, score, [record]))[0]
+
+    batcher = MicroBatcher(score, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+    await batcher.start()
+    try:
+        results = [("threadpool (unbatched)", await run_load(unbatched, records, args.concurrency)),
+                   ("micro-batched", await run_load(batcher.submit, records, args.concurrency))]
+    finally:
+        await batcher.stop()
+    return results
+
+
+async def against_url(args):
+    import httpx
+
+    records = make_records(args.requests)
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def call(record):
+            response = await client.post(args.url, json=record.model_dump())
+            response.raise_for_status()
+
+        return [(args.url, await run_load(call, records, args.concurrency))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    results = asyncio.run(against_url(args) if args.url else in_process(args))
+
+    print(f"{'mode':<24}{'p50 ms':>10}{'p99 ms':>10}{'req/sec':>14}")
+    for label, (latencies_ms, elapsed) in results:
+        report(label, latencies_ms, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Benchmark suite for feature engineering, training prep and serving, with a JSON baseline.
+
+Every stage runs in a forked child, so its peak RSS is measured in isolation. Record a
+baseline on a machine, then compare later runs against it; the exit code is 1 when a
+stage is slower (or grows more memory) than the baseline by more than --threshold.
+
+    python benchmarks/run_benchmarks.py --rows 10000 100000 --save-baseline
+    python benchmarks/run_benchmarks.py --rows 10000 100000 --threshold 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from synthetic import make_transactions  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+RESULTS_PATH = "reports/benchmarks.json"
+CATEGORICAL_COLS = ['ProductCategory', 'ChannelId', 'ProviderId']
+# Differences below these are noise (timer jitter, allocator, import caches), never a regression
+TIME_SLACK_S = 0.02
+MEMORY_SLACK_MB = 16.0
+STAGE_TIMEOUT_S = 3600
+POLL_S = 1.0
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# --------- Stages ------------
+# Each stage does its untimed setup and returns (timed callable, items it processes).
+
+def stage_feature_pipeline(df, args):
+    from feature_eng_process import build_feature_engineering_pipeline
+
+    pipeline = build_feature_engineering_pipeline()
+    return lambda: pipeline.fit_transform(df), len(df)
+
+
+def stage_woe_iv(df, args):
+    from feature_eng_process import calculate_woe_iv
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            calculate_woe_iv(df, categorical_cols=CATEGORICAL_COLS, target_col='FraudResult')
+    return run, len(df)
+
+
+def stage_rfm(df, args):
+    from proxy_labeling import calculate_rfm
+
+    return lambda: calculate_rfm(df), len(df)
+
+
+def stage_rolling_windows(df, args):
+    from feature_eng_process import RollingWindowFeatures
+
+    transformer = RollingWindowFeatures(windows=('1h', '24h', '7d'))
+    return lambda: transformer.transform(df), len(df)
+
+
+def stage_preprocess(df, args):
+    from feature_eng_process import build_feature_engineering_pipeline
+    from train import preprocess
+
+    features = build_feature_engineering_pipeline().fit_transform(df)
+    features['is_high_risk'] = features['FraudResult']
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            preprocess(features)
+    return run, len(features)
+
+
+def stage_predict(df, args):
+    """Single-record /predict calls through the full FastAPI handler (in-process client)."""
+    import mlflow.sklearn
+    from fastapi.testclient import TestClient
+    from bench_predict_batch import make_model, make_records
+
+    folder = tempfile.mkdtemp()
+    model_dir = os.path.join(folder, "model")
+    mlflow.sklearn.save_model(make_model(), model_dir, serialization_format="cloudpickle")
+    os.environ["MODEL_PATH"] = model_dir
+    from src.api import main
+
+    payloads = [r.model_dump() for r in make_records(min(len(df), args.predict_requests))]
+    client = TestClient(main.app)
+    client.__enter__()
+
+    def run():
+        for payload in payloads:
+            client.post("/predict", json=payload).raise_for_status()
+    return run, len(payloads)
+
+
+STAGES = {
+    'feature_pipeline': stage_feature_pipeline,
+    'woe_iv': stage_woe_iv,
+    'rfm': stage_rfm,
+    'rolling_windows': stage_rolling_windows,
+    'preprocess': stage_preprocess,
+    'predict': stage_predict,
+}
+
+
+# --------- Runner ------------
+
+def _run_stage(name, df, args, results):
+    # Before setup: ru_maxrss only grows, so a later baseline would hide the stage's peak
+    baseline = peak_rss_mb()
+    try:
+        run, n_items = STAGES[name](df, args)
+        run()  # warm-up: imports, caches, first-call allocations
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        seconds = min(times)
+        results.put({'seconds': round(seconds, 6), 'items': n_items,
+                     'items_per_second': round(n_items / seconds, 1),
+                     'peak_rss_mb': round(peak_rss_mb() - baseline, 1)})
+    except Exception as e:
+        results.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def _collect(child, results, timeout=STAGE_TIMEOUT_S):
+    """The child's result, or an error when it dies without one (e.g. OOM-killed) or hangs."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return results.get(timeout=POLL_S)
+        except queue_module.Empty:
+            pass
+        if not child.is_alive():
+            # It may have put its result right before exiting
+            try:
+                return results.get(timeout=POLL_S)
+            except queue_module.Empty:
+                child.join()
+                return {'error': f"child exited with code {child.exitcode} without a result"}
+        if time.monotonic() > deadline:
+            child.kill()
+            child.join()
+            return {'error': f"timed out after {timeout:.0f}s"}
+
+
+def run_suite(rows, stages, args):
+    """Results keyed by "<stage>@<rows>"."""
+    # Imported once here, so the children's peak RSS is the stage's work, not module loading
+    import feature_eng_process  # noqa: F401
+    import proxy_labeling  # noqa: F401
+    import train  # noqa: F401
+
+    context = multiprocessing.get_context('fork')
+    results = {}
+    for n_rows in rows:
+        df = make_transactions(n_rows)
+        for name in stages:
+            queue = context.Queue()
+            child = context.Process(target=_run_stage, args=(name, df, args, queue))
+            child.start()
+            result = _collect(child, queue, args.timeout)
+            child.join()
+            results[f"{name}@{n_rows}"] = result
+            if 'error' in result:
+                print(f"❌ {name}@{n_rows}: {result['error']}")
+            else:
+                print(f"{name:<18}{n_rows:>10,}{result['seconds']:>11.3f}"
+                      f"{result['items_per_second']:>16,.0f}{result['peak_rss_mb']:>10.1f}")
+        del df
+    return results
+
+
+def compare(results, baseline, threshold=0.2, time_slack_s=TIME_SLACK_S,
+            memory_slack_mb=MEMORY_SLACK_MB):
+    """
+    Regression messages for results slower than `baseline` by more than `threshold` (a
+    fraction) plus `time_slack_s`, or whose peak RSS grew by more than `threshold` plus
+    `memory_slack_mb`. Stages missing from the baseline are skipped; failed stages count.
+    """
+    regressions = []
+    for key, result in results.items():
+        if 'error' in result:
+            regressions.append(f"{key} failed: {result['error']}")
+            continue
+        reference = baseline.get(key)
+        if reference is None or 'error' in reference:
+            continue
+        ratio = result['seconds'] / reference['seconds']
+        if result['seconds'] > reference['seconds'] * (1 + threshold) + time_slack_s:
+            regressions.append(f"{key} time {reference['seconds']:.3f}s -> "
+                               f"{result['seconds']:.3f}s ({ratio - 1:+.0%})")
+        memory_limit = reference['peak_rss_mb'] * (1 + threshold) + memory_slack_mb
+        if result['peak_rss_mb'] > memory_limit:
+            regressions.append(f"{key} peak RSS {reference['peak_rss_mb']:.0f} MB -> "
+                               f"{result['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs='+', default=[10_000, 100_000],
+                        help="synthetic transaction counts (10k to 10M)")
+    parser.add_argument("--stages", nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs; the fastest counts")
+    parser.add_argument("--predict-requests", type=int, default=500,
+                        help="requests per /predict run (capped at --rows)")
+    parser.add_argument("--timeout", type=float, default=STAGE_TIMEOUT_S,
+                        help="seconds before a stage is killed and recorded as failed")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action='store_true',
+                        help="write this run as the new baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--out", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    print(f"{'stage':<18}{'rows':>10}{'seconds':>11}{'items/sec':>16}{'peak +MB':>10}")
+    results = run_suite(args.rows, args.stages, args)
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"✅ Saved baseline to '{args.baseline}'")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ No baseline at {args.baseline}; rerun with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), threshold=args.threshold)
+    for message in regressions:
+        print(f"❌ {message}")
+    if not regressions:
+        print(f"✅ No regressions beyond {args.threshold:.0%} of the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
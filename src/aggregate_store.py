@@ -0,0 +1,143 @@
+import math
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+AGGREGATE_FEATURES = ['total_transaction_amount', 'avg_transaction_amount',
+                      'transaction_count', 'std_transaction_amount']
+
+
+class CustomerAggregateStore:
+    """
+    Per-customer running Amount aggregates, updatable one transaction at a time.
+
+    Each customer keeps a (count, mean, M2, total) tuple updated with Welford's algorithm,
+    so both updates and lookups are O(1) dict operations. Updates swap in a new tuple under
+    the lock, so lock-free lookups never see a half-updated customer. The state is written through
+    to a SQLite table every `flush_every` updates and on `flush()`/`close()`.
+    Feature semantics match AggregateFeatures: sum, mean, count and sample std (0 for a
+    single transaction).
+    """
+
+    def __init__(self, path=":memory:", flush_every=1000):
+        self.path = path
+        self.flush_every = flush_every
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS customer_aggregates ("
+            "customer_id TEXT PRIMARY KEY, count INTEGER, mean REAL, m2 REAL, total REAL)"
+        )
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._stats = {
+            row[0]: tuple(row[1:])
+            for row in self._conn.execute(
+                "SELECT customer_id, count, mean, m2, total FROM customer_aggregates"
+            )
+        }
+
+    def __len__(self):
+        return len(self._stats)
+
+    def __contains__(self, customer_id):
+        return customer_id in self._stats
+
+    def update(self, customer_id, amount):
+        """Fold one new transaction into the customer's aggregates and return the features."""
+        with self._lock:
+            count, mean, m2, total = self._stats.get(customer_id, (0, 0.0, 0.0, 0.0))
+            count += 1
+            delta = amount - mean
+            mean += delta / count
+            m2 += delta * (amount - mean)
+            stats = self._stats[customer_id] = (count, mean, m2, total + amount)
+            self._dirty.add(customer_id)
+            if len(self._dirty) >= self.flush_every:
+                self._flush_locked()
+            return self._features(stats)
+
+    def get(self, customer_id):
+        """Features for `customer_id`, or None if the customer has no history."""
+        stats = self._stats.get(customer_id)
+        return None if stats is None else self._features(stats)
+
+    @staticmethod
+    def _features(stats):
+        count, mean, m2, total = stats
+        return {
+            'total_transaction_amount': total,
+            'avg_transaction_amount': mean,
+            'transaction_count': count,
+            'std_transaction_amount': math.sqrt(m2 / (count - 1)) if count > 1 else 0.0,
+        }
+
+    def load_transactions(self, df, group_col='CustomerId', amount_col='Amount'):
+        """Bulk-replace the store with aggregates computed from a transaction frame."""
+        grouped = df.groupby(group_col)[amount_col]
+        agg = grouped.agg(['count', 'mean', 'var', 'sum'])
+        m2 = (agg['var'].fillna(0) * (agg['count'] - 1)).to_numpy()
+        with self._lock:
+            self._stats = {
+                customer_id: (int(count), float(mean), float(m2_), float(total))
+                for customer_id, count, mean, m2_, total in zip(
+                    agg.index, agg['count'], agg['mean'], m2, agg['sum']
+                )
+            }
+            self._conn.execute("DELETE FROM customer_aggregates")
+            self._dirty = set(self._stats)
+            self._flush_locked()
+        return self
+
+    def load_aggregates(self, agg_df, group_col='CustomerId'):
+        """Seed the store from a fitted AggregateFeatures.agg_features_ frame."""
+        count = agg_df['transaction_count'].to_numpy()
+        m2 = np.square(agg_df['std_transaction_amount'].to_numpy()) * np.maximum(count - 1, 0)
+        with self._lock:
+            self._stats = {
+                customer_id: (int(n), float(mean), float(m2_), float(total))
+                for customer_id, n, mean, m2_, total in zip(
+                    agg_df[group_col], count, agg_df['avg_transaction_amount'], m2,
+                    agg_df['total_transaction_amount']
+                )
+            }
+            self._conn.execute("DELETE FROM customer_aggregates")
+            self._dirty = set(self._stats)
+            self._flush_locked()
+        return self
+
+    def _flush_locked(self):
+        if not self._dirty:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO customer_aggregates VALUES (?, ?, ?, ?, ?)",
+            [(customer_id, *self._stats[customer_id]) for customer_id in self._dirty],
+        )
+        self._conn.commit()
+        self._dirty.clear()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from data_io import read_table
+
+    parser = argparse.ArgumentParser(description="Build the customer aggregate store")
+    parser.add_argument("--data", default="data/processed/data_cleaned.parquet")
+    parser.add_argument("--out", default="data/processed/customer_aggregates.db")
+    args = parser.parse_args()
+
+    df = read_table(args.data, columns=['CustomerId', 'Amount'])
+    store = CustomerAggregateStore(args.out).load_transactions(df)
+    store.close()
+    print(f"💾 Saved aggregates for {len(store):,} customers to: {args.out}")
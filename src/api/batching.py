@@ -0,0 +1,138 @@
+import asyncio
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator
+
+from src.api.pydantic_models import FEATURE_FIELDS
+
+
+def feature_order(model):
+    """Column order the model was fitted with, falling back to the CustomerData schema."""
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        return list(FEATURE_FIELDS)
+    return list(names)
+
+
+def records_to_matrix(records, feature_names):
+    """Stack a list of CustomerData into one float64 matrix in `feature_names` order."""
+    getter = attrgetter(*feature_names)
+    X = np.empty((len(records), len(feature_names)), dtype=np.float64)
+    for i, record in enumerate(records):
+        X[i] = getter(record)
+    return X
+
+
+def columns_to_matrix(columns, feature_names):
+    """Build a float64 matrix from columnar arrays keyed by feature name."""
+    missing = [name for name in feature_names if name not in columns]
+    if missing:
+        raise ValueError(f"Missing feature columns: {missing}")
+
+    n_rows = len(columns[feature_names[0]]) if feature_names else 0
+    X = np.empty((n_rows, len(feature_names)), dtype=np.float64)
+    for j, name in enumerate(feature_names):
+        values = columns[name]
+        if len(values) != n_rows:
+            raise ValueError(f"Column '{name}' has {len(values)} values, expected {n_rows}")
+        X[:, j] = values
+    return X
+
+
+def predict_proba_matrix(model, X, feature_names):
+    """Score a whole matrix with a single predict_proba call and return P(high risk)."""
+    if isinstance(model, BaseEstimator) and hasattr(model, "feature_names_in_"):
+        # Wrapping the block is cheap and keeps sklearn's feature-name check quiet.
+        # Compiled models take the matrix as-is.
+        X = pd.DataFrame(X, columns=feature_names, copy=False)
+    return model.predict_proba(X)[:, 1]
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-record requests into one vectorized call.
+
+    Requests are queued and collected for up to `max_wait_ms` or until
+    `max_batch_size` items are waiting. `predict_fn` receives the list of items
+    and runs on the default executor, so the event loop keeps accepting
+    requests while a batch is being scored. `stop` drains: everything queued
+    before it is still scored, later submits are refused.
+    """
+
+    _STOP = object()
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = None
+        self._task = None
+        self._stopping = False
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._queue.put_nowait((self._STOP, None))
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped"))
+
+    async def submit(self, item):
+        if self._task is None or self._stopping:
+            raise RuntimeError("Micro-batcher stopped")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _collect(self):
+        """(batch, stop requested)."""
+        loop = asyncio.get_running_loop()
+        entry = await self._queue.get()
+        if entry[0] is self._STOP:
+            return [], True
+        batch = [entry]
+        deadline = loop.time() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                entry = self._queue.get_nowait()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if entry[0] is self._STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch, stopping = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.predict_fn, items) if items else []
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    # Callers that disconnected leave behind cancelled futures
+                    if not future.done():
+                        future.set_result(result)
+            if stopping:
+                return
@@ -1,23 +1,358 @@
+import asyncio
 import os
+import sys
+from contextlib import asynccontextmanager
+from typing import Optional
 import mlflow
-import mlflow.sklearn
-from fastapi import FastAPI
-from src.api.pydantic_models import CustomerData, RiskPrediction
-import pandas as pd
+import numpy as np
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 
-app = FastAPI(title="Credit Risk Scoring API")
+# Make the top-level modules in src/ importable, as they are for the scripts and tests
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from aggregate_store import AGGREGATE_FEATURES, CustomerAggregateStore  # noqa: E402
+from drift import DriftMonitor, DriftReference  # noqa: E402
+from model_loader import load_model, resolve_production_version  # noqa: E402
+from transform_plan import SCALER_FILENAME, FeatureTransforms  # noqa: E402
+from src.api.pydantic_models import (  # noqa: E402
+    BatchCustomerData, BatchRiskPrediction, CandidateRequest, CustomerAggregates, CustomerData,
+    DriftReport, ModelStatus, RawTransaction, ReloadRequest, RiskPrediction, TransactionAmount
+)
+from src.api.batching import (  # noqa: E402
+    MicroBatcher, columns_to_matrix, records_to_matrix
+)
+from src.api.metrics import (  # noqa: E402
+    BATCH_SIZE, CONTENT_TYPE, MetricsMiddleware, SlowRequestProfiler, instrumented,
+    observe_score, registry, update_model_info
+)
+from src.api.model_manager import ModelManager  # noqa: E402
 
 # Set MLflow tracking URI (defaults to http://mlflow:5000 if env variable not set)
 mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI", "http://mlflow:5000"))
 
-# Load model from MLflow registry
+# Model resolution: MODEL_PATH (local dir, served as version "local"), else MODEL_VERSION,
+# else the latest version tagged stage=production. Loads go through the on-disk cache.
 MODEL_NAME = "CreditRiskModel"
-MODEL_VERSION = 2
-model_uri = f"models:/{MODEL_NAME}/{MODEL_VERSION}"
-model = mlflow.sklearn.load_model(model_uri)
+MODEL_VERSION = os.getenv("MODEL_VERSION")
+LOCAL_VERSION = "local"
+
+# Follow the production tag every N seconds (0 disables the poller)
+MODEL_POLL_INTERVAL_S = float(os.getenv("MODEL_POLL_INTERVAL_S", "0"))
+
+
+def resolve_version():
+    if os.getenv("MODEL_PATH"):
+        return LOCAL_VERSION
+    return resolve_production_version(MODEL_NAME)
+
+
+def load_version(version):
+    if version == LOCAL_VERSION:
+        return load_model(model_path=os.environ["MODEL_PATH"])
+    return load_model(MODEL_NAME, version)
+
+
+# Drift monitoring against the training histograms logged with each model (drift.py);
+# DRIFT_REFERENCE_PATH is used for models logged without one
+DRIFT_ENABLED = os.getenv("DRIFT_ENABLED", "1") == "1"
+DRIFT_REFERENCE_PATH = os.getenv("DRIFT_REFERENCE_PATH")
+drift_monitors = {}
+
+
+def drift_monitor(served):
+    """The version's monitor, created on its first scored batch (None without a reference)."""
+    if served.version in drift_monitors:
+        return drift_monitors[served.version]
+    reference = getattr(served.model, 'drift_reference_', None)
+    if reference is None and DRIFT_REFERENCE_PATH:
+        reference = DriftReference.load(DRIFT_REFERENCE_PATH)
+    monitor = None
+    if reference is not None:
+        missing = set(reference.feature_names) - set(served.feature_names)
+        if missing:
+            print(f"⚠️ Drift reference of version {served.version} has unknown features "
+                  f"{sorted(missing)}; drift is not monitored")
+        else:
+            columns = [served.feature_names.index(name) for name in reference.feature_names]
+            monitor = DriftMonitor(reference, columns=columns)
+    return drift_monitors.setdefault(served.version, monitor)
+
+
+def record_drift(served, X, probabilities):
+    monitor = drift_monitor(served)
+    if monitor is not None:
+        monitor.update(X, probabilities)
+
+
+# Shadow calls allowed to wait or run at once; more are dropped and counted per version
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "8"))
+manager = ModelManager(loader=load_version, resolver=resolve_version, observer=observe_score,
+                       recorder=record_drift if DRIFT_ENABLED else None,
+                       max_shadow_pending=SHADOW_MAX_PENDING)
+
+# Upper bound on records per /predict/batch call
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+
+# Micro-batching of concurrent /predict calls (MICROBATCH_ENABLED=0 scores each call alone)
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "1") == "1"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+
+# Customer aggregates are served from this store when set (see src/aggregate_store.py)
+AGGREGATE_STORE_PATH = os.getenv("AGGREGATE_STORE_PATH")
+aggregate_store = CustomerAggregateStore(AGGREGATE_STORE_PATH) if AGGREGATE_STORE_PATH else None
+
+# Feature transforms for /score/transaction when the model has no bundle of its own: a
+# feature bundle folder written by train.py (or the transform_plan.npz inside it). The
+# train.preprocess scaler must be there too; the model was never fitted on unscaled features.
+TRANSFORM_PLAN_PATH = os.getenv("TRANSFORM_PLAN_PATH")
+feature_transforms = None
+if TRANSFORM_PLAN_PATH:
+    feature_transforms = FeatureTransforms.load(
+        TRANSFORM_PLAN_PATH if os.path.isdir(TRANSFORM_PLAN_PATH)
+        else os.path.dirname(TRANSFORM_PLAN_PATH))
+    if feature_transforms is None:
+        raise RuntimeError(f"TRANSFORM_PLAN_PATH={TRANSFORM_PLAN_PATH} has no {SCALER_FILENAME} "
+                           "next to the plan; point it at a feature bundle such as "
+                           "models/feature_bundle")
+
+# Opt-in sampling profiler: requests slower than PROFILE_SLOW_MS get collapsed-stack
+# (flame graph) files in PROFILE_DIR
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "reports/profiles")
+profiler = (SlowRequestProfiler(PROFILE_SLOW_MS, PROFILE_INTERVAL_MS, PROFILE_DIR)
+            if PROFILE_SLOW_MS > 0 else None)
+
+batcher = None
+
+
+def aggregate_scaling():
+    """
+    Train-scaler (mean, scale) of the aggregates: the store keeps raw units, /predict takes
+    model-space features. From the active model's bundle, else TRANSFORM_PLAN_PATH.
+    """
+    transforms = manager.ensure_loaded().model
+    if not isinstance(transforms, FeatureTransforms):
+        transforms = feature_transforms
+    try:
+        if transforms is None:
+            raise ValueError("the model has no feature bundle and TRANSFORM_PLAN_PATH is not "
+                             "configured")
+        return transforms.scaling(AGGREGATE_FEATURES)
+    except ValueError as e:
+        raise HTTPException(status_code=503,
+                            detail=f"Cannot scale aggregate store values: {e}")
+
+
+def fill_aggregates(records):
+    """Overwrite client-sent customer aggregates with the store's (scaled) values where known."""
+    scaling = None
+    for record in records:
+        if aggregate_store is not None and record.CustomerId is not None:
+            features = aggregate_store.get(record.CustomerId)
+            if features is not None:
+                mean, scale = scaling = scaling or aggregate_scaling()
+                for j, name in enumerate(AGGREGATE_FEATURES):
+                    setattr(record, name, (features[name] - mean[j]) / scale[j])
+
+        missing = [name for name in AGGREGATE_FEATURES if getattr(record, name) is None]
+        if missing:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Missing {missing}: send them or a CustomerId known to the aggregate store"
+            )
+    return records
+
+
+def fill_aggregate_columns(columns, customer_ids=None):
+    """Columnar counterpart of `fill_aggregates`; `customer_ids` are row-aligned."""
+    if aggregate_store is None or customer_ids is None:
+        return columns
+    n_rows = len(customer_ids)
+    filled = {}
+    for name in AGGREGATE_FEATURES:
+        values = columns.get(name, [None] * n_rows)
+        if len(values) != n_rows:
+            raise ValueError(f"Column '{name}' has {len(values)} values, expected {n_rows}")
+        filled[name] = np.array(values, dtype=np.float64)
+    scaling = None
+    for i, customer_id in enumerate(customer_ids):
+        features = aggregate_store.get(customer_id) if customer_id is not None else None
+        if features is not None:
+            mean, scale = scaling = scaling or aggregate_scaling()
+            for j, name in enumerate(AGGREGATE_FEATURES):
+                filled[name][i] = (features[name] - mean[j]) / scale[j]
+
+    missing = [name for name in AGGREGATE_FEATURES if np.isnan(filled[name]).any()]
+    if missing:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Missing {missing}: send them or customer_ids known to the aggregate store"
+        )
+    return {**columns, **filled}
+
+
+def score_records(records):
+    return manager.score(lambda names: records_to_matrix(records, names)).tolist()
+
+
+async def poll_production_tag():
+    while True:
+        await asyncio.sleep(MODEL_POLL_INTERVAL_S)
+        try:
+            await run_in_threadpool(manager.reload)
+        except Exception as e:
+            print(f"⚠️ Model poll failed, keeping version {manager.active.version}: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global batcher
+    await run_in_threadpool(manager.ensure_loaded, MODEL_VERSION)
+    if profiler is not None:
+        profiler.start()
+    poller = None
+    if MODEL_POLL_INTERVAL_S > 0:
+        poller = asyncio.create_task(poll_production_tag())
+    if MICROBATCH_ENABLED:
+        batcher = MicroBatcher(
+            score_records, max_batch_size=MICROBATCH_MAX_SIZE, max_wait_ms=MICROBATCH_MAX_WAIT_MS
+        )
+        await batcher.start()
+    yield
+    if poller is not None:
+        poller.cancel()
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
+    if aggregate_store is not None:
+        aggregate_store.flush()
+    if profiler is not None:
+        profiler.stop()
+
+
+app = FastAPI(title="Credit Risk Scoring API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, profiler=profiler)
+
 
 @app.post("/predict", response_model=RiskPrediction)
-def predict_risk(data: CustomerData):
-    df = pd.DataFrame([data.dict()])
-    probability = model.predict_proba(df)[0][1]  # Probability of high risk
+@instrumented
+async def predict_risk(data: CustomerData):
+    fill_aggregates([data])
+    if batcher is not None:
+        probability = await batcher.submit(data)
+    else:
+        probability = (await run_in_threadpool(score_records, [data]))[0]
     return RiskPrediction(risk_probability=probability)
+
+
+@app.post("/predict/batch", response_model=BatchRiskPrediction)
+@instrumented
+def predict_risk_batch(batch: BatchCustomerData):
+    BATCH_SIZE.observe(len(batch), source="request")
+    if len(batch) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(batch)} records exceeds MAX_BATCH_SIZE={MAX_BATCH_SIZE}"
+        )
+
+    if batch.records is not None:
+        fill_aggregates(batch.records)
+        probabilities = manager.score(lambda names: records_to_matrix(batch.records, names))
+    else:
+        try:
+            columns = fill_aggregate_columns(batch.columns, batch.customer_ids)
+            probabilities = manager.score(lambda names: columns_to_matrix(columns, names))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    return BatchRiskPrediction(risk_probabilities=probabilities.tolist())
+
+
+@app.post("/score/transaction", response_model=RiskPrediction)
+@instrumented
+def score_transaction(transaction: RawTransaction):
+    """
+    Score a raw transaction. Models logged with their feature bundle build features with
+    their own train-time transforms; otherwise TRANSFORM_PLAN_PATH is used.
+    """
+    records = [transaction.model_dump()]
+    aggregates = None
+    if aggregate_store is not None:
+        aggregates = [aggregate_store.get(transaction.CustomerId)]
+
+    try:
+        if manager.has_transforms():
+            probabilities = manager.score_transactions(records, aggregates)
+        elif feature_transforms is not None:
+            X = feature_transforms.transform_records(records, aggregates=aggregates)
+            probabilities = manager.score(lambda names: X[:, feature_transforms.indexer(names)])
+        else:
+            raise HTTPException(
+                status_code=503,
+                detail="Model has no feature bundle and TRANSFORM_PLAN_PATH is not configured"
+            )
+    except ValueError as e:
+        # Bad client input reaching the plan, as on /predict
+        raise HTTPException(status_code=422, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return RiskPrediction(risk_probability=float(probabilities[0]))
+
+
+@app.post("/customers/{customer_id}/transactions", response_model=CustomerAggregates)
+def record_transaction(customer_id: str, transaction: TransactionAmount):
+    """Fold a new transaction into the customer's aggregates (O(1))."""
+    if aggregate_store is None:
+        raise HTTPException(status_code=503, detail="AGGREGATE_STORE_PATH is not configured")
+    return aggregate_store.update(customer_id, transaction.Amount)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: request counts, stage latencies, batch sizes, model versions."""
+    update_model_info(manager.status())
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/drift", response_model=DriftReport)
+def drift_report(version: Optional[str] = None):
+    """PSI/KS of the features and scores served so far by `version` (default: active)."""
+    if version is None:
+        # Reads state only; loading a model is not this endpoint's job
+        active = manager.active
+        if active is None:
+            raise HTTPException(status_code=404, detail="No model version has been served yet")
+        version = active.version
+    monitor = drift_monitors.get(version)
+    if monitor is None:
+        raise HTTPException(status_code=404,
+                            detail=f"No drift data for model version {version}")
+    return DriftReport(version=version, **monitor.report())
+
+
+# --------- Model administration ------------
+
+@app.post("/admin/reload", response_model=ModelStatus)
+def reload_model(request: ReloadRequest):
+    manager.reload(request.version)
+    return manager.status()
+
+
+@app.post("/admin/candidate", response_model=ModelStatus)
+def set_candidate(request: CandidateRequest):
+    manager.set_candidate(request.version, mode=request.mode, fraction=request.fraction)
+    return manager.status()
+
+
+@app.delete("/admin/candidate", response_model=ModelStatus)
+def clear_candidate():
+    manager.clear_candidate()
+    return manager.status()
+
+
+@app.get("/admin/models", response_model=ModelStatus)
+def model_status():
+    return manager.status()
@@ -0,0 +1,336 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+
+# Seconds; the scoring hot path is sub-millisecond to tens of milliseconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 10000)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for the three metric types; children are keyed by their label values."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+            lines += [line for key, child in children for line in self._render_child(key, child)]
+        return lines
+
+    def _render_child(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram; each child is [bucket counts..., +Inf count, sum]."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            child[index] += 1
+            child[-1] += value
+
+    def _render_child(self, key, child):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), child[:-1]):
+            cumulative += count
+            le = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+REQUESTS = registry.register(Counter(
+    "credit_risk_requests_total", "HTTP requests by route and status code",
+    ("path", "method", "status")))
+REQUEST_SECONDS = registry.register(Histogram(
+    "credit_risk_request_seconds", "End-to-end request latency", ("path",)))
+STAGE_SECONDS = registry.register(Histogram(
+    "credit_risk_stage_seconds",
+    "Time spent per scoring stage (parse, frame_build, predict, serialize)", ("stage",)))
+IN_FLIGHT = registry.register(Gauge(
+    "credit_risk_requests_in_flight", "Requests currently being handled"))
+BATCH_SIZE = registry.register(Histogram(
+    "credit_risk_batch_size",
+    "Rows per /predict/batch request (source=request) and per model call (source=model, "
+    "includes coalesced micro-batches)", ("source",), buckets=BATCH_BUCKETS))
+MODEL_INFO = registry.register(Gauge(
+    "credit_risk_model_info", "Model versions being served", ("version", "role")))
+
+
+def observe_score(version, build_ms, predict_ms, rows):
+    """ModelManager observer: stage timings and rows of every (non-shadow) model call."""
+    STAGE_SECONDS.observe(build_ms / 1000, stage="frame_build")
+    STAGE_SECONDS.observe(predict_ms / 1000, stage="predict")
+    BATCH_SIZE.observe(rows, source="model")
+
+
+def update_model_info(status):
+    MODEL_INFO.clear()
+    if status['active_version'] is not None:
+        MODEL_INFO.set(1, version=status['active_version'], role="active")
+    if status['candidate_version'] is not None:
+        MODEL_INFO.set(1, version=status['candidate_version'], role=status['candidate_mode'])
+
+
+# --------- Per-request timing ------------
+
+
+class RequestTimer:
+    """Timestamps of one request, shared by the middleware and the instrumented handler."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.handler_done = None
+        self.thread_id = threading.get_ident()
+        self.samples = None
+
+
+_current = contextvars.ContextVar("request_timer", default=None)
+
+
+def instrumented(handler):
+    """
+    Endpoint decorator: records the time from request arrival to the handler call (body
+    read plus Pydantic validation) as the `parse` stage, and marks the handler's end so the
+    middleware can time response serialization.
+    """
+    def begin():
+        timer = _current.get()
+        if timer is not None:
+            timer.thread_id = threading.get_ident()
+            STAGE_SECONDS.observe(time.perf_counter() - timer.start, stage="parse")
+        return timer
+
+    def end(timer):
+        if timer is not None:
+            timer.handler_done = time.perf_counter()
+
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            timer = begin()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                end(timer)
+    else:
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            timer = begin()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                end(timer)
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests, in-flight requests and latency per route template.
+
+    Serialization is the gap between an `instrumented` handler returning and the response
+    start being sent. With a `profiler`, requests slower than its threshold get their
+    sampled stacks written out.
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timer = RequestTimer()
+        token = _current.set(timer)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if timer.handler_done is not None:
+                    STAGE_SECONDS.observe(time.perf_counter() - timer.handler_done,
+                                          stage="serialize")
+            await send(message)
+
+        IN_FLIGHT.inc()
+        if self.profiler is not None:
+            self.profiler.track(timer)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - timer.start
+            IN_FLIGHT.dec()
+            _current.reset(token)
+            # Route templates keep label cardinality bounded (/customers/{customer_id}/...)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUESTS.inc(path=path, method=scope["method"], status=status["code"])
+            REQUEST_SECONDS.observe(elapsed, path=path)
+            if self.profiler is not None:
+                self.profiler.finish(timer, elapsed, f"{scope['method']} {path}")
+
+
+# --------- Sampling profiler ------------
+
+
+def _fold_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """
+    Opt-in sampling profiler for slow requests.
+
+    A daemon thread samples the stack of every tracked request's thread each `interval_ms`
+    (sys._current_frames, no tracing overhead on the request itself). Requests slower than
+    `threshold_ms` are written to `out_dir` as collapsed stacks ("frame;frame;frame count"),
+    the input format of flamegraph.pl and speedscope. Async handlers share the event loop
+    thread, so their samples can include other requests running concurrently.
+    """
+
+    def __init__(self, threshold_ms, interval_ms=5.0, out_dir="reports/profiles", max_files=100):
+        self.threshold_s = threshold_ms / 1000
+        self.interval_s = interval_ms / 1000
+        self.out_dir = out_dir
+        self.max_files = max_files
+        self.written = 0
+        self._active = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._sample, name="slow-request-profiler",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def track(self, timer):
+        timer.samples = StackCounter()
+        self._active[id(timer)] = timer
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()
+            for timer in list(self._active.values()):
+                frame = frames.get(timer.thread_id)
+                if frame is not None and timer.thread_id != own:
+                    timer.samples[_fold_stack(frame)] += 1
+
+    def finish(self, timer, elapsed, name):
+        self._active.pop(id(timer), None)
+        if elapsed < self.threshold_s or not timer.samples or self.written >= self.max_files:
+            return None
+        self.written += 1
+        slug = "".join(c if c.isalnum() else "_" for c in name).strip("_")
+        path = os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_"
+                                          f"{int(elapsed * 1000)}ms_{slug}.folded")
+        with open(path, "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in timer.samples.items())
+        return path
@@ -0,0 +1,182 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.api.batching import feature_order, predict_proba_matrix
+
+
+class ServedModel:
+    """A loaded model version together with the feature order it expects."""
+
+    def __init__(self, version, model):
+        self.version = str(version)
+        self.model = model
+        self.feature_names = feature_order(model)
+
+
+class LatencyStats:
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.abs_diff_sum = 0.0  # shadow only: |candidate - active| summed over rows
+        self.dropped = 0  # shadow only: calls skipped because the shadow queue was full
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms, rows, abs_diff_sum=0.0):
+        with self._lock:
+            self.calls += 1
+            self.rows += rows
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.abs_diff_sum += abs_diff_sum
+
+    def record_drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'rows': self.rows,
+                'mean_ms': self.total_ms / self.calls if self.calls else 0.0,
+                'max_ms': self.max_ms,
+                'mean_abs_diff': self.abs_diff_sum / self.rows if self.rows else 0.0,
+                'dropped': self.dropped,
+            }
+
+
+class ModelManager:
+    """
+    Holds the active model and an optional candidate version for shadow or canary scoring.
+
+    New versions are loaded by the caller's thread (admin endpoint or poller), never on the
+    request path, and published with a single attribute assignment. A request reads
+    `self.active` once, so in-flight requests finish on the version they started with.
+    An `observer(version, build_ms, predict_ms, rows)` and a `recorder(served, X,
+    probabilities)` are called after every answering (non-shadow) model call.
+    At most `max_shadow_pending` shadow calls wait or run at once; beyond that they are
+    dropped (counted per version) rather than queued without bound.
+    """
+
+    def __init__(self, loader, resolver, observer=None, recorder=None, max_shadow_pending=8):
+        self.loader = loader
+        self.resolver = resolver
+        self.observer = observer
+        self.recorder = recorder
+        self.active = None
+        self.candidate = None
+        self.candidate_mode = None
+        self.canary_fraction = 0.0
+        self.latency = {}
+        self._reload_lock = threading.Lock()
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._shadow_slots = threading.BoundedSemaphore(max_shadow_pending)
+
+    def _stats(self, version):
+        stats = self.latency.get(version)
+        if stats is None:
+            stats = self.latency.setdefault(version, LatencyStats())
+        return stats
+
+    def reload(self, version=None):
+        """Load `version` (default: resolver's answer) and swap it in. Returns True on change."""
+        with self._reload_lock:
+            version = str(version or self.resolver())
+            if self.active is not None and self.active.version == version:
+                return False
+            served = ServedModel(version, self.loader(version))
+            self.active = served
+            print(f"🔄 Now serving model version {version}")
+            return True
+
+    def ensure_loaded(self, version=None):
+        if self.active is None:
+            self.reload(version)
+        return self.active
+
+    def set_candidate(self, version, mode="shadow", fraction=0.0):
+        if mode not in ("shadow", "canary"):
+            raise ValueError("mode must be 'shadow' or 'canary'")
+        served = ServedModel(version, self.loader(str(version)))
+        self.candidate_mode, self.canary_fraction = mode, fraction
+        self.candidate = served
+
+    def clear_candidate(self):
+        self.candidate = None
+        self.candidate_mode = None
+
+    def _timed_score(self, served, build_matrix):
+        """Returns (probabilities, X, matrix build ms, predict ms)."""
+        start = time.perf_counter()
+        X = build_matrix(served)
+        built = time.perf_counter()
+        probabilities = predict_proba_matrix(served.model, X, served.feature_names)
+        return probabilities, X, (built - start) * 1000, (time.perf_counter() - built) * 1000
+
+    def _shadow(self, served, build_matrix, reference):
+        try:
+            probabilities, _, _, elapsed_ms = self._timed_score(served, build_matrix)
+            diff = float(np.abs(probabilities - reference).sum())
+            self._stats(served.version).record(elapsed_ms, len(probabilities), diff)
+        finally:
+            self._shadow_slots.release()
+
+    def score(self, build_matrix):
+        """Score with the active (or canary) model; `build_matrix(feature_names)` -> ndarray."""
+        return self._score(lambda served: build_matrix(served.feature_names))
+
+    def score_transactions(self, records, aggregates=None):
+        """
+        Score raw transaction dicts with the feature transforms bundled with each model
+        version (see transform_plan.ScoringBundle), so a canary or shadow candidate is fed
+        features built the way it was trained.
+        """
+        def build_matrix(served):
+            transform = getattr(served.model, 'transform_records', None)
+            if transform is None:
+                raise LookupError(f"Model version {served.version} has no feature transforms")
+            return transform(records, aggregates)
+
+        return self._score(build_matrix)
+
+    def has_transforms(self):
+        active = self.ensure_loaded()
+        return hasattr(active.model, 'transform_records')
+
+    def _score(self, build_matrix):
+        active = self.ensure_loaded()
+        candidate, mode = self.candidate, self.candidate_mode
+
+        served = active
+        if candidate is not None and mode == "canary" and random.random() < self.canary_fraction:
+            served = candidate
+
+        probabilities, X, build_ms, elapsed_ms = self._timed_score(served, build_matrix)
+        self._stats(served.version).record(elapsed_ms, len(probabilities))
+        if self.observer is not None:
+            self.observer(served.version, build_ms, elapsed_ms, len(probabilities))
+        if self.recorder is not None:
+            self.recorder(served, X, probabilities)
+
+        if candidate is not None and mode == "shadow":
+            if self._shadow_slots.acquire(blocking=False):
+                self._shadow_pool.submit(self._shadow, candidate, build_matrix, probabilities)
+            else:
+                self._stats(candidate.version).record_drop()
+        return probabilities
+
+    def status(self):
+        candidate = self.candidate
+        return {
+            'active_version': self.active.version if self.active else None,
+            'candidate_version': candidate.version if candidate else None,
+            'candidate_mode': self.candidate_mode if candidate else None,
+            'canary_fraction': self.canary_fraction if candidate else 0.0,
+            'latency': {v: stats.snapshot() for v, stats in list(self.latency.items())},
+        }
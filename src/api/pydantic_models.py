@@ -1,16 +1,22 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Literal, Optional
 
 
 class CustomerData(BaseModel):
+    # When the API has an aggregate store, the four customer aggregates are looked up by
+    # CustomerId and scaled with the train scaler (overriding any values sent); otherwise
+    # they must be provided.
+    # The outlier flags are sent with the other model-space features: the training bounds are
+    # in raw units, so the API derives them only for raw transactions (/score/transaction).
+    CustomerId: Optional[str] = None
     FraudResult: int
     Amount_outlier_flag: int
     Value_outlier_flag: int
     PricingStrategy_outlier_flag: int
-    total_transaction_amount: float
-    avg_transaction_amount: float
-    transaction_count: int
-    std_transaction_amount: float
+    total_transaction_amount: Optional[float] = None
+    avg_transaction_amount: Optional[float] = None
+    transaction_count: Optional[int] = None
+    std_transaction_amount: Optional[float] = None
     transaction_hour: int
     transaction_day: int
     transaction_month: int
@@ -39,5 +45,88 @@ class CustomerData(BaseModel):
     PricingStrategy: int
 
 
+# Model inputs, in schema order (CustomerId is only used for lookups)
+FEATURE_FIELDS = [name for name in CustomerData.model_fields if name != 'CustomerId']
+
+
 class RiskPrediction(BaseModel):
     risk_probability: float
+
+
+class BatchCustomerData(BaseModel):
+    """Either a list of records or columnar arrays keyed by feature name, not both."""
+    records: Optional[List[CustomerData]] = None
+    columns: Optional[Dict[str, List[float]]] = None
+    # Row-aligned with `columns`; looked up in the aggregate store like CustomerData.CustomerId
+    customer_ids: Optional[List[Optional[str]]] = None
+
+    @model_validator(mode="after")
+    def check_exactly_one_layout(self):
+        if (self.records is None) == (self.columns is None):
+            raise ValueError("Provide exactly one of 'records' or 'columns'")
+        return self
+
+    def __len__(self):
+        if self.records is not None:
+            return len(self.records)
+        return max((len(values) for values in self.columns.values()), default=0)
+
+
+class BatchRiskPrediction(BaseModel):
+    risk_probabilities: List[float]
+
+
+class ReloadRequest(BaseModel):
+    version: Optional[int] = None  # default: latest version tagged stage=production
+
+
+class CandidateRequest(BaseModel):
+    version: int
+    mode: Literal["shadow", "canary"] = "shadow"
+    fraction: float = Field(default=0.0, ge=0.0, le=1.0)  # share of traffic for canary mode
+
+
+class ModelStatus(BaseModel):
+    active_version: Optional[str]
+    candidate_version: Optional[str]
+    candidate_mode: Optional[str]
+    canary_fraction: float
+    latency: Dict[str, Dict[str, float]]
+
+
+class DriftStats(BaseModel):
+    psi: float
+    ks: float
+
+
+class DriftReport(BaseModel):
+    version: str
+    rows: int
+    features: Dict[str, DriftStats]
+    risk_probability: Optional[DriftStats] = None
+    drifted: List[str]  # PSI above drift.PSI_ALERT
+
+
+class RawTransaction(BaseModel):
+    """A transaction in the data.csv layout, featurized server-side by the transform plan."""
+    TransactionId: Optional[str] = None
+    CustomerId: str
+    ProviderId: Optional[str] = None
+    ProductCategory: Optional[str] = None
+    ChannelId: Optional[str] = None
+    Amount: Optional[float] = None
+    Value: Optional[float] = None
+    PricingStrategy: Optional[int] = None
+    TransactionStartTime: str
+    FraudResult: int = 0
+
+
+class TransactionAmount(BaseModel):
+    Amount: float
+
+
+class CustomerAggregates(BaseModel):
+    total_transaction_amount: float
+    avg_transaction_amount: float
+    transaction_count: int
+    std_transaction_amount: float
@@ -0,0 +1,130 @@
+import os
+import pandas as pd
+
+# Column dtypes shared by every pipeline stage. IDs with repeated values are categoricals,
+# flags and small codes are compact ints, and timestamps are real UTC datetimes.
+TRANSACTION_SCHEMA = {
+    'TransactionId': 'string',
+    'BatchId': 'category',
+    'AccountId': 'category',
+    'SubscriptionId': 'category',
+    'CustomerId': 'category',
+    'CurrencyCode': 'category',
+    'CountryCode': 'int16',
+    'ProviderId': 'category',
+    'ProductId': 'category',
+    'ProductCategory': 'category',
+    'ChannelId': 'category',
+    'Amount': 'float64',
+    'Value': 'int64',
+    'TransactionStartTime': 'datetime64[ns, UTC]',
+    'PricingStrategy': 'int8',
+    'FraudResult': 'int8',
+    'Amount_outlier_flag': 'int8',
+    'Value_outlier_flag': 'int8',
+    'PricingStrategy_outlier_flag': 'int8',
+    'is_high_risk': 'int8',
+}
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+
+def apply_schema(df, schema=TRANSACTION_SCHEMA):
+    """
+    Cast the columns of `df` that appear in `schema`; other columns are left alone.
+
+    Casts are only applied when they are lossless: integer targets are skipped for columns
+    that are already floats (e.g. scaled `Amount`/`Value`), and existing datetimes are kept.
+    """
+    casts = {}
+    for col, dtype in schema.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        current = df[col].dtype
+        if dtype.startswith('datetime64'):
+            if not pd.api.types.is_datetime64_any_dtype(current):
+                casts[col] = pd.to_datetime(df[col], utc=True, errors='coerce')
+        elif dtype.startswith('int') or dtype == 'float64':
+            if pd.api.types.is_integer_dtype(current) or pd.api.types.is_bool_dtype(current):
+                casts[col] = df[col].astype(dtype)
+        else:
+            casts[col] = df[col].astype(dtype)
+    return df.assign(**casts) if casts else df
+
+
+def read_table(path, columns=None, memory_map=True):
+    """
+    Read a pipeline table by file suffix: Parquet, Arrow IPC/Feather or CSV.
+
+    `columns` projects the read so only those columns are loaded. Parquet and Arrow files
+    are memory-mapped; Arrow files written uncompressed are read without copying. CSV
+    input is parsed and cast to TRANSACTION_SCHEMA so downstream code sees the same dtypes.
+    """
+    if path.endswith(PARQUET_SUFFIXES):
+        return pd.read_parquet(path, columns=columns, memory_map=memory_map)
+    if path.endswith(ARROW_SUFFIXES):
+        import pyarrow.feather as feather
+        return feather.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+    return apply_schema(pd.read_csv(path, usecols=columns))
+
+
+def iter_table_chunks(path, chunksize, columns=None):
+    """Yield DataFrames of at most `chunksize` rows, so files larger than RAM can be streamed."""
+    if path.endswith(PARQUET_SUFFIXES) or path.endswith(ARROW_SUFFIXES):
+        import pyarrow.dataset as ds
+        file_format = 'parquet' if path.endswith(PARQUET_SUFFIXES) else 'arrow'
+        dataset = ds.dataset(path, format=file_format)
+        for batch in dataset.to_batches(columns=columns, batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+            yield apply_schema(chunk)
+
+
+def write_table(df, path):
+    """Write `df` with TRANSACTION_SCHEMA dtypes in the format implied by the suffix."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df = apply_schema(df)
+    # Arrow has no sparse type, so sparse one-hot columns (--encoding sparse) are stored dense
+    sparse = [col for col in df.columns if isinstance(df[col].dtype, pd.SparseDtype)]
+    if sparse:
+        df = df.assign(**{col: df[col].sparse.to_dense() for col in sparse})
+    if path.endswith(PARQUET_SUFFIXES):
+        df.to_parquet(path, index=False)
+    elif path.endswith(ARROW_SUFFIXES):
+        # Uncompressed so readers can memory-map the buffers directly
+        df.reset_index(drop=True).to_feather(path, compression='uncompressed')
+    else:
+        df.to_csv(path, index=False)
+
+
+class ChunkWriter:
+    """Append DataFrame chunks to a CSV, Parquet or Arrow file as they arrive."""
+
+    def __init__(self, path):
+        self.path = path
+        self._arrow_writer = None
+        self._wrote_header = False
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, df):
+        if self.path.endswith(PARQUET_SUFFIXES + ARROW_SUFFIXES):
+            import pyarrow as pa
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._arrow_writer is None:
+                if self.path.endswith(PARQUET_SUFFIXES):
+                    import pyarrow.parquet as pq
+                    self._arrow_writer = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    # Uncompressed, like write_table, so readers can memory-map it
+                    self._arrow_writer = pa.ipc.new_file(self.path, table.schema)
+            self._arrow_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self._wrote_header else 'w',
+                      header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._arrow_writer is not None:
+            self._arrow_writer.close()
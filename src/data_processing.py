@@ -1,11 +1,19 @@
+import argparse
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
+from data_io import iter_table_chunks, read_table, write_table
+from feature_eng_process import OutlierFlagger
+from sketches import QuantileSketch
 
 # Load Data
-def load_data(path="data/Data/data.csv"):
-    df = pd.read_csv(path)
+def load_data(path="data/Data/data.csv", columns=None):
+    df = read_table(path, columns=columns)
     print(f"✅ Data loaded: {df.shape[0]} rows, {df.shape[1]} columns")
     return df
 
@@ -82,29 +90,31 @@ def detect_outliers(df):
         outlier_data[col] = len(outliers)
 
     return outlier_data
-def add_outlier_flags(df):
+def add_outlier_flags(df, flagger=None):
     """
-    Adds new boolean columns indicating if a value in certain numeric columns is an outlier based on IQR method.
+    Adds int8 `{col}_outlier_flag` columns for Amount, Value and PricingStrategy using the
+    IQR fences of `flagger` (an OutlierFlagger), fitting one on `df` when none is given.
     Drops 'CountryCode' column as it has no variance.
     """
     # Drop constant column
     if 'CountryCode' in df.columns:
         df = df.drop(columns=['CountryCode'])
 
-    numeric_cols = ['Amount', 'Value', 'PricingStrategy']
-    for col in numeric_cols:
-        if col in df.columns:
-            q1 = df[col].quantile(0.25)
-            q3 = df[col].quantile(0.75)
-            iqr = q3 - q1
-            lower_bound = q1 - 1.5 * iqr
-            upper_bound = q3 + 1.5 * iqr
-            
-            # Create flag column, 1 if outlier, 0 otherwise
-            flag_col = f"{col}_outlier_flag"
-            df[flag_col] = ((df[col] < lower_bound) | (df[col] > upper_bound)).astype(int)
+    if flagger is None:
+        flagger = OutlierFlagger().fit(df)
+    return flagger.transform(df)
 
-    return df
+
+def fit_outlier_flagger(path, chunksize=200_000, bounds_path=None):
+    """Learn outlier bounds from a file too large for memory, one chunk at a time."""
+    flagger = OutlierFlagger()
+    for chunk in iter_table_chunks(path, chunksize, columns=flagger.columns):
+        flagger.partial_fit(chunk)
+    if bounds_path:
+        os.makedirs(os.path.dirname(bounds_path) or '.', exist_ok=True)
+        flagger.save(bounds_path)
+        print(f"💾 Saved outlier bounds to: {bounds_path}")
+    return flagger
 
 
 def plot_boxplots(df, output_folder="notebooks/plots/boxplots/"):
@@ -120,7 +130,261 @@ def plot_boxplots(df, output_folder="notebooks/plots/boxplots/"):
         plt.close()
 
 # Save
-def save_processed_data(df, path="data/processed/data_cleaned.csv"):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    df.to_csv(path, index=False)
+def save_processed_data(df, path="data/processed/data_cleaned.parquet"):
+    write_table(df, path)
     print(f"💾 Saved cleaned data to: {path}")
+
+
+# --------- Single-pass profiling ------------
+
+def _numeric_report(count, missing, mean, std, minimum, maximum, quartiles, outliers,
+                    edges, counts):
+    q1, median, q3 = quartiles
+    iqr = q3 - q1
+    return {
+        'count': int(count), 'missing': int(missing),
+        'mean': mean, 'std': std, 'min': minimum, 'max': maximum,
+        'q25': q1, 'q50': median, 'q75': q3,
+        'iqr_lower': q1 - 1.5 * iqr, 'iqr_upper': q3 + 1.5 * iqr,
+        'outliers': int(round(outliers)),
+        'histogram': {'edges': list(edges), 'counts': [int(round(c)) for c in counts]},
+    }
+
+
+def _categorical_report(counts, missing, top_k, truncated):
+    top = counts.sort_values(ascending=False).head(top_k)
+    return {
+        'count': int(counts.sum()), 'missing': int(missing),
+        'unique': int(len(counts)), 'unique_is_lower_bound': truncated,
+        'top': {str(k): int(v) for k, v in top.items()},
+    }
+
+
+def _split_columns(df):
+    numeric = df.select_dtypes(include='number')
+    categorical = df.select_dtypes(exclude=['number', 'datetime', 'datetimetz'])
+    return numeric, categorical
+
+
+def profile_dataframe(df, bins=50, top_k=10):
+    """
+    Exact per-column profile of an in-memory frame, computed in one vectorized pass.
+
+    Numeric columns are stacked into one float matrix, so count/mean/std/min/max,
+    quartiles, IQR outlier counts and histogram bins come from a few NumPy reductions
+    instead of one rescan per statistic.
+    """
+    numeric, categorical = _split_columns(df)
+    X = numeric.to_numpy(dtype=np.float64)
+    present = ~np.isnan(X)
+    counts = present.sum(axis=0)
+    report = {'n_rows': int(len(df)), 'exact': True, 'numeric': {}, 'categorical': {}}
+
+    if X.shape[1]:
+        with warnings.catch_warnings():
+            # All-missing columns get NaN statistics, as in the streaming report
+            warnings.simplefilter('ignore', RuntimeWarning)
+            quartiles = np.nanpercentile(X, [25, 50, 75], axis=0)
+            means = np.nanmean(X, axis=0)
+            stds = np.nanstd(X, axis=0, ddof=1)
+            mins, maxs = np.nanmin(X, axis=0), np.nanmax(X, axis=0)
+        iqr = quartiles[2] - quartiles[0]
+        lower, upper = quartiles[0] - 1.5 * iqr, quartiles[2] + 1.5 * iqr
+        outliers = ((X < lower) | (X > upper)).sum(axis=0)
+
+        for j, col in enumerate(numeric.columns):
+            # An all-missing column has no range to bin
+            hist_counts, edges = np.zeros(0), np.zeros(1)
+            if counts[j]:
+                hist_counts, edges = np.histogram(X[present[:, j], j], bins=bins,
+                                                  range=(mins[j], maxs[j]))
+            report['numeric'][col] = _numeric_report(
+                counts[j], len(df) - counts[j], float(means[j]), float(stds[j]),
+                float(mins[j]), float(maxs[j]), quartiles[:, j].tolist(), outliers[j],
+                edges.tolist(), hist_counts.tolist()
+            )
+
+    for col in categorical.columns:
+        value_counts = categorical[col].value_counts(dropna=True)
+        report['categorical'][col] = _categorical_report(
+            value_counts[value_counts > 0], categorical[col].isna().sum(), top_k,
+            truncated=False
+        )
+    return report
+
+
+class StreamingProfiler:
+    """
+    Chunked version of `profile_dataframe` for files larger than RAM.
+
+    Moments are combined per chunk with Chan's parallel formula, quartiles, histogram
+    bins and outlier counts come from a QuantileSketch per column (approximate), and
+    category counts keep only the `max_tracked` most frequent values.
+    """
+
+    def __init__(self, bins=50, top_k=10, max_tracked=10_000, sketch_capacity=2048):
+        self.bins = bins
+        self.top_k = top_k
+        self.max_tracked = max_tracked
+        self.sketch_capacity = sketch_capacity
+        self.n_rows = 0
+        self.numeric = {}
+        self.categorical = {}
+
+    def update(self, chunk):
+        numeric, categorical = _split_columns(chunk)
+        self.n_rows += len(chunk)
+
+        X = numeric.to_numpy(dtype=np.float64)
+        present = ~np.isnan(X)
+        counts = present.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, np.nansum(X, axis=0) / np.maximum(counts, 1), 0.0)
+            m2s = np.nansum((X - means) ** 2, axis=0)
+
+        for j, col in enumerate(numeric.columns):
+            stats = self.numeric.setdefault(col, {
+                'count': 0, 'missing': 0, 'mean': 0.0, 'm2': 0.0,
+                'sketch': QuantileSketch(self.sketch_capacity),
+            })
+            stats['missing'] += len(chunk) - counts[j]
+            n_a, n_b = stats['count'], counts[j]
+            if n_b:
+                delta = means[j] - stats['mean']
+                n = n_a + n_b
+                stats['mean'] += delta * n_b / n
+                stats['m2'] += m2s[j] + delta ** 2 * n_a * n_b / n
+                stats['count'] = n
+                stats['sketch'].update(X[present[:, j], j])
+
+        for col in categorical.columns:
+            stats = self.categorical.setdefault(
+                col, {'counts': pd.Series(dtype=np.int64), 'missing': 0, 'truncated': False}
+            )
+            stats['missing'] += int(categorical[col].isna().sum())
+            value_counts = categorical[col].value_counts(dropna=True)
+            merged = stats['counts'].add(value_counts[value_counts > 0], fill_value=0)
+            if len(merged) > self.max_tracked:
+                merged = merged.nlargest(self.max_tracked)
+                stats['truncated'] = True
+            stats['counts'] = merged
+        return self
+
+    def report(self):
+        report = {'n_rows': self.n_rows, 'exact': False, 'numeric': {}, 'categorical': {}}
+        for col, stats in self.numeric.items():
+            sketch, count = stats['sketch'], stats['count']
+            quartiles = sketch.quantile([0.25, 0.5, 0.75]).tolist()
+            iqr = quartiles[2] - quartiles[0]
+            # cdf counts values <= x, so step just below the lower fence for "< lower"
+            lower = np.nextafter(quartiles[0] - 1.5 * iqr, -np.inf)
+            cdf = sketch.cdf([lower, quartiles[2] + 1.5 * iqr])
+            edges = np.linspace(sketch.min, sketch.max, self.bins + 1) if count else np.zeros(1)
+            bin_counts = np.diff(np.concatenate([[0.0], sketch.cdf(edges[1:])])) * count
+            report['numeric'][col] = _numeric_report(
+                count, stats['missing'], float(stats['mean']),
+                float(np.sqrt(stats['m2'] / (count - 1))) if count > 1 else float('nan'),
+                float(sketch.min), float(sketch.max), quartiles,
+                count * (cdf[0] + 1 - cdf[1]), edges.tolist(), bin_counts.tolist()
+            )
+        for col, stats in self.categorical.items():
+            report['categorical'][col] = _categorical_report(
+                stats['counts'], stats['missing'], self.top_k, stats['truncated']
+            )
+        return report
+
+
+def profile_file(path, chunksize=200_000, columns=None, **kwargs):
+    """Profile a CSV/Parquet/Arrow file chunk by chunk with bounded memory."""
+    profiler = StreamingProfiler(**kwargs)
+    for chunk in iter_table_chunks(path, chunksize, columns=columns):
+        profiler.update(chunk)
+    return profiler.report()
+
+
+def save_profile(report, path="notebooks/profile.json"):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def clean(value):
+        if isinstance(value, dict):
+            return {k: clean(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [clean(v) for v in value]
+        if isinstance(value, float) and not np.isfinite(value):
+            return None
+        return value
+
+    with open(path, "w") as f:
+        json.dump(clean(report), f, indent=2)
+    print(f"💾 Saved profile report to: {path}")
+
+
+def _render_plot(task):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    kind, col, stats, output_folder = task
+    fig, ax = plt.subplots(figsize=(6, 4))
+    if kind == 'hist':
+        hist = stats['histogram']
+        ax.stairs(hist['counts'], hist['edges'], fill=True)
+        ax.set_title(f'Distribution of {col}')
+        ax.set_xlabel(col)
+        ax.set_ylabel("Frequency")
+        path = f"{output_folder}{col}_hist.png"
+    elif kind == 'box':
+        ax.bxp([{
+            'med': stats['q50'], 'q1': stats['q25'], 'q3': stats['q75'],
+            'whislo': max(stats['min'], stats['iqr_lower']),
+            'whishi': min(stats['max'], stats['iqr_upper']), 'fliers': [],
+        }], vert=False, showfliers=False)
+        ax.set_title(f'Boxplot of {col}')
+        path = f"{output_folder}boxplots/{col}_boxplot.png"
+    else:
+        ax.bar(list(stats['top']), list(stats['top'].values()))
+        ax.set_title(f'Top {len(stats["top"])} Categories in {col}')
+        ax.set_ylabel("Frequency")
+        ax.tick_params(axis='x', rotation=45)
+        path = f"{output_folder}{col}_bar.png"
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def render_profile_plots(report, output_folder="notebooks/plots/", n_jobs=4):
+    """Render histogram, boxplot and bar charts from a profile report, in parallel."""
+    os.makedirs(os.path.join(output_folder, "boxplots"), exist_ok=True)
+    tasks = []
+    for col, stats in report['numeric'].items():
+        if stats['count']:
+            tasks += [('hist', col, stats, output_folder), ('box', col, stats, output_folder)]
+    for col, stats in report['categorical'].items():
+        tasks.append(('bar', col, stats, output_folder))
+
+    if n_jobs <= 1:
+        return [_render_plot(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return list(pool.map(_render_plot, tasks))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile a transactions file")
+    parser.add_argument("path", nargs='?', default="data/Data/data.csv")
+    parser.add_argument("--report", default="notebooks/profile.json")
+    parser.add_argument("--plots", default="notebooks/plots/")
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    parser.add_argument("--bins", type=int, default=50)
+    parser.add_argument("--n-jobs", type=int, default=4)
+    parser.add_argument("--outlier-bounds", default=None,
+                        help="also stream-fit the outlier flag bounds and save them here")
+    args = parser.parse_args()
+
+    profile = profile_file(args.path, chunksize=args.chunksize, bins=args.bins)
+    save_profile(profile, args.report)
+    paths = render_profile_plots(profile, args.plots, n_jobs=args.n_jobs)
+    print(f"📊 Rendered {len(paths)} plots to: {args.plots}")
+
+    if args.outlier_bounds:
+        fit_outlier_flagger(args.path, chunksize=args.chunksize, bounds_path=args.outlier_bounds)
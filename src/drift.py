@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_io import iter_table_chunks
+from transform_plan import BUNDLE_SUBDIR, FeatureTransforms
+
+# Stored inside the MLflow model directory as an extra file (see train.py)
+DRIFT_FILENAME = "drift_reference.json"
+SCORE_NAME = "risk_probability"
+SCORE_EDGES = np.linspace(0.1, 0.9, 9)
+EPS = 1e-4
+# Usual PSI reading: < 0.1 stable, 0.1-0.2 moderate shift, > 0.2 significant shift
+PSI_ALERT = 0.2
+
+
+class HistogramSet:
+    """
+    Fixed-bin histograms for several columns, counted with one vectorized pass.
+
+    Column j has bins (-inf, e0), [e0, e1), ..., [ek, inf) over its inner edges plus a last
+    bin for NaN. Edges are padded with +inf to a common width, so a block of rows is binned
+    with one broadcast comparison and one bincount.
+    """
+
+    def __init__(self, edges):
+        self.width = max((len(e) for e in edges), default=0)
+        self.edges = np.full((len(edges), self.width), np.inf)
+        for j, column_edges in enumerate(edges):
+            self.edges[j, :len(column_edges)] = column_edges
+        self.n_bins = self.width + 2
+
+    @classmethod
+    def from_quantiles(cls, X, n_bins=10):
+        """Inner edges at the training quantiles (deduplicated, so binary columns get 2 bins)."""
+        X = np.asarray(X, dtype=np.float64)
+        qs = np.linspace(0, 1, n_bins + 1)[1:-1]
+        edges = []
+        for j in range(X.shape[1]):
+            column = X[:, j][~np.isnan(X[:, j])]
+            edges.append(np.unique(np.quantile(column, qs)) if len(column) else np.array([]))
+        return cls(edges)
+
+    def counts(self, X, block_rows=8192):
+        """(n_columns, n_bins) int64 counts of the rows of X."""
+        X = np.asarray(X, dtype=np.float64).reshape(len(X), -1)
+        n_columns = X.shape[1]
+        offsets = np.arange(n_columns) * self.n_bins
+        counts = np.zeros(n_columns * self.n_bins, dtype=np.int64)
+        # Blocks bound the (rows, columns, edges) comparison array for large batches
+        for start in range(0, len(X), block_rows):
+            block = X[start:start + block_rows]
+            bins = (block[:, :, None] >= self.edges[None, :, :]).sum(axis=2)
+            bins[np.isnan(block)] = self.n_bins - 1
+            counts += np.bincount((bins + offsets).ravel(), minlength=len(counts))
+        return counts.reshape(n_columns, self.n_bins)
+
+    def column_edges(self):
+        return [row[np.isfinite(row)].tolist() for row in self.edges]
+
+
+def psi(expected, actual, eps=EPS):
+    """Population stability index between two count vectors over the same bins."""
+    e = np.asarray(expected, dtype=np.float64)
+    a = np.asarray(actual, dtype=np.float64)
+    e = e / max(e.sum(), 1) + eps
+    a = a / max(a.sum(), 1) + eps
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov statistic on the binned CDFs of non-missing values."""
+    e = np.cumsum(expected[:-1], dtype=np.float64)
+    a = np.cumsum(actual[:-1], dtype=np.float64)
+    if e[-1] == 0 or a[-1] == 0:
+        return 0.0
+    return float(np.max(np.abs(e / e[-1] - a / a[-1])))
+
+
+class DriftReference:
+    """
+    Training-time histograms of every model input feature and of the predicted
+    risk_probability. `compare` turns live or batch counts into per-feature PSI/KS.
+    """
+
+    def __init__(self, feature_names, features, feature_counts, scores, score_counts):
+        self.feature_names = list(feature_names)
+        self.features = features
+        self.feature_counts = np.asarray(feature_counts, dtype=np.int64)
+        self.scores = scores
+        self.score_counts = np.asarray(score_counts, dtype=np.int64)
+
+    @classmethod
+    def from_training(cls, X, scores, n_bins=10):
+        """`X` is the matrix the model was fitted on, `scores` its P(high risk) on X."""
+        feature_names = [str(c) for c in getattr(X, 'columns', range(np.shape(X)[1]))]
+        X = np.asarray(X, dtype=np.float64)
+        features = HistogramSet.from_quantiles(X, n_bins)
+        scores_hist = HistogramSet([SCORE_EDGES])
+        return cls(feature_names, features, features.counts(X), scores_hist,
+                   scores_hist.counts(np.asarray(scores, dtype=np.float64).reshape(-1, 1))[0])
+
+    def compare(self, feature_counts, score_counts=None):
+        rows = int(np.asarray(feature_counts)[0].sum()) if len(self.feature_names) else 0
+        report = {'rows': rows, 'features': {}}
+        for j, name in enumerate(self.feature_names):
+            report['features'][name] = {'psi': psi(self.feature_counts[j], feature_counts[j]),
+                                        'ks': ks(self.feature_counts[j], feature_counts[j])}
+        if score_counts is not None and np.sum(score_counts) > 0:
+            report[SCORE_NAME] = {'psi': psi(self.score_counts, score_counts),
+                                  'ks': ks(self.score_counts, score_counts)}
+        report['drifted'] = [name for name, stats in report['features'].items()
+                             if stats['psi'] > PSI_ALERT]
+        if SCORE_NAME in report and report[SCORE_NAME]['psi'] > PSI_ALERT:
+            report['drifted'].append(SCORE_NAME)
+        return report
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                'feature_names': self.feature_names,
+                'feature_edges': self.features.column_edges(),
+                'feature_counts': self.feature_counts.tolist(),
+                'score_edges': self.scores.column_edges()[0],
+                'score_counts': self.score_counts.tolist(),
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        features = HistogramSet([np.asarray(e) for e in data['feature_edges']])
+        scores = HistogramSet([np.asarray(data['score_edges'])])
+        return cls(data['feature_names'], features, data['feature_counts'], scores,
+                   data['score_counts'])
+
+
+def attach_reference(model, model_dir):
+    """Set `drift_reference_` on `model` when its MLflow directory carries one."""
+    path = os.path.join(model_dir, BUNDLE_SUBDIR, DRIFT_FILENAME)
+    if os.path.exists(path):
+        model.drift_reference_ = DriftReference.load(path)
+    return model
+
+
+class DriftMonitor:
+    """
+    Live feature/score histograms for one model version, in constant memory.
+
+    Each scoring thread counts into its own buffer (created once per thread, no lock on the
+    update path); `report` merges the buffers and compares them with the reference.
+    `columns` are the positions of the reference features in the matrices passed to
+    `update`, when those are in a different order.
+    """
+
+    def __init__(self, reference, columns=None):
+        self.reference = reference
+        self.columns = columns
+        self._local = threading.local()
+        self._buffers = []
+        self._lock = threading.Lock()
+
+    def _buffer(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = [
+                np.zeros_like(self.reference.feature_counts),
+                np.zeros_like(self.reference.score_counts),
+            ]
+            with self._lock:
+                self._buffers.append(buffer)
+        return buffer
+
+    def update(self, X, scores=None):
+        """Count a scored matrix (columns in reference.feature_names order)."""
+        buffer = self._buffer()
+        if self.columns is not None:
+            X = np.asarray(X)[:, self.columns]
+        buffer[0] += self.reference.features.counts(X)
+        if scores is not None:
+            scores = np.asarray(scores, dtype=np.float64).reshape(-1, 1)
+            buffer[1] += self.reference.scores.counts(scores)[0]
+
+    def merged(self):
+        with self._lock:
+            buffers = list(self._buffers)
+        features = np.zeros_like(self.reference.feature_counts)
+        scores = np.zeros_like(self.reference.score_counts)
+        for feature_counts, score_counts in buffers:
+            features += feature_counts
+            scores += score_counts
+        return features, scores
+
+    def report(self):
+        return self.reference.compare(*self.merged())
+
+
+def drift_report_file(path, reference, chunksize=200_000, model=None, transforms=None):
+    """
+    Offline counterpart of the API monitor: bin a batch file chunk by chunk against the
+    reference. The reference is in the model's input space (train-scaled), so pipeline
+    output columns are scaled with `transforms` (a FeatureTransforms; a bundled `model` is
+    used by default) first; without transforms the file must already be in that space.
+    Scores come from a `risk_probability` column, or from `model` when given.
+    """
+    if transforms is None and hasattr(model, 'transform_frame'):
+        transforms = model
+    monitor = DriftMonitor(reference)
+    for chunk in iter_table_chunks(path, chunksize):
+        features = chunk
+        if transforms is not None:
+            features = pd.DataFrame(transforms.transform_frame(chunk), index=chunk.index,
+                                    columns=list(transforms.feature_names_in_))
+        features = features[reference.feature_names]
+        scores = None
+        if SCORE_NAME in chunk.columns:
+            scores = chunk[SCORE_NAME].to_numpy(np.float64)
+        elif model is not None:
+            scores = model.predict_proba(features)[:, 1]
+        monitor.update(features.to_numpy(np.float64), scores)
+    return monitor.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PSI/KS drift of a batch file vs training")
+    parser.add_argument("path", help="CSV/Parquet/Arrow file with the model's input features")
+    parser.add_argument("--reference", required=True,
+                        help=f"{DRIFT_FILENAME} (in the model's extra_files folder)")
+    parser.add_argument("--model-dir", default=None,
+                        help="score the file with this MLflow model when it has no "
+                             f"{SCORE_NAME} column")
+    parser.add_argument("--bundle", default=None,
+                        help="feature bundle folder with the train scaler (default: the "
+                             "model's bundle, else the reference's folder)")
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    parser.add_argument("--out", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    model = None
+    if args.model_dir:
+        from model_loader import load_local_model
+        model = load_local_model(args.model_dir)
+    transforms = None
+    if args.bundle:
+        transforms = FeatureTransforms.load(args.bundle)
+        if transforms is None:
+            parser.error(f"{args.bundle} is not a feature bundle folder")
+    elif not hasattr(model, 'transform_frame'):
+        transforms = FeatureTransforms.load(os.path.dirname(os.path.abspath(args.reference)))
+        if transforms is None:
+            print("⚠️ No train scaler found; the file must already be in model input space")
+    report = drift_report_file(args.path, DriftReference.load(args.reference),
+                               chunksize=args.chunksize, model=model, transforms=transforms)
+
+    print(f"{'feature':<40}{'psi':>10}{'ks':>10}")
+    rows = list(report['features'].items())
+    if SCORE_NAME in report:
+        rows.append((SCORE_NAME, report[SCORE_NAME]))
+    for name, stats in rows:
+        print(f"{name:<40}{stats['psi']:>10.4f}{stats['ks']:>10.4f}")
+    print(f"⚠️ Drifted (PSI > {PSI_ALERT}): {report['drifted']}" if report['drifted']
+          else f"✅ No feature drifted past PSI {PSI_ALERT} over {report['rows']:,} rows")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
@@ -1,9 +1,16 @@
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.impute import SimpleImputer
+from data_io import read_table, write_table
+from sketches import QuantileSketch
 
 # --------- Custom Transformers ------------
 
@@ -36,13 +43,199 @@ class DatetimeFeatures(BaseEstimator, TransformerMixin):
 
     def transform(self, X):
         X = X.copy()
-        X[self.datetime_col] = pd.to_datetime(X[self.datetime_col], errors='coerce')
+        if not pd.api.types.is_datetime64_any_dtype(X[self.datetime_col]):
+            X[self.datetime_col] = pd.to_datetime(X[self.datetime_col], errors='coerce')
         X['transaction_hour'] = X[self.datetime_col].dt.hour
         X['transaction_day'] = X[self.datetime_col].dt.day
         X['transaction_month'] = X[self.datetime_col].dt.month
         X['transaction_year'] = X[self.datetime_col].dt.year
         return X
 
+
+def window_timedelta(window):
+    """'1h', '24h', '7d' -> Timedelta (pandas deprecates the lowercase day unit)."""
+    if isinstance(window, str) and window.endswith('d'):
+        window = window[:-1] + 'D'
+    return pd.Timedelta(window)
+
+
+def rolling_window_sums(codes, ticks, amounts, window_ticks):
+    """
+    Count and amount sum of each row's earlier transactions within [t - w, t) per group.
+
+    `codes` are integer group ids, `ticks` integer timestamps and `window_ticks` window
+    lengths in the same unit. One lexsort by (group, time); groups are then laid end to end
+    on a single increasing key, so every window bound of every row is found by one
+    vectorized searchsorted and read off prefix sums. Rows at the same timestamp as t
+    (including the row itself) are excluded. Returns (counts, sums) of shape
+    (n_rows, n_windows) in input order.
+    """
+    n = len(codes)
+    counts = np.zeros((n, len(window_ticks)), dtype=np.int64)
+    sums = np.zeros((n, len(window_ticks)), dtype=np.float64)
+    if n == 0:
+        return counts, sums
+
+    order = np.lexsort((ticks, codes))
+    t = ticks[order] - ticks.min()
+    span = int(t.max()) + max(window_ticks) + 1
+    if (int(codes.max()) + 1) * span >= np.iinfo(np.int64).max // 2:
+        raise OverflowError("Too many groups for this time resolution; use a coarser "
+                            "resolution or more partitions")
+    key = codes[order].astype(np.int64) * span + t
+    cumulative = np.concatenate([[0.0], np.cumsum(np.nan_to_num(amounts[order]))])
+
+    end = np.searchsorted(key, key, side='left')
+    for j, window in enumerate(window_ticks):
+        start = np.searchsorted(key, key - window, side='left')
+        counts[order, j] = end - start
+        sums[order, j] = cumulative[end] - cumulative[start]
+    return counts, sums
+
+
+ROLLING_COLUMN = re.compile(r"(transaction_count|total_transaction_amount)_\d+[a-zA-Z]+$")
+
+
+def rolling_window_columns(columns):
+    """Columns added by RollingWindowFeatures (`transaction_count_1h`, ...)."""
+    return [col for col in columns if ROLLING_COLUMN.match(str(col))]
+
+
+class RollingWindowFeatures(BaseEstimator, TransformerMixin):
+    """
+    Point-in-time velocity features: per customer, the number and total Amount of earlier
+    transactions in each window ([t - w, t), so a row never sees itself or its future).
+    For offline analysis: the transform plan cannot compile them, so models are not
+    trained on them (see train.preprocess).
+
+    Adds `transaction_count_{w}` and `total_transaction_amount_{w}` per window. Stateless:
+    `transform` uses the history contained in X, so score new transactions together with
+    the customer's recent ones. Times are bucketed to `resolution`. With n_jobs > 1,
+    customers are hashed into partitions that are computed on a process pool.
+    """
+
+    def __init__(self, group_col='CustomerId', datetime_col='TransactionStartTime',
+                 amount_col='Amount', windows=('1h', '24h', '7d'), resolution='1s',
+                 n_jobs=1, n_partitions=None):
+        self.group_col = group_col
+        self.datetime_col = datetime_col
+        self.amount_col = amount_col
+        self.windows = windows
+        self.resolution = resolution
+        self.n_jobs = n_jobs
+        self.n_partitions = n_partitions
+
+    def fit(self, X, y=None):
+        return self
+
+    def _inputs(self, X):
+        times = X[self.datetime_col]
+        if not pd.api.types.is_datetime64_any_dtype(times):
+            times = pd.to_datetime(times, errors='coerce')
+        if times.dt.tz is not None:
+            times = times.dt.tz_convert(None)
+        tick = pd.Timedelta(self.resolution).value
+        ticks = times.to_numpy('datetime64[ns]').view(np.int64) // tick
+        codes = pd.factorize(X[self.group_col])[0]
+        valid = times.notna().to_numpy() & (codes >= 0)
+        window_ticks = [max(1, window_timedelta(w).value // tick) for w in self.windows]
+        amounts = X[self.amount_col].to_numpy(np.float64)
+        return valid, codes, ticks, amounts, window_ticks
+
+    def transform(self, X):
+        valid, codes, ticks, amounts, window_ticks = self._inputs(X)
+        counts = np.zeros((len(X), len(window_ticks)), dtype=np.int64)
+        sums = np.zeros((len(X), len(window_ticks)), dtype=np.float64)
+
+        rows = np.flatnonzero(valid)
+        n_partitions = self.n_partitions or (self.n_jobs if self.n_jobs > 1 else 1)
+        if n_partitions <= 1:
+            parts = [rows]
+        else:
+            # Whole customers per partition, so every window is complete within one part
+            partition = codes[rows] % n_partitions
+            parts = [rows[partition == p] for p in range(n_partitions)]
+        tasks = [(np.unique(codes[part], return_inverse=True)[1], ticks[part], amounts[part],
+                  window_ticks) for part in parts]
+
+        if self.n_jobs > 1 and len(parts) > 1:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
+                results = list(pool.map(rolling_window_sums, *zip(*tasks)))
+        else:
+            results = [rolling_window_sums(*task) for task in tasks]
+        for part, (part_counts, part_sums) in zip(parts, results):
+            counts[part], sums[part] = part_counts, part_sums
+
+        X = X.copy()
+        for j, window in enumerate(self.windows):
+            X[f'transaction_count_{window}'] = counts[:, j]
+            X[f'total_transaction_amount_{window}'] = sums[:, j]
+        return X
+
+
+class OutlierFlagger(BaseEstimator, TransformerMixin):
+    """
+    Adds `{col}_outlier_flag` int8 columns for values outside the IQR fences.
+
+    The fences (q1 - whisker * iqr, q3 + whisker * iqr) are learned once by `fit`, or
+    folded in chunk by chunk with `partial_fit` through a QuantileSketch per column, and
+    then reused as-is, so training, batch scoring and single API records share the same
+    definition of an outlier. `save`/`load` keep the bounds as JSON.
+    """
+
+    def __init__(self, columns=('Amount', 'Value', 'PricingStrategy'), whisker=1.5,
+                 sketch_capacity=2048):
+        self.columns = columns
+        self.whisker = whisker
+        self.sketch_capacity = sketch_capacity
+        self.bounds_ = {}
+        self.sketches_ = {}
+
+    def _set_bounds(self, col, q1, q3):
+        iqr = q3 - q1
+        self.bounds_[col] = (float(q1 - self.whisker * iqr), float(q3 + self.whisker * iqr))
+
+    def fit(self, X, y=None):
+        columns = [col for col in self.columns if col in X.columns]
+        q1, q3 = np.nanpercentile(X[columns].to_numpy(np.float64), [25, 75], axis=0)
+        self.bounds_ = {}
+        self.sketches_ = {}
+        for j, col in enumerate(columns):
+            self._set_bounds(col, q1[j], q3[j])
+        return self
+
+    def partial_fit(self, X, y=None):
+        for col in self.columns:
+            if col in X.columns:
+                sketch = self.sketches_.setdefault(col, QuantileSketch(self.sketch_capacity))
+                sketch.update(X[col].to_numpy(np.float64))
+                self._set_bounds(col, *sketch.quantile([0.25, 0.75]))
+        return self
+
+    def flags(self, values, columns=None):
+        """int8 flags for a 2-D array whose columns are `columns` (default: all bounds)."""
+        columns = list(self.bounds_) if columns is None else columns
+        lower, upper = np.array([self.bounds_[col] for col in columns]).reshape(-1, 2).T
+        values = np.asarray(values, dtype=np.float64)
+        return ((values < lower) | (values > upper)).astype(np.int8)
+
+    def transform(self, X):
+        columns = [col for col in self.bounds_ if col in X.columns]
+        flags = self.flags(X[columns].to_numpy(np.float64), columns)
+        return X.assign(**{f"{col}_outlier_flag": flags[:, j] for j, col in enumerate(columns)})
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({'whisker': self.whisker, 'bounds': self.bounds_}, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        flagger = cls(columns=list(data['bounds']), whisker=data['whisker'])
+        flagger.bounds_ = {col: tuple(bounds) for col, bounds in data['bounds'].items()}
+        return flagger
+
 class CategoricalImputer(BaseEstimator, TransformerMixin):
     def __init__(self, categorical_cols):
         self.categorical_cols = categorical_cols
@@ -60,23 +253,98 @@ class CategoricalImputer(BaseEstimator, TransformerMixin):
         return X
 
 class CategoricalEncoder(BaseEstimator, TransformerMixin):
-    def __init__(self, categorical_cols):
+    """
+    One-hot or ordinal encoding of `categorical_cols`.
+
+    output='dense'  - float64 one-hot columns (default)
+    output='sparse' - one-hot columns backed by pandas SparseDtype (uint8), built straight
+                      from the encoder's CSR matrix; `transform_sparse` returns the matrix.
+                      Only this stage is sparse: write_table stores the columns dense and
+                      train.preprocess centers them, so estimators are fitted dense
+    output='codes'  - each column replaced in place by its category code in the smallest
+                      signed int dtype that holds it (-1 for unseen values), no extra
+                      columns and no concat copy
+    """
+
+    def __init__(self, categorical_cols, output='dense'):
         self.categorical_cols = categorical_cols
-        self.ohe = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
+        self.output = output
 
     def fit(self, X, y=None):
+        if self.output not in ('dense', 'sparse', 'codes'):
+            raise ValueError(f"Unknown output '{self.output}'")
+        self.ohe = OneHotEncoder(
+            handle_unknown='ignore',
+            sparse_output=self.output == 'sparse',
+            dtype=np.uint8 if self.output == 'sparse' else np.float64,
+        )
         self.ohe.fit(X[self.categorical_cols])
         return self
 
+    def transform_sparse(self, X):
+        """CSR one-hot matrix for the categorical columns, for models that take scipy input."""
+        return self.ohe.transform(X[self.categorical_cols])
+
+    def _transform_codes(self, X):
+        codes = {}
+        for col, categories in zip(self.categorical_cols, self.ohe.categories_):
+            # Signed and wide enough for -1 and the largest code, len(categories) - 1
+            dtype = np.min_scalar_type(-max(len(categories), 1))
+            codes[col] = pd.Index(categories).get_indexer(X[col]).astype(dtype)
+        return X.assign(**codes)
+
     def transform(self, X):
+        if self.output == 'codes':
+            return self._transform_codes(X)
+
+        columns = self.ohe.get_feature_names_out(self.categorical_cols)
+        if self.output == 'sparse':
+            ohe_df = pd.DataFrame.sparse.from_spmatrix(
+                self.transform_sparse(X), index=X.index, columns=columns
+            )
+            return X.drop(columns=self.categorical_cols).join(ohe_df)
+
         ohe_array = self.ohe.transform(X[self.categorical_cols])
-        ohe_df = pd.DataFrame(ohe_array, columns=self.ohe.get_feature_names_out(self.categorical_cols))
+        ohe_df = pd.DataFrame(ohe_array, columns=columns)
         ohe_df.index = X.index
         X = X.drop(columns=self.categorical_cols)
         X = pd.concat([X, ohe_df], axis=1)
         return X
 
 
+class WOEEncoder(BaseEstimator, TransformerMixin):
+    """
+    Replace each categorical column by its weight of evidence against `target_col`.
+
+    Fitted maps are stored as a sorted category array plus a float32 WOE array per column;
+    transform looks codes up with one vectorized index operation. Categories not seen
+    during fit get WOE 0 (no evidence either way).
+    """
+
+    def __init__(self, categorical_cols, target_col='FraudResult', eps=0.0001):
+        self.categorical_cols = categorical_cols
+        self.target_col = target_col
+        self.eps = eps
+        self.categories_ = {}
+        self.woe_values_ = {}
+
+    def fit(self, X, y=None):
+        df = X if y is None else X.assign(**{self.target_col: np.asarray(y)})
+        for col in self.categorical_cols:
+            table = calculate_woe_table(df, col, target_col=self.target_col, eps=self.eps)
+            self.categories_[col] = pd.Index(table.index)
+            # Trailing 0 is picked up by the -1 code of unseen categories
+            self.woe_values_[col] = np.append(table['woe'].to_numpy(np.float32), np.float32(0))
+        return self
+
+    def transform(self, X):
+        encoded = {}
+        for col in self.categorical_cols:
+            codes = self.categories_[col].get_indexer(X[col])
+            encoded[col] = self.woe_values_[col][codes]
+        return X.assign(**encoded)
+
+
 class NumericImputerScaler(BaseEstimator, TransformerMixin):
     def __init__(self, numeric_cols):
         self.numeric_cols = numeric_cols
@@ -89,6 +357,10 @@ class NumericImputerScaler(BaseEstimator, TransformerMixin):
         self.scaler.fit(X_imputed)
         return self
 
+    def __sklearn_is_fitted__(self):
+        # Lets a fitted Pipeline ending in this step be reused via `transform`
+        return hasattr(self.scaler, 'mean_')
+
     def transform(self, X):
         X_num = X[self.numeric_cols]
         X_imputed = self.imputer.transform(X_num)
@@ -100,40 +372,80 @@ class NumericImputerScaler(BaseEstimator, TransformerMixin):
 
 # --------- WOE/IV Calculation ------------
 
-def calculate_woe_iv(df, categorical_cols, target_col='FraudResult'):
+
+def calculate_woe_table(df, col, target_col='FraudResult', bins=None, eps=0.0001):
+    """
+    Per-bin WOE/IV table for one column, computed in a single groupby pass.
+
+    Numeric columns with more than `bins` distinct values are quantile-binned first.
+    WOE is ln(dist_good / dist_bad) with `eps` smoothing, as before; rows where `col`
+    is missing count towards the class totals but not towards any bin.
+    """
+    values = df[col]
+    if bins is not None and pd.api.types.is_numeric_dtype(values) and values.nunique() > bins:
+        values = pd.qcut(values, q=bins, duplicates='drop')
+
+    target = df[target_col]
+    outcomes = pd.DataFrame({'good': target.eq(0), 'bad': target.eq(1)})
+    table = outcomes.groupby(values, observed=True, sort=True).sum()
+    table.index.name = col
+
+    table['count'] = table['good'] + table['bad']
+    table['dist_good'] = table['good'] / max(1, int(outcomes['good'].sum()))
+    table['dist_bad'] = table['bad'] / max(1, int(outcomes['bad'].sum()))
+    table['woe'] = np.log((table['dist_good'] + eps) / (table['dist_bad'] + eps))
+    table['iv'] = (table['dist_good'] - table['dist_bad']) * table['woe']
+    return table[['count', 'good', 'bad', 'dist_good', 'dist_bad', 'woe', 'iv']]
+
+
+def calculate_woe_iv(df, categorical_cols, target_col='FraudResult', bins=None,
+                     return_tables=False):
     iv_dict = {}
-    eps = 0.0001  # To prevent division by zero
+    tables = {}
 
     for col in categorical_cols:
-        lst = []
-        for val in df[col].unique():
-            total = len(df[df[col] == val])
-            good = len(df[(df[col] == val) & (df[target_col] == 0)])
-            bad = len(df[(df[col] == val) & (df[target_col] == 1)])
-            dist_good = good / max(1, len(df[df[target_col] == 0]))
-            dist_bad = bad / max(1, len(df[df[target_col] == 1]))
-
-            woe = np.log((dist_good + eps) / (dist_bad + eps))
-            iv = (dist_good - dist_bad) * woe
-            lst.append(iv)
-
-        iv_total = sum(lst)
+        table = calculate_woe_table(df, col, target_col=target_col, bins=bins)
+        iv_total = table['iv'].sum()
         iv_dict[col] = iv_total
+        tables[col] = table
         print(f"Feature: {col}, IV: {iv_total:.4f}")
 
+    if return_tables:
+        return iv_dict, tables
     return iv_dict
 
 # --------- Pipeline Builder -----------
 
-def build_feature_engineering_pipeline():
+
+def build_feature_engineering_pipeline(categorical_encoding='onehot', rolling_windows=None,
+                                       n_jobs=1):
+    """
+    `categorical_encoding` is 'onehot' (dense), 'sparse' (sparse one-hot), 'codes'
+    (int category codes) or 'woe' (WOEEncoder). `rolling_windows` (e.g. ['1h', '24h', '7d'])
+    adds point-in-time RollingWindowFeatures, computed on `n_jobs` processes.
+    """
     categorical_cols = ['ProductCategory', 'ChannelId', 'ProviderId']
     numeric_cols = ['Amount', 'Value', 'PricingStrategy']
 
-    pipeline = Pipeline([
-        ('aggregate_features', AggregateFeatures(group_col='CustomerId')),
+    encoder_outputs = {'onehot': 'dense', 'sparse': 'sparse', 'codes': 'codes'}
+    if categorical_encoding == 'woe':
+        encoder = WOEEncoder(categorical_cols=categorical_cols, target_col='FraudResult')
+    elif categorical_encoding in encoder_outputs:
+        encoder = CategoricalEncoder(
+            categorical_cols=categorical_cols, output=encoder_outputs[categorical_encoding]
+        )
+    else:
+        raise ValueError(f"Unknown categorical_encoding '{categorical_encoding}'")
+
+    steps = [('aggregate_features', AggregateFeatures(group_col='CustomerId'))]
+    if rolling_windows:
+        steps.append(('rolling_features', RollingWindowFeatures(
+            group_col='CustomerId', datetime_col='TransactionStartTime',
+            windows=tuple(rolling_windows), n_jobs=n_jobs)))
+    pipeline = Pipeline(steps + [
         ('datetime_features', DatetimeFeatures(datetime_col='TransactionStartTime')),
         ('cat_imputer', CategoricalImputer(categorical_cols=categorical_cols)),
-        ('cat_encoder', CategoricalEncoder(categorical_cols=categorical_cols)),
+        ('cat_encoder', encoder),
         ('num_imputer_scaler', NumericImputerScaler(numeric_cols=numeric_cols)),
     ])
 
@@ -142,13 +454,31 @@ def build_feature_engineering_pipeline():
 # --------- Example usage -----------
 
 if __name__ == "__main__":
-    df = pd.read_csv('data/processed/data_cleaned.csv')
-
-    pipeline = build_feature_engineering_pipeline()
+    parser = argparse.ArgumentParser(description="Fit the feature engineering pipeline")
+    parser.add_argument("--encoding", choices=['onehot', 'sparse', 'codes', 'woe'],
+                        default='onehot',
+                        help="how ProductCategory, ChannelId and ProviderId are encoded")
+    parser.add_argument("--pipeline-out", default="models/feature_pipeline.joblib")
+    parser.add_argument("--rolling-windows", nargs='+', default=None,
+                        help="point-in-time velocity windows, e.g. 1h 24h 7d (analysis only; "
+                             "training rejects them since they cannot be served)")
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args()
+
+    import joblib
+    # Build through the module so the pickle references feature_eng_process, not __main__
+    from feature_eng_process import build_feature_engineering_pipeline as build_pipeline
+
+    df = read_table('data/processed/data_cleaned.parquet')
+
+    pipeline = build_pipeline(categorical_encoding=args.encoding,
+                              rolling_windows=args.rolling_windows, n_jobs=args.n_jobs)
     df_transformed = pipeline.fit_transform(df)
+    os.makedirs(os.path.dirname(args.pipeline_out) or '.', exist_ok=True)
+    joblib.dump(pipeline, args.pipeline_out)
 
     # Calculate IV before encoding
     iv_scores = calculate_woe_iv(df, categorical_cols=['ProductCategory', 'ChannelId', 'ProviderId'], target_col='FraudResult')
 
-    df_transformed.to_csv('data/processed/feature_engineered_data.csv', index=False)
-    print("✅ Saved feature engineered data to '../data/processed/feature_engineered_data.csv'")
+    write_table(df_transformed, 'data/processed/feature_engineered_data.parquet')
+    print("✅ Saved feature engineered data to 'data/processed/feature_engineered_data.parquet'")
@@ -0,0 +1,196 @@
+import argparse
+
+import numpy as np
+
+# Rows scored per block; bounds the (rows x trees) traversal buffers
+BLOCK_SIZE = 4096
+
+
+class CompiledModel:
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+class CompiledForest(CompiledModel):
+    """
+    A RandomForestClassifier flattened into packed NumPy arrays.
+
+    All trees share one node table: `feature`, `threshold`, `left`, `right`, `missing_left`
+    and per-node class probabilities `leaf_value`. Leaves point to themselves, so every row
+    can be walked `max_depth` steps through all trees at once with plain array indexing.
+    """
+
+    kind = "forest"
+
+    def __init__(self, feature, threshold, left, right, missing_left, leaf_value, roots,
+                 max_depth, classes, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n) + offset
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            missing_go_left = getattr(tree, "missing_go_to_left", np.zeros(n, dtype=np.uint8))
+            missing.append(np.asarray(missing_go_left, dtype=bool))
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer[:, None])
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            missing_left=np.concatenate(missing),
+            leaf_value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            classes=np.asarray(forest.classes_),
+            feature_names=getattr(forest, "feature_names_in_", None),
+        )
+
+    def _predict_block(self, X):
+        node = np.broadcast_to(self.roots, (X.shape[0], self.roots.size)).copy()
+        for _ in range(self.max_depth):
+            x = np.take_along_axis(X, self.feature[node], axis=1)
+            go_left = (x <= self.threshold[node]) | (np.isnan(x) & self.missing_left[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        # Accumulate tree by tree, like the forest does, so results match bit for bit
+        proba = np.zeros((X.shape[0], self.leaf_value.shape[1]))
+        for t in range(node.shape[1]):
+            proba += self.leaf_value[node[:, t]]
+        return proba / node.shape[1]
+
+    def predict_proba(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[0] <= BLOCK_SIZE:
+            return self._predict_block(X)
+        return np.vstack([self._predict_block(X[i:i + BLOCK_SIZE])
+                          for i in range(0, X.shape[0], BLOCK_SIZE)])
+
+    def arrays(self):
+        return {
+            'feature': self.feature, 'threshold': self.threshold, 'left': self.left,
+            'right': self.right, 'missing_left': self.missing_left,
+            'leaf_value': self.leaf_value, 'roots': self.roots,
+            'max_depth': np.asarray(self.max_depth), 'classes': self.classes_,
+        }
+
+
+class CompiledLogistic(CompiledModel):
+    """A binary LogisticRegression reduced to its coefficient vector and intercept."""
+
+    kind = "logistic"
+
+    def __init__(self, coef, intercept, classes, feature_names=None):
+        self.coef = coef
+        self.intercept = float(intercept)
+        self.classes_ = classes
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+
+    @classmethod
+    def from_sklearn(cls, model):
+        if model.coef_.shape[0] != 1:
+            raise TypeError("Only binary LogisticRegression models can be compiled")
+        return cls(
+            coef=model.coef_[0].astype(np.float64),
+            intercept=model.intercept_[0],
+            classes=np.asarray(model.classes_),
+            feature_names=getattr(model, "feature_names_in_", None),
+        )
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        p = 1.0 / (1.0 + np.exp(-(X @ self.coef + self.intercept)))
+        return np.column_stack([1 - p, p])
+
+    def arrays(self):
+        return {'coef': self.coef, 'intercept': np.asarray(self.intercept),
+                'classes': self.classes_}
+
+
+def compile_model(model):
+    """Compile a fitted sklearn model; raises TypeError for unsupported estimators."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    if isinstance(model, RandomForestClassifier):
+        return CompiledForest.from_sklearn(model)
+    if isinstance(model, LogisticRegression):
+        return CompiledLogistic.from_sklearn(model)
+    raise TypeError(f"Cannot compile model of type {type(model).__name__}")
+
+
+def save_compiled(compiled, path, source_hash=None):
+    """`source_hash` identifies the model it was compiled from (see `load_compiled`)."""
+    arrays = compiled.arrays()
+    arrays['kind'] = np.asarray(compiled.kind)
+    names = getattr(compiled, "feature_names_in_", None)
+    if names is not None:
+        arrays['feature_names'] = np.asarray(names, dtype=str)
+    if source_hash is not None:
+        arrays['source_hash'] = np.asarray(source_hash)
+    np.savez(path, **arrays)
+
+
+def load_compiled(path, source_hash=None):
+    """Raises ValueError when `source_hash` is given and the file was compiled from another."""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    stored = arrays.pop('source_hash', None)
+    if source_hash is not None and (stored is None or str(stored) != source_hash):
+        raise ValueError(f"{path} was compiled from a different model")
+    kind = str(arrays.pop('kind'))
+    names = arrays.pop('feature_names', None)
+    feature_names = names.astype(object) if names is not None else None
+    if kind == CompiledForest.kind:
+        return CompiledForest(feature_names=feature_names, **arrays)
+    if kind == CompiledLogistic.kind:
+        return CompiledLogistic(feature_names=feature_names, **arrays)
+    raise ValueError(f"Unknown compiled model kind '{kind}'")
+
+
+if __name__ == "__main__":
+    import mlflow.sklearn
+
+    parser = argparse.ArgumentParser(description="Export an MLflow sklearn model to NumPy arrays")
+    parser.add_argument("--model-uri", required=True, help="e.g. models:/CreditRiskModel/3")
+    parser.add_argument("--out", default="compiled_model.npz")
+    args = parser.parse_args()
+
+    save_compiled(compile_model(mlflow.sklearn.load_model(args.model_uri)), args.out)
+    print(f"✅ Saved compiled model to '{args.out}'")
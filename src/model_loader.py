@@ -0,0 +1,190 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import mlflow
+import mlflow.sklearn
+from mlflow.artifacts import download_artifacts
+from mlflow.tracking import MlflowClient
+
+from drift import attach_reference
+from inference_engine import compile_model, load_compiled, save_compiled
+from transform_plan import attach_bundle
+
+# Constants
+DEFAULT_MODEL_NAME = "CreditRiskModel"
+MODEL_CACHE_DIR = os.environ.get(
+    "MODEL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "credit-risk", "models")
+)
+MODEL_LRU_SIZE = int(os.environ.get("MODEL_LRU_SIZE", "4"))
+# "compiled" serves the NumPy engine from inference_engine.py; "sklearn" the pickled estimator
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "compiled")
+# Compiled arrays live in the cache, keyed by model directory, never in the model directory
+COMPILED_SUBDIR = "compiled"
+
+
+class ModelLRU:
+    """Thread-safe in-process LRU of loaded models."""
+
+    def __init__(self, maxsize=MODEL_LRU_SIZE):
+        self.maxsize = maxsize
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+
+        # Load outside the lock so a slow download doesn't block cached lookups
+        model = loader()
+
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.maxsize:
+                self._models.popitem(last=False)
+        return model
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+
+_lru = ModelLRU()
+
+
+def cache_path(model_name, version, cache_dir=None):
+    return os.path.join(cache_dir or MODEL_CACHE_DIR, model_name, str(version))
+
+
+def fetch_model_artifacts(model_name, version, cache_dir=None):
+    """Download a registered model version once and return its local directory."""
+    target = cache_path(model_name, version, cache_dir)
+    if os.path.exists(os.path.join(target, "MLmodel")):
+        return target
+
+    # Download next to the target and rename, so a crash never leaves a half-written cache
+    staging = f"{target}.partial-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    local_dir = download_artifacts(artifact_uri=f"models:/{model_name}/{version}", dst_path=staging)
+    try:
+        os.replace(local_dir, target)
+    except OSError:
+        # Another process populated the cache first
+        if not os.path.exists(os.path.join(target, "MLmodel")):
+            raise
+    shutil.rmtree(staging, ignore_errors=True)
+    print(f"📦 Cached {model_name} v{version} at {target}")
+    return target
+
+
+def load_local_model(model_dir, compiled=True):
+    """
+    Load an MLflow model directory, optionally as a compiled model.
+
+    The compiled arrays are cached under MODEL_CACHE_DIR on first use, so later starts read a
+    small .npz instead of unpickling the estimator; the .npz records a hash of the model it
+    was compiled from and is rebuilt when the model changes. Unsupported estimators load
+    as-is.
+    When the directory carries the train-time feature transforms (see train.py), the model
+    comes back as a ScoringBundle that can also score raw transactions; a training drift
+    reference is attached as `drift_reference_`.
+    """
+    if model_dir.startswith("file://"):
+        model_dir = urlparse(model_dir).path
+    model = attach_bundle(_load_estimator(model_dir, compiled), model_dir)
+    return attach_reference(model, model_dir)
+
+
+def _load_estimator(model_dir, compiled):
+    if not compiled:
+        return mlflow.sklearn.load_model(model_dir)
+
+    compiled_path = compiled_cache_path(model_dir)
+    source_hash = model_fingerprint(model_dir)
+    try:
+        return load_compiled(compiled_path, source_hash)
+    except FileNotFoundError:
+        pass
+    except ValueError:
+        print(f"♻️ {model_dir} changed since it was compiled, recompiling")
+
+    model = mlflow.sklearn.load_model(model_dir)
+    try:
+        compiled_model = compile_model(model)
+    except TypeError:
+        return model
+    try:
+        # Write next to the target and rename, so readers never see a half-written file
+        os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(compiled_path), suffix=".npz",
+                                         delete=False) as f:
+            save_compiled(compiled_model, f, source_hash)
+        os.replace(f.name, compiled_path)
+    except OSError as e:
+        print(f"⚠️ Could not cache compiled model at {compiled_path}: {e}")
+    return compiled_model
+
+
+def compiled_cache_path(model_dir):
+    key = hashlib.sha256(os.path.abspath(model_dir).encode()).hexdigest()[:16]
+    return os.path.join(MODEL_CACHE_DIR, COMPILED_SUBDIR, f"{key}.npz")
+
+
+def model_fingerprint(model_dir):
+    """SHA-256 of the MLmodel file and the pickled estimator it points to."""
+    digest = hashlib.sha256()
+    with open(os.path.join(model_dir, "MLmodel"), "rb") as f:
+        mlmodel = f.read()
+    digest.update(mlmodel)
+    pickled = mlflow.models.Model.load(model_dir).flavors['sklearn']['pickled_model']
+    with open(os.path.join(model_dir, pickled), "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resolve_production_version(model_name=DEFAULT_MODEL_NAME, tag_key="stage",
+                               tag_value="production"):
+    """Highest registered version carrying the tag train.py sets on promotion."""
+    client = MlflowClient()
+    versions = client.search_model_versions(
+        f"name='{model_name}' and tags.{tag_key}='{tag_value}'"
+    )
+    if not versions:
+        raise LookupError(f"No version of {model_name} is tagged {tag_key}={tag_value}")
+    return max(int(v.version) for v in versions)
+
+
+def load_model(model_name=DEFAULT_MODEL_NAME, version=None, model_path=None, cache_dir=None,
+               engine=None):
+    """
+    Load a model, preferring the in-process LRU, then the on-disk cache, then the registry.
+
+    `model_path` points at a local MLflow model directory or a file:// URI and bypasses the
+    registry entirely, so no tracking server is needed. When no version is requested, the
+    MODEL_PATH env variable is used if set, otherwise the version tagged stage=production.
+    `engine` ("compiled" or "sklearn") defaults to INFERENCE_ENGINE.
+    """
+    compiled = (engine or INFERENCE_ENGINE) == "compiled"
+    if model_path is None and version is None:
+        model_path = os.environ.get("MODEL_PATH")
+        if not model_path:
+            version = resolve_production_version(model_name)
+
+    if model_path:
+        key = ("path", model_path, compiled)
+        return _lru.get(key, lambda: load_local_model(model_path, compiled))
+
+    key = (model_name, str(version), compiled)
+    return _lru.get(
+        key,
+        lambda: load_local_model(fetch_model_artifacts(model_name, version, cache_dir), compiled),
+    )
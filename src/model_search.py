@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score, roc_auc_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+
+RANDOM_STATE = 42
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", ".search_cache")
+
+# Search spaces per model; grid mode takes every combination, random mode samples n_iter
+SEARCH_SPACES = {
+    'LogisticRegression': {
+        'C': [0.01, 0.1, 1.0, 10.0],
+        'class_weight': [None, 'balanced'],
+        'solver': ['lbfgs'],
+        'max_iter': [500],
+    },
+    'RandomForest': {
+        'n_estimators': [100, 300],
+        'max_depth': [5, 10, None],
+        'min_samples_leaf': [1, 5],
+        'class_weight': [None, 'balanced'],
+    },
+    'XGBoost': {
+        'n_estimators': [200, 400],
+        'max_depth': [3, 6],
+        'learning_rate': [0.05, 0.1],
+        'subsample': [0.8, 1.0],
+        'colsample_bytree': [0.8, 1.0],
+    },
+}
+
+
+def make_estimator(name, params=None):
+    """Unfitted estimator for `name`; each trial is single-threaded, the pool parallelizes."""
+    params = dict(params or {})
+    if name == 'LogisticRegression':
+        return LogisticRegression(**params)
+    if name == 'RandomForest':
+        return RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1, **params)
+    if name == 'XGBoost':
+        from xgboost import XGBClassifier
+        return XGBClassifier(tree_method='hist', n_jobs=1, random_state=RANDOM_STATE,
+                             eval_metric='logloss', **params)
+    raise ValueError(f"Unknown model '{name}'")
+
+
+def candidate_params(space, mode='grid', n_iter=10, random_state=RANDOM_STATE):
+    if mode == 'grid':
+        return list(ParameterGrid(space))
+    if mode == 'random':
+        return list(ParameterSampler(space, n_iter=n_iter, random_state=random_state))
+    raise ValueError(f"Unknown search mode '{mode}'")
+
+
+def data_fingerprint(X, y):
+    """sha256 over column names, values and labels; changes whenever the training data does."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(map(str, getattr(X, 'columns', [])))).encode())
+    digest.update(np.ascontiguousarray(np.asarray(X, dtype=np.float64)).tobytes())
+    digest.update(np.ascontiguousarray(np.asarray(y, dtype=np.int64)).tobytes())
+    return digest.hexdigest()
+
+
+def trial_key(model_name, params, fingerprint, cv, random_state):
+    payload = json.dumps({'model': model_name, 'params': params, 'data': fingerprint,
+                          'cv': cv, 'random_state': random_state}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TrialCache:
+    """One JSON file per finished trial, keyed by `trial_key`."""
+
+    def __init__(self, cache_dir=SEARCH_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, result):
+        # Write then rename, so an interrupted search never leaves a half-written trial
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(result, f, default=str)
+        os.replace(tmp_path, self._path(key))
+
+
+def share_arrays(X, y, folds, folder):
+    """
+    Dump X/y/fold ids once and reopen them memory-mapped.
+
+    loky pickles np.memmap arguments as a file reference, so workers map the same pages
+    instead of receiving a copy of the training data with every task.
+    """
+    shared = {}
+    for name, array in [('X', np.asarray(X, dtype=np.float64)),
+                        ('y', np.asarray(y, dtype=np.int64)), ('folds', folds)]:
+        path = os.path.join(folder, f"{name}.mmap")
+        joblib.dump(np.ascontiguousarray(array), path)
+        shared[name] = joblib.load(path, mmap_mode='r')
+    return shared['X'], shared['y'], shared['folds']
+
+
+def _fit_fold(model_name, params, X, y, folds, fold):
+    train, test = folds != fold, folds == fold
+    start = time.perf_counter()
+    model = make_estimator(model_name, params).fit(X[train], y[train])
+    proba = model.predict_proba(X[test])[:, 1]
+    return {
+        'roc_auc': roc_auc_score(y[test], proba),
+        'f1_score': f1_score(y[test], (proba >= 0.5).astype(int)),
+        'fit_seconds': time.perf_counter() - start,
+    }
+
+
+def run_search(X, y, models=tuple(SEARCH_SPACES), mode='grid', n_iter=10, cv=5, n_jobs=-1,
+               scoring='roc_auc', cache_dir=SEARCH_CACHE_DIR, random_state=RANDOM_STATE,
+               search_spaces=None):
+    """
+    Cross-validated search over `models` on a joblib/loky process pool.
+
+    Every (trial, fold) pair is one task, so slow and fast models share the pool evenly.
+    Finished trials are cached by (model, params, data fingerprint, cv), so rerunning a
+    search only fits the new or changed candidates. Returns one row per trial, best first.
+    """
+    search_spaces = search_spaces or SEARCH_SPACES
+    cache = TrialCache(cache_dir)
+    fingerprint = data_fingerprint(X, y)
+
+    trials, results = [], []
+    for model_name in models:
+        for params in candidate_params(search_spaces[model_name], mode, n_iter, random_state):
+            key = trial_key(model_name, params, fingerprint, cv, random_state)
+            cached = cache.get(key)
+            if cached is not None:
+                results.append(cached)
+            else:
+                trials.append((key, model_name, params))
+    print(f"🔎 {len(trials)} trials to run, {len(results)} reused from {cache_dir}")
+
+    if trials:
+        folds = np.empty(len(y), dtype=np.int8)
+        splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+        for fold, (_, test) in enumerate(splitter.split(np.zeros(len(y)), y)):
+            folds[test] = fold
+
+        with tempfile.TemporaryDirectory() as folder:
+            X_shared, y_shared, folds_shared = share_arrays(X, y, folds, folder)
+            scores = Parallel(n_jobs=n_jobs, backend='loky')(
+                delayed(_fit_fold)(model_name, params, X_shared, y_shared, folds_shared, fold)
+                for _, model_name, params in trials for fold in range(cv)
+            )
+
+        for i, (key, model_name, params) in enumerate(trials):
+            fold_scores = pd.DataFrame(scores[i * cv:(i + 1) * cv])
+            result = {'model': model_name, 'params': params, **{
+                f"mean_{metric}": float(fold_scores[metric].mean()) for metric in fold_scores
+            }, f"std_{scoring}": float(fold_scores[scoring].std())}
+            cache.put(key, result)
+            results.append(result)
+
+    return pd.DataFrame(results).sort_values(f"mean_{scoring}", ascending=False,
+                                             ignore_index=True)
@@ -0,0 +1,276 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = ".pipeline_cache"
+REPORT_PATH = "reports/pipeline_report.json"
+
+# --------- Stages ------------
+# Each stage function runs in its own process and takes (inputs, outputs, params) dicts.
+
+
+def run_clean(inputs, outputs, params):
+    from data_processing import add_outlier_flags, load_data, save_processed_data
+    from feature_eng_process import OutlierFlagger
+
+    df = load_data(inputs['raw'])
+    flagger = OutlierFlagger().fit(df)
+    save_processed_data(add_outlier_flags(df, flagger), outputs['cleaned'])
+    flagger.save(outputs['outlier_bounds'])
+
+
+def run_eda(inputs, outputs, params):
+    from data_processing import profile_file, render_profile_plots, save_profile
+
+    report = profile_file(inputs['raw'], chunksize=params['chunksize'])
+    save_profile(report, outputs['profile'])
+    render_profile_plots(report, outputs['plots'], n_jobs=params['plot_jobs'])
+
+
+def run_features(inputs, outputs, params):
+    import joblib
+    from data_io import read_table, write_table
+    from feature_eng_process import OutlierFlagger, build_feature_engineering_pipeline
+    from transform_plan import TransformPlan
+
+    df = read_table(inputs['cleaned'])
+    pipeline = build_feature_engineering_pipeline(categorical_encoding=params['encoding'])
+    write_table(pipeline.fit_transform(df), outputs['features'])
+
+    os.makedirs(os.path.dirname(outputs['pipeline']) or '.', exist_ok=True)
+    joblib.dump(pipeline, outputs['pipeline'])
+    if 'plan' in outputs:
+        flagger = OutlierFlagger.load(inputs['outlier_bounds'])
+        TransformPlan.from_pipeline(pipeline, outlier_flagger=flagger).save(outputs['plan'])
+
+
+def run_label(inputs, outputs, params):
+    from data_io import read_table, write_table
+    from proxy_labeling import calculate_rfm, label_high_risk_customers
+
+    df = read_table(inputs['features'])
+    rfm = calculate_rfm(df)
+    labels = label_high_risk_customers(rfm, method=params['method'],
+                                       centroids_path=outputs['centroids'])
+    labels['CustomerId'] = labels['CustomerId'].astype(df['CustomerId'].dtype)
+    write_table(df.merge(labels, on='CustomerId', how='left'), outputs['labeled'])
+
+
+def run_train(inputs, outputs, params):
+    import train
+
+    train.main(search=params['search'], n_iter=params['n_iter'], cv=params['cv'],
+               n_jobs=params['n_jobs'], data_path=inputs['labeled'],
+               plan_path=inputs.get('plan', ''), pipeline_path=inputs.get('pipeline', ''))
+
+
+class Stage:
+    """One DAG node: a stage function, its files and the src/ modules it depends on."""
+
+    def __init__(self, name, func, inputs=None, outputs=None, params=None, code=(), deps=()):
+        self.name = name
+        self.func = func
+        self.inputs = inputs or {}
+        self.outputs = outputs or {}
+        self.params = params or {}
+        self.code = list(code)
+        self.deps = list(deps)
+
+
+def build_stages(raw="data/Data/data.csv", processed="data/processed", models="models",
+                 notebooks="notebooks", encoding='onehot', cluster_method='kmeans', search=None,
+                 n_iter=10, cv=5, n_jobs=-1, chunksize=200_000, plot_jobs=2):
+    cleaned = f"{processed}/data_cleaned.parquet"
+    bounds = f"{models}/outlier_bounds.json"
+    features = f"{processed}/feature_engineered_data.parquet"
+    labeled = f"{processed}/feature_engineered_labeled.parquet"
+    transforms = {'pipeline': f"{models}/feature_pipeline.joblib"}
+    if encoding != 'sparse':
+        transforms['plan'] = f"{models}/transform_plan.npz"
+    common = ['pipeline', 'data_io', 'sketches']
+    return [
+        Stage('clean', run_clean, {'raw': raw}, {'cleaned': cleaned, 'outlier_bounds': bounds},
+              code=common + ['data_processing', 'feature_eng_process']),
+        Stage('eda', run_eda, {'raw': raw},
+              {'profile': f"{notebooks}/profile.json", 'plots': f"{notebooks}/plots/"},
+              params={'chunksize': chunksize, 'plot_jobs': plot_jobs},
+              code=common + ['data_processing']),
+        Stage('features', run_features, {'cleaned': cleaned, 'outlier_bounds': bounds},
+              {'features': features, **transforms},
+              params={'encoding': encoding},
+              code=common + ['feature_eng_process', 'transform_plan'], deps=['clean']),
+        Stage('label', run_label, {'features': features},
+              {'labeled': labeled, 'centroids': f"{models}/rfm_centroids.json"},
+              params={'method': cluster_method}, code=common + ['proxy_labeling'],
+              deps=['features']),
+        Stage('train', run_train, {'labeled': labeled, **transforms},
+              params={'search': search, 'n_iter': n_iter, 'cv': cv, 'n_jobs': n_jobs},
+              code=common + ['train', 'model_search', 'tracking', 'transform_plan', 'drift'],
+              deps=['label']),
+    ]
+
+# --------- Fingerprinting ------------
+
+
+def _hash_file(path, digest):
+    if os.path.isdir(path):
+        for root, _, files in sorted(os.walk(path)):
+            for name in sorted(files):
+                _hash_file(os.path.join(root, name), digest)
+        return
+    digest.update(path.encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+
+def stage_fingerprint(stage):
+    """sha256 over the stage's parameters, the source of its modules and its input files."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps({'stage': stage.name, 'params': stage.params,
+                              'inputs': stage.inputs, 'outputs': stage.outputs},
+                             sort_keys=True, default=str).encode())
+    for module in stage.code:
+        _hash_file(os.path.join(SRC_DIR, f"{module}.py"), digest)
+    for path in stage.inputs.values():
+        _hash_file(path, digest)
+    return digest.hexdigest()
+
+
+def _manifest_path(cache_dir, stage):
+    return os.path.join(cache_dir, f"{stage.name}.json")
+
+
+def is_cached(stage, fingerprint, cache_dir=CACHE_DIR):
+    try:
+        with open(_manifest_path(cache_dir, stage)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return False
+    return (manifest['fingerprint'] == fingerprint
+            and all(os.path.exists(path) for path in stage.outputs.values()))
+
+
+def _write_manifest(stage, fingerprint, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(_manifest_path(cache_dir, stage), "w") as f:
+        json.dump({'fingerprint': fingerprint, 'outputs': stage.outputs}, f, indent=2)
+
+# --------- Execution ------------
+
+
+def _execute(stage):
+    """Child-process entry point: run the stage, report wall time and peak RSS."""
+    for path in stage.outputs.values():
+        os.makedirs(os.path.dirname(path.rstrip('/')) or '.', exist_ok=True)
+    start = time.perf_counter()
+    stage.func(stage.inputs, stage.outputs, stage.params)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    return seconds, peak_mb
+
+
+def run_pipeline(stages, only=None, force=False, n_jobs=2, cache_dir=CACHE_DIR,
+                 report_path=REPORT_PATH):
+    """
+    Run `stages` as a DAG on a process pool, skipping stages whose fingerprint is cached.
+
+    A stage starts once all its deps are done, so independent stages (EDA and feature
+    engineering) run concurrently. Each stage gets a fresh process, which keeps its peak
+    RSS measurement separate. Fingerprints are taken right before a stage starts, after
+    its upstream outputs are written. Returns the per-stage report.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    selected = set(only or by_name)
+    # Stages outside `only` count as done, so their cached outputs are used as-is
+    done = {name for name in by_name if name not in selected}
+    failed, report = set(), {}
+    pending = [stage for stage in stages if stage.name in selected]
+    running = {}
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context,
+                             max_tasks_per_child=1) as pool:
+        while pending or running:
+            for stage in list(pending):
+                if any(dep in failed for dep in stage.deps):
+                    pending.remove(stage)
+                    failed.add(stage.name)
+                    report[stage.name] = {'status': 'skipped (upstream failed)'}
+                elif all(dep in done for dep in stage.deps):
+                    pending.remove(stage)
+                    try:
+                        fingerprint = stage_fingerprint(stage)
+                    except FileNotFoundError as e:
+                        print(f"❌ {stage.name}: missing input {e.filename}")
+                        report[stage.name] = {'status': 'failed', 'error': str(e)}
+                        failed.add(stage.name)
+                        continue
+                    if not force and is_cached(stage, fingerprint, cache_dir):
+                        print(f"⏭️ {stage.name}: cached")
+                        report[stage.name] = {'status': 'cached'}
+                        done.add(stage.name)
+                    else:
+                        print(f"▶️ {stage.name}: running")
+                        running[pool.submit(_execute, stage)] = (stage, fingerprint)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, fingerprint = running.pop(future)
+                try:
+                    seconds, peak_mb = future.result()
+                except Exception as e:
+                    print(f"❌ {stage.name} failed: {e}")
+                    report[stage.name] = {'status': 'failed', 'error': str(e)}
+                    failed.add(stage.name)
+                    continue
+                _write_manifest(stage, fingerprint, cache_dir)
+                report[stage.name] = {'status': 'ran', 'seconds': round(seconds, 3),
+                                      'peak_rss_mb': round(peak_mb, 1)}
+                done.add(stage.name)
+                print(f"✅ {stage.name}: {seconds:.1f}s, peak {peak_mb:.0f} MB")
+
+    print_report(report)
+    if report_path:
+        os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def print_report(report):
+    print(f"\n{'stage':<12}{'status':<28}{'seconds':>10}{'peak MB':>10}")
+    for name, row in report.items():
+        print(f"{name:<12}{row['status']:<28}{row.get('seconds', ''):>10}"
+              f"{row.get('peak_rss_mb', ''):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the credit risk pipeline as a cached DAG")
+    parser.add_argument("--raw", default="data/Data/data.csv")
+    parser.add_argument("--only", nargs='+', choices=['clean', 'eda', 'features', 'label',
+                                                      'train'])
+    parser.add_argument("--force", action='store_true', help="ignore cached stages")
+    parser.add_argument("--n-jobs", type=int, default=2, help="stages run concurrently")
+    parser.add_argument("--encoding", choices=['onehot', 'sparse', 'codes', 'woe'],
+                        default='onehot')
+    parser.add_argument("--cluster-method", choices=['kmeans', 'minibatch'], default='kmeans')
+    parser.add_argument("--search", choices=['grid', 'random'], default=None)
+    args = parser.parse_args()
+
+    stages = build_stages(raw=args.raw, encoding=args.encoding,
+                          cluster_method=args.cluster_method, search=args.search)
+    report = run_pipeline(stages, only=args.only, force=args.force, n_jobs=args.n_jobs)
+    ok = all(row['status'] in ('ran', 'cached') for row in report.values())
+    sys.exit(0 if ok else 1)
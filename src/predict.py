@@ -1,27 +1,117 @@
-import mlflow
-import pandas as pd
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import model_loader
+from data_io import ChunkWriter, iter_table_chunks
+
+DATA_PATH = 'data/processed/feature_engineered_labeled.parquet'
+OUTPUT_PATH = 'data/processed/predictions.parquet'
+DROP_COLS = ['TransactionId', 'TransactionStartTime', 'CustomerId', 'BatchId',
+             'AccountId', 'SubscriptionId', 'CurrencyCode', 'ProductId']
+# Identifier columns carried through to the output next to the scores
+ID_COLS = ['TransactionId', 'CustomerId']
+
+
+def load_model(model_name="CreditRiskModel", version=None, model_path=None):
+    # Pinned by MODEL_VERSION, otherwise the version tagged stage=production.
+    # Served from the in-process LRU / on-disk cache after the first call.
+    version = version or os.environ.get("MODEL_VERSION")
+    return model_loader.load_model(model_name, version, model_path=model_path)
+
+
+def resolve_model(model_name="CreditRiskModel"):
+    """
+    (version, model_path) that `load_model` would pick right now, so a whole file is scored
+    by one model even if the production tag moves, without a registry lookup per chunk.
+    """
+    version = os.environ.get("MODEL_VERSION")
+    model_path = None if version else os.environ.get("MODEL_PATH")
+    if not version and not model_path:
+        version = model_loader.resolve_production_version(model_name)
+    return version, model_path
+
+
+def prepare_features(df):
+    df = df.drop(columns=[col for col in DROP_COLS if col in df.columns], errors='ignore')
+    if 'is_high_risk' in df.columns:
+        df = df.drop(columns=['is_high_risk'])
+    return df
+
+
+def align_features(model, df_features):
+    # Compiled models take positional arrays, so line the columns up with training
+    feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is not None:
+        df_features = df_features[list(feature_names)]
+    return df_features
 
-def load_model(model_name="CreditRiskModel", version=2):
-    model_uri = f"models:/{model_name}/{version}"
-    model = mlflow.sklearn.load_model(model_uri)
-    return model
 
 def predict(df_features):
     model = load_model()
-    preds = model.predict(df_features)
+    preds = model.predict(align_features(model, df_features))
     return preds
 
-if __name__ == "__main__":
-    df = pd.read_csv('data/processed/feature_engineered_labeled.csv')
 
-    drop_cols = ['TransactionId', 'TransactionStartTime', 'CustomerId', 'BatchId',
-                 'AccountId', 'SubscriptionId', 'CurrencyCode', 'ProductId']
-    df = df.drop(columns=[col for col in drop_cols if col in df.columns], errors='ignore')
+# --------- Streaming batch scoring ------------
 
-    if 'is_high_risk' in df.columns:
-        df = df.drop(columns=['is_high_risk'])
+def score_chunk(chunk, version=None, model_path=None):
+    """Score one chunk; runs in the parent or in a pool worker (model is cached per process)."""
+    model = load_model(version=version, model_path=model_path)
+    X = prepare_features(chunk)
+    # Bundled models were trained on scaled inputs; plain models take the columns as-is
+    X = model.transform_frame(X) if hasattr(model, 'transform_frame') else align_features(model, X)
+    scored = chunk[[col for col in ID_COLS if col in chunk.columns]].reset_index(drop=True)
+    scored['risk_probability'] = model.predict_proba(X)[:, 1]
+    return scored
+
+
+def score_file(input_path, output_path, chunksize=100_000, n_jobs=1):
+    """
+    Stream `input_path` through the model chunk by chunk and write scores to `output_path`.
+
+    Memory stays bounded by the chunk size: with n_jobs > 1 at most 2 * n_jobs chunks are
+    in flight, and results are written in input order.
+    """
+    version, model_path = resolve_model()
+    print(f"🔎 Scoring with {model_path or f'version {version}'}")
+    writer = ChunkWriter(output_path)
+    rows, start = 0, time.perf_counter()
 
+    def report(scored):
+        nonlocal rows
+        writer.write(scored)
+        rows += len(scored)
+        elapsed = time.perf_counter() - start
+        print(f"⏳ Scored {rows:,} rows ({rows / elapsed:,.0f} rows/sec)")
+
+    try:
+        if n_jobs <= 1:
+            for chunk in iter_table_chunks(input_path, chunksize):
+                report(score_chunk(chunk, version, model_path))
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                pending = deque()
+                for chunk in iter_table_chunks(input_path, chunksize):
+                    pending.append(pool.submit(score_chunk, chunk, version, model_path))
+                    if len(pending) >= 2 * n_jobs:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+    finally:
+        writer.close()
+
+    print(f"💾 Saved {rows:,} predictions to: {output_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file in chunks")
+    parser.add_argument("--input", default=DATA_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args()
 
-    X = df
-    predictions = predict(X)
-    print(predictions)
+    score_file(args.input, args.output, chunksize=args.chunksize, n_jobs=args.n_jobs)
@@ -1,52 +1,233 @@
+import argparse
+import json
+import os
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
+from data_io import ChunkWriter, apply_schema, iter_table_chunks, read_table, write_table
 
-def calculate_rfm(df, snapshot_date_col='TransactionStartTime'):
-    df[snapshot_date_col] = pd.to_datetime(df[snapshot_date_col])
-    snapshot_date = df[snapshot_date_col].max() + pd.Timedelta(days=1)
+RFM_FEATURES = ['Recency', 'Frequency', 'Monetary']
 
-    rfm = df.groupby('CustomerId').agg({
-        snapshot_date_col: lambda x: (snapshot_date - x.max()).days,
-        'CustomerId': 'count',
-        'Amount': 'sum'
+# --------- RFM ------------
+
+
+def _partial_rfm(df, snapshot_date_col='TransactionStartTime'):
+    """Per-customer last timestamp, transaction count and amount sum for one frame/chunk."""
+    times = df[snapshot_date_col]
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = pd.to_datetime(times)
+    frame = pd.DataFrame({'last': times, 'total': df['Amount']})
+    grouped = frame.groupby(df['CustomerId'].rename('CustomerId'), observed=True)
+    return grouped.agg(last=('last', 'max'), count=('total', 'size'), total=('total', 'sum'))
+
+
+def _combine_partials(parts):
+    parts = pd.concat(parts)
+    parts.index = parts.index.astype(str)
+    return parts.groupby(level=0).agg(last=('last', 'max'), count=('count', 'sum'),
+                                      total=('total', 'sum'))
+
+
+def _finalize_rfm(partial, snapshot_date=None):
+    if snapshot_date is None:
+        snapshot_date = partial['last'].max() + pd.Timedelta(days=1)
+    return pd.DataFrame({
+        'CustomerId': partial.index.to_numpy(),
+        'Recency': (snapshot_date - partial['last']).dt.days.to_numpy(),
+        'Frequency': partial['count'].to_numpy(),
+        'Monetary': partial['total'].to_numpy(),
     })
 
-    rfm.columns = ['Recency', 'Frequency', 'Monetary']
-    rfm = rfm.reset_index()
 
-    return rfm
+def calculate_rfm(df, snapshot_date_col='TransactionStartTime', snapshot_date=None):
+    """
+    Recency (days before the snapshot), Frequency and Monetary per customer.
+
+    One groupby with max/size/sum and vectorized date arithmetic; `df` is not modified.
+    The snapshot defaults to the day after the latest transaction.
+    """
+    return _finalize_rfm(_partial_rfm(df, snapshot_date_col), snapshot_date)
+
+
+def calculate_rfm_chunked(path, chunksize=500_000, snapshot_date_col='TransactionStartTime',
+                          snapshot_date=None, combine_every=32):
+    """
+    `calculate_rfm` over a CSV/Parquet/Arrow file read chunk by chunk. Per-chunk partials
+    are merged every `combine_every` chunks rather than after each one, so the running
+    per-customer table is not re-concatenated for every chunk.
+    """
+    parts = []
+    columns = ['CustomerId', snapshot_date_col, 'Amount']
+    for chunk in iter_table_chunks(path, chunksize, columns=columns):
+        parts.append(_partial_rfm(chunk, snapshot_date_col))
+        if len(parts) >= combine_every:
+            parts = [_combine_partials(parts)]
+    return _finalize_rfm(_combine_partials(parts), snapshot_date)
+
+# --------- Clustering ------------
+
+
+class RFMClusterer:
+    """
+    Standardized RFM clustering with persisted centroids.
+
+    method='kmeans' fits full-batch KMeans (the original behavior); method='minibatch'
+    uses MiniBatchKMeans and also supports `partial_fit` over RFM chunks. The least
+    engaged cluster (lowest Frequency + Monetary in original units) is the high-risk
+    one. `save`/`load` keep scaler and centroids as JSON, so new customers are labeled
+    with `label` without re-clustering everyone.
+    """
 
-def label_high_risk_customers(rfm_df):
-    # Standardize RFM features
-    scaler = StandardScaler()
-    rfm_scaled = scaler.fit_transform(rfm_df[['Recency', 'Frequency', 'Monetary']])
+    def __init__(self, n_clusters=3, method='kmeans', batch_size=4096, random_state=42):
+        if method not in ('kmeans', 'minibatch'):
+            raise ValueError(f"Unknown clustering method '{method}'")
+        self.n_clusters = n_clusters
+        self.method = method
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.scaler = StandardScaler()
+        self.mean_ = None
+        self.scale_ = None
+        self.centers_ = None
+        self.high_risk_cluster_ = None
+        self._kmeans = None
 
-    # Apply KMeans clustering
-    kmeans = KMeans(n_clusters=3, random_state=42)
-    rfm_df['Cluster'] = kmeans.fit_predict(rfm_scaled)
+    def _make_kmeans(self):
+        if self.method == 'kmeans':
+            return KMeans(n_clusters=self.n_clusters, random_state=self.random_state)
+        return MiniBatchKMeans(n_clusters=self.n_clusters, batch_size=self.batch_size,
+                               random_state=self.random_state)
 
-    # Identify the least engaged cluster (low Frequency + low Monetary)
-    cluster_scores = rfm_df.groupby('Cluster')[['Frequency', 'Monetary']].mean().sum(axis=1)
-    high_risk_cluster = cluster_scores.idxmin()
+    def _scale(self, rfm_df):
+        return (rfm_df[RFM_FEATURES].to_numpy(np.float64) - self.mean_) / self.scale_
+
+    def _set_high_risk_cluster(self, rfm_df=None, clusters=None):
+        if rfm_df is not None:
+            # Mean of the member customers, as in the original labeling
+            means = rfm_df[['Frequency', 'Monetary']].groupby(clusters).mean()
+            self.high_risk_cluster_ = int(means.sum(axis=1).idxmin())
+        else:
+            centers = self.centers_ * self.scale_ + self.mean_
+            self.high_risk_cluster_ = int(np.argmin(centers[:, 1] + centers[:, 2]))
+
+    def fit(self, rfm_df):
+        self.scaler.fit(rfm_df[RFM_FEATURES])
+        self.mean_, self.scale_ = self.scaler.mean_, self.scaler.scale_
+        self._kmeans = self._make_kmeans()
+        clusters = self._kmeans.fit_predict(self._scale(rfm_df))
+        self.centers_ = self._kmeans.cluster_centers_
+        self._set_high_risk_cluster(rfm_df, clusters)
+        return self
+
+    def partial_fit(self, rfm_df):
+        """
+        Fold another batch of customers into the scaler and the MiniBatchKMeans centroids.
+        The centroids learned so far are moved into the updated scaling before the step.
+        """
+        if self.method != 'minibatch':
+            raise ValueError("partial_fit needs method='minibatch'")
+        old_mean, old_scale = self.mean_, self.scale_
+        self.scaler.partial_fit(rfm_df[RFM_FEATURES])
+        self.mean_, self.scale_ = self.scaler.mean_.copy(), self.scaler.scale_.copy()
+        if self._kmeans is None:
+            self._kmeans = self._make_kmeans()
+        elif hasattr(self._kmeans, 'cluster_centers_'):
+            raw = self._kmeans.cluster_centers_ * old_scale + old_mean
+            self._kmeans.cluster_centers_ = np.ascontiguousarray((raw - self.mean_) / self.scale_)
+        self._kmeans.partial_fit(self._scale(rfm_df))
+        self.centers_ = self._kmeans.cluster_centers_
+        self._set_high_risk_cluster()
+        return self
+
+    def predict(self, rfm_df):
+        """Nearest persisted centroid for each customer."""
+        X = self._scale(rfm_df)
+        distances = ((X[:, None, :] - self.centers_[None, :, :]) ** 2).sum(axis=2)
+        return distances.argmin(axis=1)
+
+    def label(self, rfm_df):
+        clusters = self.predict(rfm_df)
+        return pd.DataFrame({
+            'CustomerId': rfm_df['CustomerId'].to_numpy(),
+            'is_high_risk': (clusters == self.high_risk_cluster_).astype(int),
+        })
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                'n_clusters': self.n_clusters, 'method': self.method,
+                'mean': self.mean_.tolist(), 'scale': self.scale_.tolist(),
+                'centers': self.centers_.tolist(), 'high_risk_cluster': self.high_risk_cluster_,
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        clusterer = cls(n_clusters=data['n_clusters'], method=data['method'])
+        clusterer.mean_ = np.asarray(data['mean'])
+        clusterer.scale_ = np.asarray(data['scale'])
+        clusterer.centers_ = np.asarray(data['centers'])
+        clusterer.high_risk_cluster_ = data['high_risk_cluster']
+        return clusterer
+
+
+def label_high_risk_customers(rfm_df, method='kmeans', centroids_path=None):
+    """
+    Cluster customers on standardized RFM and flag the least engaged cluster as high risk.
+    With `centroids_path` the fitted centroids are saved for incremental labeling.
+    """
+    clusterer = RFMClusterer(n_clusters=3, method=method, random_state=42).fit(rfm_df)
+    if centroids_path:
+        clusterer.save(centroids_path)
+    return clusterer.label(rfm_df)
+
+
+def write_labeled_chunked(path, risk_labels, out_path, chunksize=500_000):
+    """Stream `path` again, attach each row's customer label and append it to `out_path`."""
+    labels = risk_labels.set_index(risk_labels['CustomerId'].astype(str))['is_high_risk']
+    writer = ChunkWriter(out_path)
+    try:
+        for chunk in iter_table_chunks(path, chunksize):
+            chunk['is_high_risk'] = chunk['CustomerId'].astype(str).map(labels)
+            writer.write(apply_schema(chunk))
+    finally:
+        writer.close()
 
-    rfm_df['is_high_risk'] = (rfm_df['Cluster'] == high_risk_cluster).astype(int)
-    return rfm_df[['CustomerId', 'is_high_risk']]
 
 if __name__ == "__main__":
-    # Load feature-engineered data
-    df = pd.read_csv('data/processed/feature_engineered_data.csv')
+    parser = argparse.ArgumentParser(description="Assign proxy high-risk labels from RFM")
+    parser.add_argument("--data", default='data/processed/feature_engineered_data.parquet')
+    parser.add_argument("--out", default='data/processed/feature_engineered_labeled.parquet')
+    parser.add_argument("--method", choices=['kmeans', 'minibatch'], default='kmeans')
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="compute RFM chunk by chunk instead of loading the file at once")
+    parser.add_argument("--centroids", default='models/rfm_centroids.json')
+    parser.add_argument("--label-only", action='store_true',
+                        help="label with the saved centroids instead of re-clustering")
+    args = parser.parse_args()
 
     # Step 1: Calculate RFM per Customer
-    rfm = calculate_rfm(df)
-
-    # Step 2: Assign proxy high-risk labels using clustering
-    risk_labels = label_high_risk_customers(rfm)
+    if args.chunksize:
+        rfm = calculate_rfm_chunked(args.data, chunksize=args.chunksize)
+    else:
+        rfm = calculate_rfm(read_table(args.data, columns=['CustomerId', 'TransactionStartTime',
+                                                           'Amount']))
 
-    # Step 3: Merge risk label into main dataset
-    df_labeled = df.merge(risk_labels, on='CustomerId', how='left')
+    # Step 2: Assign proxy high-risk labels using clustering (or the saved centroids)
+    if args.label_only:
+        risk_labels = RFMClusterer.load(args.centroids).label(rfm)
+    else:
+        risk_labels = label_high_risk_customers(rfm, method=args.method,
+                                                centroids_path=args.centroids)
 
-    # Step 4: Save result
-    df_labeled.to_csv('data/processed/feature_engineered_labeled.csv', index=False)
-    print("✅ Saved labeled dataset to 'data/processed/feature_engineered_labeled.csv'")
+    # Step 3: Merge risk label into main dataset and save it (streamed with --chunksize)
+    if args.chunksize:
+        write_labeled_chunked(args.data, risk_labels, args.out, chunksize=args.chunksize)
+    else:
+        df = read_table(args.data)
+        risk_labels['CustomerId'] = risk_labels['CustomerId'].astype(df['CustomerId'].dtype)
+        write_table(df.merge(risk_labels, on='CustomerId', how='left'), args.out)
+    print(f"✅ Saved labeled dataset to '{args.out}'")
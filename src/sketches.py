@@ -0,0 +1,110 @@
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Mergeable, bounded-memory quantile sketch (KLL-style compaction).
+
+    Values are kept in levels; an item on level h stands for 2**h original values. When a
+    level grows past `capacity` it is sorted and every other item is promoted to the next
+    level, so memory stays O(capacity * log(n / capacity)) and rank error is roughly
+    O(log(n / capacity) / capacity). Updates take whole arrays, so chunked data is folded
+    in with a handful of vectorized sorts.
+    """
+
+    def __init__(self, capacity=2048):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._offset = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.count += values.size
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if items.size > self.capacity:
+                items = np.sort(items)
+                if items.size % 2:
+                    # Keep one item behind so the promoted half stays weight-exact
+                    keep, items = items[-1:], items[:-1]
+                else:
+                    keep = np.empty(0)
+                # Alternate which half is promoted to avoid a systematic bias
+                promoted = items[self._offset::2]
+                self._offset ^= 1
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = keep
+            h += 1
+
+    def _sorted_items(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(items.size, 2.0 ** h)
+                                  for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Approximate quantile(s) `q` in [0, 1]; NaN if the sketch is empty."""
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        values, cum_weights = self._sorted_items()
+        ranks = q * cum_weights[-1]
+        idx = np.minimum(np.searchsorted(cum_weights, ranks, side='left'), values.size - 1)
+        result = np.clip(values[idx], self.min, self.max)
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result if q.ndim else float(result)
+
+    def cdf(self, x):
+        """Approximate fraction of values <= x."""
+        x = np.asarray(x, dtype=np.float64)
+        if self.count == 0:
+            return np.zeros(x.shape) if x.ndim else 0.0
+        values, cum_weights = self._sorted_items()
+        idx = np.searchsorted(values, x, side='right')
+        result = np.where(idx > 0, cum_weights[np.maximum(idx - 1, 0)], 0.0) / cum_weights[-1]
+        return result if x.ndim else float(result)
+
+    def to_dict(self):
+        return {
+            'capacity': self.capacity, 'count': int(self.count),
+            'min': float(self.min), 'max': float(self.max),
+            'levels': [items.tolist() for items in self.levels],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(capacity=data['capacity'])
+        sketch.count = data['count']
+        sketch.min, sketch.max = data['min'], data['max']
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in data['levels']]
+        return sketch
@@ -0,0 +1,197 @@
+import argparse
+import os
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import mlflow  # type: ignore
+from mlflow.entities import LoggedModelStatus, Metric, Param  # type: ignore
+from mlflow.models.signature import infer_signature  # type: ignore
+from mlflow.tracking import MlflowClient  # type: ignore
+
+DEFAULT_TRACKING_URI = "http://localhost:5000"
+# Where runs are buffered when the server is down or MLFLOW_OFFLINE=1
+OFFLINE_TRACKING_URI = os.getenv("MLFLOW_OFFLINE_URI", "sqlite:///mlruns.db")
+SIGNATURE_SAMPLE_ROWS = 100
+SYNC_TAG = "sync.target_run_id"
+
+
+def tracking_server_reachable(uri, timeout=1.0):
+    """Only http(s) stores can be down; local stores always count as reachable."""
+    if not uri.startswith(("http://", "https://")):
+        return True
+    try:
+        with urllib.request.urlopen(f"{uri.rstrip('/')}/health", timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def configure_tracking(uri=None, offline=None):
+    """
+    Point MLflow at `uri` (default: MLFLOW_TRACKING_URI or localhost:5000), falling back to
+    the local OFFLINE_TRACKING_URI store when offline mode is requested or the server does
+    not answer. Returns the URI in use; `sync_runs` pushes offline runs to the server later.
+    """
+    uri = uri or os.environ.get("MLFLOW_TRACKING_URI", DEFAULT_TRACKING_URI)
+    if offline is None:
+        offline = os.environ.get("MLFLOW_OFFLINE", "0") == "1"
+    if not offline and not tracking_server_reachable(uri):
+        print(f"⚠️ Tracking server {uri} is unreachable, logging to {OFFLINE_TRACKING_URI}")
+        offline = True
+    if offline:
+        uri = OFFLINE_TRACKING_URI
+    mlflow.set_tracking_uri(uri)
+    return uri
+
+
+def sample_signature(model, X, n_rows=SIGNATURE_SAMPLE_ROWS):
+    """Signature and input example from the first rows of X instead of the full frame."""
+    sample = X.iloc[:n_rows]
+    return infer_signature(sample, model.predict(sample)), X.iloc[:1]
+
+
+class BackgroundLogger:
+    """
+    Runs slow logging calls (model serialization and artifact uploads) on worker threads.
+
+    MLflow's active run is thread-local, so each job re-enters its run by id. Call `wait`
+    before anything that needs the artifacts, e.g. registering the logged model.
+    """
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mlflow-log")
+        self._futures = []
+
+    def _run(self, run_id, fn, args, kwargs):
+        with mlflow.start_run(run_id=run_id):
+            return fn(*args, **kwargs)
+
+    def submit(self, run_id, fn, *args, **kwargs):
+        future = self._pool.submit(self._run, run_id, fn, args, kwargs)
+        self._futures.append(future)
+        return future
+
+    def wait(self):
+        """Block until every submitted job is done; re-raises the first failure."""
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+
+artifact_logger = BackgroundLogger()
+
+
+def write_if_changed(path, text):
+    """Write `text` to `path` only when the content differs; returns True if written."""
+    try:
+        with open(path) as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    return True
+
+
+def _user_tags(tags):
+    return {k: v for k, v in tags.items() if not k.startswith("mlflow.")}
+
+
+def sync_logged_models(source, target, run, new_run):
+    """
+    Copy the models logged by `run` (MLflow 3 LoggedModels, stored outside the run's
+    artifacts) to `new_run`. Returns {source model id: target model id}.
+    """
+    copied = {}
+    for logged in source.search_logged_models(
+            [run.info.experiment_id], filter_string=f"source_run_id = '{run.info.run_id}'"):
+        new_model = target.create_logged_model(
+            new_run.info.experiment_id, name=logged.name, source_run_id=new_run.info.run_id,
+            tags=_user_tags(logged.tags), params=logged.params, model_type=logged.model_type)
+        with tempfile.TemporaryDirectory() as folder:
+            local = mlflow.artifacts.download_artifacts(
+                artifact_uri=logged.artifact_location, dst_path=folder,
+                tracking_uri=source.tracking_uri)
+            target.log_model_artifacts(new_model.model_id, local)
+        target.finalize_logged_model(new_model.model_id, LoggedModelStatus.READY)
+        copied[logged.model_id] = new_model.model_id
+    return copied
+
+
+def sync_model_versions(source, target, run_id, new_run_id, model_ids):
+    """Register the copied models under the same names, with the version tags (stage=...)."""
+    registered = []
+    for version in source.search_model_versions(f"run_id = '{run_id}'"):
+        # File/sqlite registries leave model_id unset and point `source` at models:/<id>
+        source_id = version.model_id or version.source.removeprefix("models:/")
+        model_id = model_ids.get(source_id)
+        if model_id is None:
+            continue
+        if not target.search_registered_models(filter_string=f"name = '{version.name}'"):
+            target.create_registered_model(version.name)
+        # The artifact location, not models:/<id>, which would resolve against the global URI
+        new_version = target.create_model_version(
+            version.name, source=target.get_logged_model(model_id).artifact_location,
+            run_id=new_run_id, tags=version.tags, model_id=model_id)
+        registered.append((version.name, new_version.version))
+        print(f"📦 Registered {version.name} v{version.version} -> v{new_version.version}")
+    return registered
+
+
+def sync_runs(experiment_name, source_uri=OFFLINE_TRACKING_URI, target_uri=None):
+    """
+    Copy runs buffered in the offline store to the tracking server.
+
+    Params, metrics, tags, artifacts and logged models are replayed into a new run on the
+    target, and registered versions of those models are re-registered with their tags. The
+    source run is tagged with the target run id so syncing again skips it.
+    """
+    target_uri = target_uri or os.environ.get("MLFLOW_TRACKING_URI", DEFAULT_TRACKING_URI)
+    source, target = MlflowClient(source_uri), MlflowClient(target_uri)
+
+    experiment = source.get_experiment_by_name(experiment_name)
+    if experiment is None:
+        return []
+    target_experiment = target.get_experiment_by_name(experiment_name)
+    experiment_id = (target_experiment.experiment_id if target_experiment
+                     else target.create_experiment(experiment_name))
+
+    synced = []
+    for run in source.search_runs([experiment.experiment_id]):
+        if SYNC_TAG in run.data.tags:
+            continue
+        new_run = target.create_run(experiment_id, run_name=run.info.run_name,
+                                    tags=_user_tags(run.data.tags))
+        new_id = new_run.info.run_id
+        timestamp = int(time.time() * 1000)
+        target.log_batch(
+            new_id,
+            metrics=[Metric(k, v, timestamp, 0) for k, v in run.data.metrics.items()],
+            params=[Param(k, v) for k, v in run.data.params.items()],
+        )
+        with tempfile.TemporaryDirectory() as folder:
+            local = source.download_artifacts(run.info.run_id, "", folder)
+            if os.listdir(local):
+                target.log_artifacts(new_id, local)
+        model_ids = sync_logged_models(source, target, run, new_run)
+        sync_model_versions(source, target, run.info.run_id, new_id, model_ids)
+        target.set_terminated(new_id, run.info.status)
+        source.set_tag(run.info.run_id, SYNC_TAG, new_id)
+        synced.append(new_id)
+        print(f"🔁 Synced run {run.info.run_id} -> {new_id}")
+    return synced
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Push offline MLflow runs to the server")
+    parser.add_argument("--experiment", default="Credit Risk Modeling")
+    parser.add_argument("--source", default=OFFLINE_TRACKING_URI)
+    parser.add_argument("--target", default=None, help="default: MLFLOW_TRACKING_URI")
+    args = parser.parse_args()
+
+    synced = sync_runs(args.experiment, source_uri=args.source, target_uri=args.target)
+    print(f"✅ Synced {len(synced)} run(s)")
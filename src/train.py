@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
@@ -9,20 +8,46 @@ from sklearn.metrics import (
 )
 import mlflow  # type: ignore
 import mlflow.sklearn  # type: ignore
-from mlflow.models.signature import infer_signature  # type: ignore
 from mlflow.tracking import MlflowClient  # type: ignore
+import argparse
 import os
+from data_io import read_table
+from drift import DRIFT_FILENAME, DriftReference
+from feature_eng_process import rolling_window_columns
+from model_search import SEARCH_SPACES, make_estimator, run_search
+from tracking import artifact_logger, configure_tracking, sample_signature, write_if_changed
+from transform_plan import TransformPlan, save_feature_bundle
 
 # Constants
 RANDOM_STATE = 42
 EXPERIMENT_NAME = "Credit Risk Modeling"
-DATA_PATH = "data/processed/feature_engineered_labeled.csv"
+DATA_PATH = "data/processed/feature_engineered_labeled.parquet"
 FEATURE_OUTPUT_PATH = "data/processed/feature_names.txt"
-
-def load_data(path):
-    return pd.read_csv(path)
-
-def preprocess(df):
+SEARCH_RESULTS_PATH = "data/processed/search_results.csv"
+MODEL_NAME = "CreditRiskModel"
+# Fitted feature transforms (written by the features stage / transform_plan.py); bundled
+# with the train-time scaler inside each logged model so serving can rebuild features
+TRANSFORM_PLAN_PATH = "models/transform_plan.npz"
+FEATURE_PIPELINE_PATH = "models/feature_pipeline.joblib"
+FEATURE_BUNDLE_DIR = "models/feature_bundle"
+# Training histograms for drift monitoring, also logged inside each model
+DRIFT_REFERENCE_DIR = "models/drift"
+
+def load_data(path, columns=None):
+    return read_table(path, columns=columns)
+
+def preprocess(df, scaler=None, return_scaler=False):
+    """
+    Drop IDs, split off the target and standardize numeric columns. A fitted `scaler` is
+    reused as-is instead of fitting a new one; `return_scaler=True` also returns it.
+    """
+    rolling = rolling_window_columns(df.columns)
+    if rolling:
+        raise ValueError(
+            f"Rolling-window features {rolling} cannot be served: the transform plan does not "
+            "compile them and CustomerData has no such fields. Rebuild the features without "
+            "--rolling-windows before training"
+        )
     drop_cols = ['TransactionId', 'TransactionStartTime', 'CustomerId', 'BatchId']
     df = df.drop(columns=[col for col in drop_cols if col in df.columns], errors='ignore')
 
@@ -30,16 +55,43 @@ def preprocess(df):
     X = df.drop(columns=['is_high_risk'])
 
     numeric_cols = X.select_dtypes(include=['number']).columns
-    scaler = StandardScaler()
-    X[numeric_cols] = scaler.fit_transform(X[numeric_cols])
+    if scaler is None:
+        scaler = StandardScaler().fit(X[numeric_cols])
+    X[numeric_cols] = scaler.transform(X[numeric_cols])
 
     non_numeric_cols = X.select_dtypes(exclude=['number']).columns
     if len(non_numeric_cols) > 0:
         print(f"⚠️ Dropping non-numeric columns: {list(non_numeric_cols)}")
         X = X.drop(columns=non_numeric_cols)
 
+    if return_scaler:
+        return X, y, scaler
     return X, y
 
+
+def build_feature_bundle(scaler, feature_names, plan_path=TRANSFORM_PLAN_PATH,
+                         pipeline_path=FEATURE_PIPELINE_PATH, folder=FEATURE_BUNDLE_DIR):
+    """Files to log inside the model: compiled plan, train scaler, fitted pipeline."""
+    if not os.path.exists(plan_path):
+        print(f"⚠️ No transform plan at {plan_path}; models are logged without transforms")
+        return []
+    plan = TransformPlan.load(plan_path)
+    try:
+        plan.indexer(list(feature_names))
+    except ValueError as e:
+        print(f"⚠️ Transform plan does not match the training features ({e}); not bundled")
+        return []
+    pipeline_path = pipeline_path if os.path.exists(pipeline_path) else None
+    return save_feature_bundle(folder, scaler, feature_names, plan, pipeline_path)
+
+
+def save_drift_reference(model, X_train, name, folder=DRIFT_REFERENCE_DIR):
+    """Fixed-bin histograms of the training inputs and scores (see drift.py)."""
+    reference = DriftReference.from_training(X_train, model.predict_proba(X_train)[:, 1])
+    path = os.path.join(folder, name.lower(), DRIFT_FILENAME)
+    reference.save(path)
+    return path
+
 def evaluate_model(model, X_test, y_test):
     y_pred = model.predict(X_test)
     y_proba = model.predict_proba(X_test)[:, 1]
@@ -52,7 +104,8 @@ def evaluate_model(model, X_test, y_test):
         'roc_auc': roc_auc_score(y_test, y_proba)
     }
 
-def train_and_log_model(name, model, params, X_train, y_train, X_test, y_test):
+def train_and_log_model(name, model, params, X_train, y_train, X_test, y_test,
+                        extra_metrics=None, artifacts=(), extra_files=None):
     with mlflow.start_run(run_name=name) as run:
         run_id = run.info.run_id
 
@@ -60,69 +113,127 @@ def train_and_log_model(name, model, params, X_train, y_train, X_test, y_test):
         model.fit(X_train, y_train)
 
         metrics = evaluate_model(model, X_test, y_test)
-
-        mlflow.log_params(params)
-        mlflow.log_metrics(metrics)
-
-        input_example = X_test.iloc[:1]
-        signature = infer_signature(X_test, model.predict(X_test))
-
-        mlflow.sklearn.log_model(
+        extra_files = list(extra_files or []) + [save_drift_reference(model, X_train, name)]
+
+        # Params/metrics are queued by MLflow's async logger; the model is serialized and
+        # uploaded on a background thread while the next model trains
+        mlflow.log_params(params, synchronous=False)
+        mlflow.log_metrics({**metrics, **(extra_metrics or {})}, synchronous=False)
+        for path in artifacts:
+            artifact_logger.submit(run_id, mlflow.log_artifact, path)
+
+        signature, input_example = sample_signature(model, X_test)
+        artifact_logger.submit(
+            run_id, mlflow.sklearn.log_model,
             model,
             artifact_path=name.lower() + "_model",
             input_example=input_example,
-            signature=signature
+            signature=signature,
+            extra_files=extra_files,
+            # Newer MLflow defaults to skops, which refuses to load tree models
+            serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE
         )
 
         print(f"\n✅ Results for {name}:")
         for metric, value in metrics.items():
             print(f"{metric}: {value:.4f}")
 
-        os.makedirs(os.path.dirname(FEATURE_OUTPUT_PATH), exist_ok=True)
-        with open(FEATURE_OUTPUT_PATH, "w") as f:
-            f.write("\n".join(X_train.columns.tolist()))
-        print(f"📝 Feature names written to {FEATURE_OUTPUT_PATH}")
+        if write_if_changed(FEATURE_OUTPUT_PATH, "\n".join(X_train.columns.tolist())):
+            print(f"📝 Feature names written to {FEATURE_OUTPUT_PATH}")
 
         return model, run_id
 
-def main():
-    # ✅ Dynamically detect MLflow URI (default to localhost)
-    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", "http://localhost:5000"))
+
+def register_model(run_id, artifact_path):
+    # The model is logged in the background; it has to exist before it can be registered
+    artifact_logger.wait()
+    model_uri = f"runs:/{run_id}/{artifact_path}"
+    print(f"📦 Registering the model from URI: {model_uri}")
+    result = mlflow.register_model(model_uri=model_uri, name=MODEL_NAME)
+    version = result.version
+
+    # ✅ Add custom tags instead of deprecated stage
+    client = MlflowClient()
+    client.set_model_version_tag(MODEL_NAME, version, "stage", "production")
+    client.set_model_version_tag(MODEL_NAME, version, "promoted_by", "dagmawi")
+
+    print(f"🚀 Model version {version} tagged as 'production'")
+    return version
+
+
+def search_and_log(X_train, y_train, X_test, y_test, mode='grid', models=tuple(SEARCH_SPACES),
+                   n_iter=10, cv=5, n_jobs=-1, extra_files=None):
+    """CV search on the training split; the best trial is refit on it, logged and returned."""
+    results = run_search(X_train, y_train, models=models, mode=mode, n_iter=n_iter, cv=cv,
+                         n_jobs=n_jobs)
+    print(results[['model', 'mean_roc_auc', 'std_roc_auc', 'mean_f1_score', 'params']].head(10)
+          .to_string())
+
+    os.makedirs(os.path.dirname(SEARCH_RESULTS_PATH), exist_ok=True)
+    results.to_csv(SEARCH_RESULTS_PATH, index=False)
+
+    best = results.iloc[0]
+    return train_and_log_model(
+        best['model'], make_estimator(best['model']), best['params'],
+        X_train, y_train, X_test, y_test,
+        extra_metrics={'cv_roc_auc': best['mean_roc_auc'], 'cv_roc_auc_std': best['std_roc_auc']},
+        artifacts=[SEARCH_RESULTS_PATH], extra_files=extra_files
+    ), best['model']
+
+def main(search=None, models=tuple(SEARCH_SPACES), n_iter=10, cv=5, n_jobs=-1,
+         data_path=DATA_PATH, plan_path=TRANSFORM_PLAN_PATH,
+         pipeline_path=FEATURE_PIPELINE_PATH):
+    # ✅ Dynamically detect MLflow URI (default to localhost); falls back to a local store
+    # when the server is down or MLFLOW_OFFLINE=1 (push later with src/tracking.py)
+    configure_tracking()
     mlflow.set_experiment(EXPERIMENT_NAME)
 
     print("📥 Loading and preprocessing data...")
-    df = load_data(DATA_PATH)
-    X, y = preprocess(df)
+    df = load_data(data_path)
+    X, y, scaler = preprocess(df, return_scaler=True)
+    bundle_files = build_feature_bundle(scaler, X.columns, plan_path, pipeline_path)
 
     print("🔀 Splitting dataset...")
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y
     )
 
+    if search:
+        print(f"🔎 Running {search} search over {', '.join(models)}...")
+        (_, run_id), best_name = search_and_log(
+            X_train, y_train, X_test, y_test, mode=search, models=models, n_iter=n_iter,
+            cv=cv, n_jobs=n_jobs, extra_files=bundle_files
+        )
+        register_model(run_id, best_name.lower() + "_model")
+        return
+
     print("🤖 Training models and logging to MLflow...")
 
     # Logistic Regression
     lr_model = LogisticRegression()
     lr_params = {'C': 1.0, 'solver': 'lbfgs', 'max_iter': 500}
-    train_and_log_model("LogisticRegression", lr_model, lr_params, X_train, y_train, X_test, y_test)
+    train_and_log_model("LogisticRegression", lr_model, lr_params, X_train, y_train, X_test, y_test,
+                        extra_files=bundle_files)
 
     # Random Forest
     rf_model = RandomForestClassifier()
     rf_params = {'n_estimators': 100, 'max_depth': 5, 'random_state': RANDOM_STATE}
-    rf_model, run_id = train_and_log_model("RandomForest", rf_model, rf_params, X_train, y_train, X_test, y_test)
+    rf_model, run_id = train_and_log_model("RandomForest", rf_model, rf_params, X_train, y_train, X_test, y_test,
+                                           extra_files=bundle_files)
 
     # Register model
-    model_uri = f"runs:/{run_id}/randomforest_model"
-    print(f"📦 Registering the RandomForest model from URI: {model_uri}")
-    result = mlflow.register_model(model_uri=model_uri, name="CreditRiskModel")
-    version = result.version
-
-    # ✅ Add custom tags instead of deprecated stage
-    client = MlflowClient()
-    client.set_model_version_tag("CreditRiskModel", version, "stage", "production")
-    client.set_model_version_tag("CreditRiskModel", version, "promoted_by", "dagmawi")
-
-    print(f"🚀 Model version {version} tagged as 'production'")
+    register_model(run_id, "randomforest_model")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train and register the credit risk model")
+    parser.add_argument("--search", choices=['grid', 'random'], default=None,
+                        help="cross-validated hyperparameter search instead of the fixed models")
+    parser.add_argument("--models", nargs='+', choices=list(SEARCH_SPACES),
+                        default=list(SEARCH_SPACES))
+    parser.add_argument("--n-iter", type=int, default=10, help="candidates per model (random)")
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    main(search=args.search, models=args.models, n_iter=args.n_iter, cv=args.cv,
+         n_jobs=args.n_jobs)
@@ -0,0 +1,391 @@
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import numpy as np
+
+from feature_eng_process import (
+    AggregateFeatures, CategoricalEncoder, CategoricalImputer, DatetimeFeatures,
+    NumericImputerScaler, OutlierFlagger, RollingWindowFeatures, WOEEncoder
+)
+
+DATETIME_FEATURES = ['transaction_hour', 'transaction_day', 'transaction_month',
+                     'transaction_year']
+
+
+class TransformPlan:
+    """
+    A fitted feature engineering pipeline compiled into lookup tables.
+
+    Builds the pipeline's numeric output for raw transaction dicts directly in NumPy:
+    customer aggregates come from a CustomerId -> row index, categories from per-column
+    index maps (one-hot positions, codes or WOE values), the numeric columns from the
+    fitted medians and scaler vectors, and outlier flags from stored bounds. No DataFrame,
+    merge or `pd.to_datetime` is involved, so one record takes microseconds.
+
+    Columns are produced in `feature_names` order; `indexer(names)` reorders them for a
+    model that expects a different order.
+    """
+
+    def __init__(self, feature_names, passthrough, flag_cols, flag_bounds, group_col,
+                 aggregate_names, customer_ids, aggregate_values, datetime_col,
+                 categorical, numeric_cols, numeric_medians, numeric_mean, numeric_scale):
+        self.feature_names = list(feature_names)
+        self.passthrough = list(passthrough)
+        self.flag_cols = list(flag_cols)
+        self.flag_bounds = np.asarray(flag_bounds, dtype=np.float64).reshape(-1, 2)
+        self.group_col = group_col
+        self.aggregate_names = list(aggregate_names)
+        self.customer_ids = np.asarray(customer_ids, dtype=str)
+        self.aggregate_values = np.asarray(aggregate_values, dtype=np.float64)
+        self.datetime_col = datetime_col
+        self.categorical = categorical
+        self.numeric_cols = list(numeric_cols)
+        self.numeric_medians = np.asarray(numeric_medians, dtype=np.float64)
+        self.numeric_mean = np.asarray(numeric_mean, dtype=np.float64)
+        self.numeric_scale = np.asarray(numeric_scale, dtype=np.float64)
+
+        position = {name: i for i, name in enumerate(self.feature_names)}
+        self._position = position
+        self._customer_index = {c: i for i, c in enumerate(self.customer_ids.tolist())}
+        # Unknown customers index the trailing NaN row, like the pipeline's left merge
+        self._aggregate_table = np.vstack([
+            self.aggregate_values.reshape(-1, len(self.aggregate_names)),
+            np.full((1, len(self.aggregate_names)), np.nan)
+        ])
+        self._category_index = {
+            spec['column']: {c: i for i, c in enumerate(spec['categories'])}
+            for spec in self.categorical
+        }
+        self._indexers = {}
+
+    # --------- Compilation ------------
+
+    @classmethod
+    def from_pipeline(cls, pipeline, outlier_flagger=None, passthrough=('FraudResult',)):
+        """Compile a fitted `build_feature_engineering_pipeline` (plus optional flagger)."""
+        steps = [step for _, step in pipeline.steps]
+        flaggers = [step for step in steps if isinstance(step, OutlierFlagger)]
+        outlier_flagger = outlier_flagger or (flaggers[0] if flaggers else None)
+
+        spec = {
+            'passthrough': list(passthrough), 'flag_cols': [], 'flag_bounds': np.empty((0, 2)),
+            'group_col': None, 'aggregate_names': [], 'customer_ids': np.empty(0, dtype=str),
+            'aggregate_values': np.empty((0, 0)), 'datetime_col': None, 'categorical': [],
+            'numeric_cols': [], 'numeric_medians': [], 'numeric_mean': [], 'numeric_scale': [],
+        }
+        names = list(passthrough)
+        if outlier_flagger is not None:
+            spec['flag_cols'] = list(outlier_flagger.bounds_)
+            spec['flag_bounds'] = [outlier_flagger.bounds_[col] for col in spec['flag_cols']]
+            names += [f"{col}_outlier_flag" for col in spec['flag_cols']]
+
+        fill_values = {}
+        for step in steps:
+            if isinstance(step, AggregateFeatures):
+                table = step.agg_features_
+                spec['group_col'] = step.group_col
+                spec['aggregate_names'] = [c for c in table.columns if c != step.group_col]
+                spec['customer_ids'] = table[step.group_col].astype(str).to_numpy()
+                spec['aggregate_values'] = table[spec['aggregate_names']].to_numpy(np.float64)
+                names += spec['aggregate_names']
+            elif isinstance(step, DatetimeFeatures):
+                spec['datetime_col'] = step.datetime_col
+                names += DATETIME_FEATURES
+            elif isinstance(step, CategoricalImputer):
+                fill_values.update(step.fill_values_)
+            elif isinstance(step, CategoricalEncoder):
+                for col, categories in zip(step.categorical_cols, step.ohe.categories_):
+                    mode = 'codes' if step.output == 'codes' else 'onehot'
+                    spec['categorical'].append(
+                        _categorical_spec(col, categories, mode, fill_values.get(col))
+                    )
+                if step.output == 'codes':
+                    names += list(step.categorical_cols)
+                else:
+                    names += list(step.ohe.get_feature_names_out(step.categorical_cols))
+            elif isinstance(step, WOEEncoder):
+                for col in step.categorical_cols:
+                    entry = _categorical_spec(col, step.categories_[col], 'woe',
+                                              fill_values.get(col))
+                    entry['woe'] = step.woe_values_[col].astype(np.float64).tolist()
+                    spec['categorical'].append(entry)
+                names += list(step.categorical_cols)
+            elif isinstance(step, NumericImputerScaler):
+                spec['numeric_cols'] = list(step.numeric_cols)
+                spec['numeric_medians'] = step.imputer.statistics_
+                spec['numeric_mean'] = step.scaler.mean_
+                spec['numeric_scale'] = step.scaler.scale_
+                names += list(step.numeric_cols)
+            elif isinstance(step, RollingWindowFeatures):
+                raise TypeError("RollingWindowFeatures needs each customer's transaction history "
+                                "and cannot be compiled; build the pipeline without "
+                                "rolling_windows for serving")
+            elif not isinstance(step, OutlierFlagger):
+                raise TypeError(f"Cannot compile pipeline step {type(step).__name__}")
+
+        return cls(feature_names=names, **spec)
+
+    # --------- Scoring ------------
+
+    def indexer(self, names):
+        """Column positions of `names` in the plan output (cached per name tuple)."""
+        key = tuple(names)
+        if key not in self._indexers:
+            missing = [name for name in key if name not in self._position]
+            if missing:
+                raise ValueError(f"Transform plan does not produce {missing}")
+            self._indexers[key] = np.array([self._position[name] for name in key])
+        return self._indexers[key]
+
+    def transform_records(self, records, aggregates=None):
+        """
+        Feature matrix for a list of raw transaction dicts.
+
+        `aggregates` optionally holds one dict (or None) per record that replaces the
+        customer aggregates learned at fit time, e.g. fresher values from the aggregate store.
+        """
+        n = len(records)
+        X = np.zeros((n, len(self.feature_names)))
+        pos = self._position
+
+        for name in self.passthrough:
+            X[:, pos[name]] = [_to_float(record.get(name)) for record in records]
+
+        if self.numeric_cols or self.flag_cols:
+            raw_cols = list(dict.fromkeys(self.flag_cols + self.numeric_cols))
+            raw = np.array([[_to_float(record.get(col)) for col in raw_cols] for record in records],
+                           dtype=np.float64).reshape(n, len(raw_cols))
+            if self.flag_cols:
+                values = raw[:, [raw_cols.index(col) for col in self.flag_cols]]
+                lower, upper = self.flag_bounds.T
+                flags = (values < lower) | (values > upper)
+                for j, col in enumerate(self.flag_cols):
+                    X[:, pos[f"{col}_outlier_flag"]] = flags[:, j]
+            if self.numeric_cols:
+                values = raw[:, [raw_cols.index(col) for col in self.numeric_cols]]
+                values = np.where(np.isnan(values), self.numeric_medians, values)
+                values = (values - self.numeric_mean) / self.numeric_scale
+                X[:, [pos[col] for col in self.numeric_cols]] = values
+
+        if self.aggregate_names:
+            rows = [self._customer_index.get(str(record.get(self.group_col)), -1)
+                    for record in records]
+            table = self._aggregate_table[rows]
+            if aggregates is not None:
+                for i, override in enumerate(aggregates):
+                    if override:
+                        table[i] = [override[name] for name in self.aggregate_names]
+            X[:, [pos[name] for name in self.aggregate_names]] = table
+
+        if self.datetime_col is not None:
+            parts = [_datetime_parts(record.get(self.datetime_col)) for record in records]
+            X[:, [pos[name] for name in DATETIME_FEATURES]] = parts
+
+        for spec in self.categorical:
+            col, index = spec['column'], self._category_index[spec['column']]
+            for i, record in enumerate(records):
+                value = record.get(col)
+                if value is None or value != value:
+                    value = spec['fill_value']
+                code = index.get(value, -1)
+                if spec['mode'] == 'onehot':
+                    if code >= 0:
+                        X[i, pos[spec['output_names'][code]]] = 1.0
+                elif spec['mode'] == 'codes':
+                    X[i, pos[col]] = code
+                else:
+                    X[i, pos[col]] = spec['woe'][code]
+        return X
+
+    def transform_one(self, record, aggregates=None):
+        return self.transform_records([record], None if aggregates is None else [aggregates])[0]
+
+    # --------- Persistence ------------
+
+    def save(self, path):
+        meta = {
+            'feature_names': self.feature_names, 'passthrough': self.passthrough,
+            'flag_cols': self.flag_cols, 'group_col': self.group_col,
+            'aggregate_names': self.aggregate_names, 'datetime_col': self.datetime_col,
+            'categorical': self.categorical, 'numeric_cols': self.numeric_cols,
+        }
+        np.savez(path, meta=np.asarray(json.dumps(meta)), flag_bounds=self.flag_bounds,
+                 customer_ids=self.customer_ids, aggregate_values=self.aggregate_values,
+                 numeric_medians=self.numeric_medians, numeric_mean=self.numeric_mean,
+                 numeric_scale=self.numeric_scale)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        meta = json.loads(str(arrays.pop('meta')))
+        return cls(**meta, **arrays)
+
+
+def _categorical_spec(col, categories, mode, fill_value):
+    categories = [str(c) for c in categories]
+    return {
+        'column': col, 'mode': mode, 'categories': categories,
+        'fill_value': None if fill_value is None else str(fill_value),
+        'output_names': [f"{col}_{c}" for c in categories],
+    }
+
+
+def _to_float(value):
+    return np.nan if value is None else float(value)
+
+
+def _datetime_parts(value):
+    """hour/day/month/year in UTC, like pd.to_datetime(errors='coerce') on ISO strings."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            value = None
+    if not isinstance(value, datetime):
+        return (np.nan,) * 4
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.hour, value.day, value.month, value.year
+
+
+# --------- Model bundle ------------
+
+# Files logged inside the MLflow model directory (MLflow puts `extra_files` in this folder)
+BUNDLE_SUBDIR = "extra_files"
+PIPELINE_FILENAME = "feature_pipeline.joblib"
+PLAN_FILENAME = "transform_plan.npz"
+SCALER_FILENAME = "feature_scaler.json"
+
+
+def save_feature_bundle(folder, scaler, feature_names, plan, pipeline_path=None):
+    """
+    Write the train-time transforms next to each other: the compiled plan, the scaler
+    fitted in `train.preprocess` (with the column order it was fitted on) and, when given,
+    the pickled feature pipeline it was compiled from. Returns the written paths.
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths = [os.path.join(folder, PLAN_FILENAME), os.path.join(folder, SCALER_FILENAME)]
+    plan.save(paths[0])
+    with open(paths[1], "w") as f:
+        json.dump({'feature_names': list(feature_names), 'mean': scaler.mean_.tolist(),
+                   'scale': scaler.scale_.tolist()}, f)
+    if pipeline_path:
+        target = os.path.join(folder, PIPELINE_FILENAME)
+        if os.path.abspath(pipeline_path) != os.path.abspath(target):
+            shutil.copyfile(pipeline_path, target)
+        paths.append(target)
+    return paths
+
+
+class FeatureTransforms:
+    """
+    The compiled plan plus the train-time scaler: raw records to the matrix a model was
+    fitted on. `transform_records` picks the model's columns and scales them in place.
+    """
+
+    def __init__(self, plan, feature_names, scaler_mean, scaler_scale):
+        self.plan = plan
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self._columns = plan.indexer(list(feature_names))
+        self._position = {name: i for i, name in enumerate(feature_names)}
+        self._mean = np.asarray(scaler_mean, dtype=np.float64)
+        self._scale = np.asarray(scaler_scale, dtype=np.float64)
+
+    def transform_records(self, records, aggregates=None):
+        X = self.plan.transform_records(records, aggregates)[:, self._columns]
+        X -= self._mean
+        X /= self._scale
+        return X
+
+    def transform_frame(self, df):
+        """Scale pipeline-output columns (a DataFrame) the way `train.preprocess` did."""
+        X = df[list(self.feature_names_in_)].to_numpy(dtype=np.float64)
+        X -= self._mean
+        X /= self._scale
+        return X
+
+    def indexer(self, names):
+        """Column positions of `names` in the `transform_records` output."""
+        missing = [name for name in names if name not in self._position]
+        if missing:
+            raise ValueError(f"Feature transforms do not produce {missing}")
+        return np.array([self._position[name] for name in names])
+
+    def scaling(self, names):
+        """Train-scaler (mean, scale) of `names`, to bring raw values into model space."""
+        columns = self.indexer(names)
+        return self._mean[columns], self._scale[columns]
+
+    @classmethod
+    def load(cls, folder, *args):
+        """
+        From a `save_feature_bundle` folder (`args` go before the plan, for subclasses);
+        None when the plan or the scaler is missing.
+        """
+        plan_path = os.path.join(folder, PLAN_FILENAME)
+        scaler_path = os.path.join(folder, SCALER_FILENAME)
+        if not (os.path.exists(plan_path) and os.path.exists(scaler_path)):
+            return None
+        with open(scaler_path) as f:
+            scaler = json.load(f)
+        return cls(*args, TransformPlan.load(plan_path), scaler['feature_names'],
+                   scaler['mean'], scaler['scale'])
+
+
+class ScoringBundle(FeatureTransforms):
+    """
+    A model together with the transforms it was trained behind.
+
+    `predict_proba` scores already-built feature matrices, so a bundle can be served
+    anywhere a model is. Nothing is refit at serving time.
+    """
+
+    def __init__(self, model, plan, feature_names, scaler_mean, scaler_scale):
+        super().__init__(plan, feature_names, scaler_mean, scaler_scale)
+        self.model = model
+        self.classes_ = getattr(model, 'classes_', None)
+
+    def predict_proba(self, X):
+        if hasattr(self.model, 'get_params') and hasattr(self.model, 'feature_names_in_'):
+            import pandas as pd
+            X = pd.DataFrame(X, columns=self.model.feature_names_in_)
+        return self.model.predict_proba(X)
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+    def score_records(self, records, aggregates=None):
+        return self.predict_proba(self.transform_records(records, aggregates))[:, 1]
+
+
+def attach_bundle(model, model_dir):
+    """Wrap `model` in a ScoringBundle when its MLflow directory carries the transforms."""
+    bundle = ScoringBundle.load(os.path.join(model_dir, BUNDLE_SUBDIR), model)
+    return model if bundle is None else bundle
+
+
+if __name__ == "__main__":
+    import joblib
+    from data_io import read_table
+    from feature_eng_process import build_feature_engineering_pipeline
+
+    parser = argparse.ArgumentParser(description="Fit the feature pipeline and compile it")
+    parser.add_argument("--data", default="data/processed/data_cleaned.parquet")
+    parser.add_argument("--encoding", choices=['onehot', 'codes', 'woe'], default='onehot')
+    parser.add_argument("--pipeline-out", default="models/feature_pipeline.joblib")
+    parser.add_argument("--out", default="models/transform_plan.npz")
+    args = parser.parse_args()
+
+    df = read_table(args.data)
+    pipeline = build_feature_engineering_pipeline(categorical_encoding=args.encoding).fit(df)
+    flagger = OutlierFlagger().fit(df)
+    plan = TransformPlan.from_pipeline(pipeline, outlier_flagger=flagger)
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    joblib.dump(pipeline, args.pipeline_out)
+    plan.save(args.out)
+    print(f"✅ Saved transform plan with {len(plan.feature_names)} features to '{args.out}'")
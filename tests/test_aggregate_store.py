@@ -0,0 +1,46 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest  # type: ignore
+
+# Add project root and src folder to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from aggregate_store import CustomerAggregateStore  # noqa: E402
+from feature_eng_process import AggregateFeatures  # noqa: E402
+
+
+@pytest.fixture
+def transactions():
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({
+        'CustomerId': rng.choice(['C1', 'C2', 'C3'], size=60),
+        'Amount': rng.normal(500, 200, size=60).round(),
+    })
+
+
+def test_incremental_updates_match_batch_aggregates(transactions, tmp_path):
+    path = str(tmp_path / "aggregates.db")
+    store = CustomerAggregateStore(path, flush_every=7)
+    for customer_id, amount in zip(transactions['CustomerId'], transactions['Amount']):
+        store.update(customer_id, amount)
+    store.close()
+
+    expected = AggregateFeatures().fit(transactions).agg_features_.set_index('CustomerId')
+    reopened = CustomerAggregateStore(path)
+    for customer_id, row in expected.iterrows():
+        features = reopened.get(customer_id)
+        for name in expected.columns:
+            assert features[name] == pytest.approx(row[name]), f"{customer_id} {name}"
+    assert reopened.get('unknown') is None
+
+
+def test_seeding_from_fitted_aggregates(transactions):
+    agg = AggregateFeatures().fit(transactions).agg_features_
+    from_agg = CustomerAggregateStore().load_aggregates(agg)
+    from_rows = CustomerAggregateStore().load_transactions(transactions)
+
+    from_agg.update('C1', 1000.0)
+    from_rows.update('C1', 1000.0)
+    assert from_agg.get('C1') == pytest.approx(from_rows.get('C1'))
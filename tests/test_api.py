@@ -0,0 +1,438 @@
+import asyncio
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest  # type: ignore
+from sklearn.ensemble import RandomForestClassifier
+
+# Add project root to sys.path so the `src.api` package resolves
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.pydantic_models import (  # noqa: E402
+    FEATURE_FIELDS, BatchCustomerData, CustomerData
+)
+from src.api.batching import (  # noqa: E402
+    MicroBatcher, columns_to_matrix, records_to_matrix
+)
+from src.api.model_manager import ModelManager  # noqa: E402
+
+FEATURES = list(FEATURE_FIELDS)
+
+
+def make_record(value):
+    return CustomerData(**{name: value for name in FEATURES})
+
+
+def test_records_and_columns_build_same_matrix():
+    records = [make_record(0), make_record(1)]
+    order = FEATURES[::-1]
+    columns = {name: [0, 1] for name in FEATURES}
+
+    X_records = records_to_matrix(records, order)
+    X_columns = columns_to_matrix(columns, order)
+
+    assert X_records.shape == (2, len(FEATURES))
+    assert np.array_equal(X_records, X_columns), "Both layouts should yield the same matrix"
+
+
+def test_columns_to_matrix_rejects_missing_feature():
+    columns = {name: [0.0] for name in FEATURES[1:]}
+    with pytest.raises(ValueError):
+        columns_to_matrix(columns, FEATURES)
+
+
+def test_batch_requires_exactly_one_layout():
+    with pytest.raises(ValueError):
+        BatchCustomerData()
+    batch = BatchCustomerData(columns={name: [0.0, 1.0, 2.0] for name in FEATURES})
+    assert len(batch) == 3
+
+
+def test_micro_batcher_coalesces_and_fans_out():
+    batch_sizes = []
+
+    def double(items):
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+
+    assert results == [i * 2 for i in range(20)], "Each caller should get its own result"
+    assert max(batch_sizes) == 8, "Batches should be capped at max_batch_size"
+    assert sum(batch_sizes) == 20
+
+
+def test_micro_batcher_stop_drains_in_flight_batches():
+    import time
+
+    def slow_double(items):
+        time.sleep(0.05)
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(slow_double, max_batch_size=4, max_wait_ms=1)
+        await batcher.start()
+        pending = [asyncio.ensure_future(batcher.submit(i)) for i in range(10)]
+        await asyncio.sleep(0.01)  # the first batch is being scored
+        await batcher.stop()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(batcher.submit(99), timeout=1)
+        return await asyncio.wait_for(asyncio.gather(*pending), timeout=1)
+
+    assert asyncio.run(run()) == [i * 2 for i in range(10)]
+
+
+class ConstantModel:
+    feature_names_in_ = np.array(FEATURES[:2])
+
+    def __init__(self, p):
+        self.p = p
+
+    def predict_proba(self, X):
+        return np.tile([1 - self.p, self.p], (len(X), 1))
+
+
+def test_model_manager_swaps_and_shadows():
+    models = {"1": ConstantModel(0.2), "2": ConstantModel(0.7)}
+    current = {"version": "1"}
+    manager = ModelManager(loader=models.__getitem__, resolver=lambda: current["version"])
+
+    def build(names):
+        return np.zeros((3, len(names)))
+
+    assert manager.score(build).tolist() == pytest.approx([0.2] * 3)
+    assert manager.reload() is False, "Reload without a new version should be a no-op"
+
+    manager.set_candidate(2, mode="shadow")
+    assert manager.score(build).tolist() == pytest.approx([0.2] * 3), "Shadow must not answer"
+    manager._shadow_pool.shutdown(wait=True)
+    assert manager.status()["latency"]["2"]["mean_abs_diff"] == pytest.approx(0.5)
+
+    current["version"] = "2"
+    assert manager.reload() is True
+    assert manager.status()["active_version"] == "2"
+
+
+def test_model_manager_drops_shadow_calls_when_busy():
+    import threading
+
+    release = threading.Event()
+
+    class BlockedModel(ConstantModel):
+        def predict_proba(self, X):
+            release.wait(timeout=5)
+            return super().predict_proba(X)
+
+    models = {"1": ConstantModel(0.2), "2": BlockedModel(0.7)}
+    manager = ModelManager(loader=models.__getitem__, resolver=lambda: "1",
+                           max_shadow_pending=1)
+    manager.set_candidate(2, mode="shadow")
+    for _ in range(4):
+        manager.score(lambda names: np.zeros((1, len(names))))
+    release.set()
+    manager._shadow_pool.shutdown(wait=True)
+
+    stats = manager.status()["latency"]["2"]
+    assert (stats["calls"], stats["dropped"]) == (1, 3)
+
+
+class BundledModel(ConstantModel):
+    def transform_records(self, records, aggregates=None):
+        return np.zeros((len(records), len(self.feature_names_in_)))
+
+
+def test_model_manager_scores_transactions_with_bundled_transforms():
+    models = {"1": BundledModel(0.3), "2": ConstantModel(0.7)}
+    current = {"version": "1"}
+    manager = ModelManager(loader=models.__getitem__, resolver=lambda: current["version"])
+
+    assert manager.has_transforms()
+    assert manager.score_transactions([{}, {}]).tolist() == pytest.approx([0.3] * 2)
+
+    current["version"] = "2"
+    manager.reload()
+    assert not manager.has_transforms()
+    with pytest.raises(LookupError):
+        manager.score_transactions([{}])
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    """API client backed by a toy model saved to a local directory (no tracking server)."""
+    import mlflow.sklearn
+    from fastapi.testclient import TestClient
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.integers(0, 2, size=(200, len(FEATURES))), columns=FEATURES)
+    model = RandomForestClassifier(n_estimators=10, max_depth=3, random_state=0)
+    model.fit(X, rng.integers(0, 2, size=200))
+
+    model_dir = str(tmp_path_factory.mktemp("model") / "toy")
+    mlflow.sklearn.save_model(model, model_dir, serialization_format="cloudpickle")
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("MODEL_PATH", model_dir)
+        from src.api import main
+        with TestClient(main.app) as test_client:
+            yield test_client
+
+
+def test_predict_and_batch_agree(client):
+    record = make_record(1).model_dump()
+    single = client.post("/predict", json=record)
+    batch = client.post("/predict/batch", json={"records": [record, record]})
+
+    assert single.status_code == 200 and batch.status_code == 200
+    probabilities = batch.json()["risk_probabilities"]
+    assert probabilities == pytest.approx([single.json()["risk_probability"]] * 2)
+
+
+def test_batch_rejects_oversized_request(client, monkeypatch):
+    from src.api import main
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 1)
+    response = client.post("/predict/batch", json={"columns": {n: [0, 1] for n in FEATURES}})
+    assert response.status_code == 413
+
+
+def test_admin_models_reports_local_version(client):
+    client.post("/predict", json=make_record(0).model_dump())
+    status = client.get("/admin/models").json()
+    assert status["active_version"] == "local"
+    assert status["latency"]["local"]["calls"] >= 1
+
+
+def test_aggregates_come_from_store_not_client(client, monkeypatch):
+    from src.api import main
+    from aggregate_store import CustomerAggregateStore
+    from transform_plan import FeatureTransforms
+
+    store = CustomerAggregateStore()
+    monkeypatch.setattr(main, "aggregate_store", store)
+    response = client.post("/customers/C42/transactions", json={"Amount": 500.0})
+    assert response.json()["transaction_count"] == 1
+
+    record = make_record(0).model_dump()
+    record.update(CustomerId="C42", transaction_count=99)
+    # Store values are raw units; without a train scaler they cannot reach the model
+    assert client.post("/predict", json=record).status_code == 503
+
+    plan, scaler = fit_plan_and_scaler()
+    monkeypatch.setattr(main, "feature_transforms",
+                        FeatureTransforms(plan, FEATURES, scaler.mean_, scaler.scale_))
+    mean, scale = (scaler.mean_[[FEATURES.index(n) for n in main.AGGREGATE_FEATURES]],
+                   scaler.scale_[[FEATURES.index(n) for n in main.AGGREGATE_FEATURES]])
+    data = CustomerData(**record)
+    main.fill_aggregates([data])
+    assert data.transaction_count == pytest.approx((1 - mean[2]) / scale[2])
+    assert data.total_transaction_amount == pytest.approx((500.0 - mean[0]) / scale[0])
+
+    record.update(CustomerId="unknown", total_transaction_amount=None)
+    response = client.post("/predict", json=record)
+    assert response.status_code == 422
+
+    # Columnar batches look the aggregates up by their row-aligned customer_ids
+    columns = {name: [record[name]] * 2 for name in FEATURES
+               if name not in main.AGGREGATE_FEATURES}
+    filled = main.fill_aggregate_columns(columns, ["C42", "C42"])
+    assert filled['transaction_count'] == pytest.approx([(1 - mean[2]) / scale[2]] * 2)
+    response = client.post("/predict/batch",
+                           json={"columns": columns, "customer_ids": ["C42", "C42"]})
+    assert response.status_code == 200
+    response = client.post("/predict/batch",
+                           json={"columns": columns, "customer_ids": ["C42", "unknown"]})
+    assert response.status_code == 422
+
+
+def test_outlier_flags_are_required_for_model_space_records(client):
+    record = make_record(0).model_dump()
+    record.pop('Amount_outlier_flag')
+    assert client.post("/predict", json=record).status_code == 422
+
+
+def fit_plan_and_scaler():
+    """A compiled plan over FEATURES and a train.preprocess-style scaler on its output."""
+    from sklearn.preprocessing import StandardScaler
+    from feature_eng_process import OutlierFlagger, build_feature_engineering_pipeline
+    from transform_plan import TransformPlan
+
+    categories = {
+        name.split('_', 1)[0]: [] for name in FEATURES if name.startswith(
+            ('ProductCategory_', 'ChannelId_', 'ProviderId_'))
+    }
+    for name in FEATURES:
+        prefix, _, value = name.partition('_')
+        if prefix in categories:
+            categories[prefix].append(value)
+    rng = np.random.default_rng(0)
+    n = 300
+    train = pd.DataFrame({
+        'CustomerId': rng.choice(['C1', 'C2', 'C3'], size=n),
+        **{col: rng.choice(values, size=n) for col, values in categories.items()},
+        'Amount': rng.normal(1000, 300, size=n),
+        'Value': rng.normal(1000, 300, size=n).round(),
+        'PricingStrategy': rng.choice([0, 2, 4], size=n),
+        'TransactionStartTime': '2018-11-15T02:18:49Z',
+        'FraudResult': 0,
+    })
+    pipeline = build_feature_engineering_pipeline().fit(train)
+    plan = TransformPlan.from_pipeline(pipeline, outlier_flagger=OutlierFlagger().fit(train))
+    X_train = plan.transform_records(train.to_dict('records'))[:, plan.indexer(FEATURES)]
+    return plan, StandardScaler().fit(X_train)
+
+
+def test_score_transaction_uses_scaled_feature_transforms(client, monkeypatch):
+    from src.api import main
+    from transform_plan import FeatureTransforms
+
+    plan, scaler = fit_plan_and_scaler()
+    mean, scale = scaler.mean_, scaler.scale_
+    transforms = FeatureTransforms(plan, FEATURES, mean, scale)
+
+    transaction = {'CustomerId': 'C1', 'ProductCategory': 'airtime', 'ChannelId': 'ChannelId_3',
+                   'ProviderId': 'ProviderId_6', 'Amount': 1000.0, 'Value': 1000.0,
+                   'PricingStrategy': 2, 'TransactionStartTime': '2018-12-01T10:00:00Z',
+                   'FraudResult': 0}
+    assert client.post("/score/transaction", json=transaction).status_code == 503
+
+    monkeypatch.setattr(main, "feature_transforms", transforms)
+    response = client.post("/score/transaction", json=transaction)
+    assert response.status_code == 200
+
+    # Scored in the model's (train.preprocess) scaling, not on the raw plan output
+    features = (plan.transform_one(transaction)[plan.indexer(FEATURES)] - mean) / scale
+    expected = main.manager.score(
+        lambda names: features[None, :][:, [FEATURES.index(n) for n in names]])[0]
+    assert response.json()["risk_probability"] == pytest.approx(expected)
+
+
+class FailingTransforms:
+    def __init__(self, error):
+        self.error = error
+
+    def transform_records(self, records, aggregates=None):
+        raise self.error
+
+
+def test_score_transaction_separates_client_errors_from_internal_ones(client, monkeypatch):
+    from src.api import main
+
+    transaction = {'CustomerId': 'C1', 'TransactionStartTime': '2018-12-01T10:00:00Z'}
+    monkeypatch.setattr(main, "feature_transforms", FailingTransforms(ValueError("bad input")))
+    response = client.post("/score/transaction", json=transaction)
+    assert response.status_code == 422 and response.json()["detail"] == "bad input"
+
+    monkeypatch.setattr(main, "feature_transforms", FailingTransforms(KeyError("broken plan")))
+    assert client.post("/score/transaction", json=transaction).status_code == 500
+
+
+def test_batch_scores_match_score_transaction(client, monkeypatch, tmp_path):
+    import shutil
+    from src.api import main
+    from predict import score_file
+    from transform_plan import BUNDLE_SUBDIR, FeatureTransforms, save_feature_bundle
+
+    plan, scaler = fit_plan_and_scaler()
+    monkeypatch.setattr(main, "feature_transforms",
+                        FeatureTransforms(plan, FEATURES, scaler.mean_, scaler.scale_))
+    transactions = [
+        {'CustomerId': customer, 'ProductCategory': 'airtime', 'ChannelId': 'ChannelId_3',
+         'ProviderId': 'ProviderId_6', 'Amount': amount, 'Value': abs(amount),
+         'PricingStrategy': 2, 'TransactionStartTime': '2018-12-01T10:00:00Z', 'FraudResult': 0}
+        for customer, amount in [('C1', 1000.0), ('C2', -400.0), ('C3', 2500.0), ('C1', 50.0)]
+    ]
+    online = [client.post("/score/transaction", json=t).json()["risk_probability"]
+              for t in transactions]
+
+    # The served model plus its feature bundle, scoring the pipeline output file offline
+    model_dir = str(tmp_path / "bundled")
+    shutil.copytree(os.environ["MODEL_PATH"], model_dir)
+    save_feature_bundle(os.path.join(model_dir, BUNDLE_SUBDIR), scaler, FEATURES, plan)
+    monkeypatch.setenv("MODEL_PATH", model_dir)
+    features = pd.DataFrame(plan.transform_records(transactions), columns=plan.feature_names)
+    features.insert(0, 'TransactionId', [f"T{i}" for i in range(len(transactions))])
+    features.to_csv(tmp_path / "features.csv", index=False)
+
+    score_file(str(tmp_path / "features.csv"), str(tmp_path / "scores.csv"), chunksize=3)
+    offline = pd.read_csv(tmp_path / "scores.csv")['risk_probability']
+    assert offline.tolist() == pytest.approx(online)
+
+
+def test_metrics_endpoint_reports_stages_and_model(client):
+    record = make_record(1).model_dump()
+    client.post("/predict", json=record)
+    client.post("/predict/batch", json={"records": [record] * 3})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    for stage in ("parse", "frame_build", "predict", "serialize"):
+        assert f'credit_risk_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'credit_risk_requests_total{path="/predict",method="POST",status="200"}' in text
+    assert 'credit_risk_batch_size_bucket{source="request",le="4.0"} ' in text
+    assert 'credit_risk_model_info{version="local",role="active"} 1' in text
+    assert "credit_risk_requests_in_flight 1" in text, "Only the /metrics call is in flight"
+
+
+def test_histogram_renders_cumulative_buckets_and_profiler_dumps_stacks(tmp_path):
+    import time
+    from src.api.metrics import Histogram, RequestTimer, SlowRequestProfiler
+
+    histogram = Histogram("latency_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, stage="a")
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="a",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{stage="a"} 4' in lines
+    with pytest.raises(ValueError):
+        histogram.observe(1.0, other="a")
+
+    profiler = SlowRequestProfiler(threshold_ms=10, interval_ms=1, out_dir=str(tmp_path))
+    profiler.start()
+    timer = RequestTimer()
+    profiler.track(timer)
+    time.sleep(0.1)
+    profiler.stop()
+    path = profiler.finish(timer, 0.1, "POST /predict")
+    assert path is not None and path.endswith("_predict.folded")
+    with open(path) as f:
+        assert "test_histogram_renders_cumulative_buckets" in f.read()
+
+
+def test_drift_endpoint_compares_served_features_with_reference(client, monkeypatch, tmp_path):
+    from src.api import main
+    from drift import DriftReference
+
+    assert client.get("/drift").status_code == 404
+
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.integers(0, 2, size=(500, len(FEATURES))), columns=FEATURES)
+    path = str(tmp_path / "drift_reference.json")
+    DriftReference.from_training(X, rng.random(500)).save(path)
+    monkeypatch.setattr(main, "DRIFT_REFERENCE_PATH", path)
+    monkeypatch.setattr(main, "drift_monitors", {})
+
+    record = make_record(1).model_dump()
+    assert client.post("/predict/batch", json={"records": [record] * 40}).status_code == 200
+    report = client.get("/drift").json()
+
+    assert report["version"] == "local" and report["rows"] == 40
+    assert set(report["features"]) == set(FEATURES)
+    assert "ProductCategory_airtime" in report["drifted"], "All-ones column vs a 50/50 split"
+    assert client.get("/drift", params={"version": "nope"}).status_code == 404
+
+    # Before any model is loaded the endpoint answers 404 instead of loading one
+    monkeypatch.setattr(main.manager, "active", None)
+    assert client.get("/drift").status_code == 404
+    assert main.manager.active is None
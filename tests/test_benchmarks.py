@@ -0,0 +1,54 @@
+import sys
+import os
+import multiprocessing
+import signal
+
+# Add src and benchmarks folders to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+from run_benchmarks import _collect, compare  # noqa: E402
+from synthetic import make_transactions  # noqa: E402
+
+
+def test_synthetic_transactions_match_raw_schema():
+    df = make_transactions(10_000)
+    for col in ['CustomerId', 'Amount', 'Value', 'ProductCategory', 'ChannelId', 'ProviderId',
+                'TransactionStartTime', 'FraudResult']:
+        assert col in df.columns
+    assert len(df) == 10_000
+    assert (df['Value'] == df['Amount'].abs()).all()
+    assert df['TransactionStartTime'].is_monotonic_increasing
+
+
+def test_compare_flags_time_memory_and_failures():
+    baseline = {
+        'rfm@10000': {'seconds': 1.0, 'peak_rss_mb': 100.0},
+        'woe_iv@10000': {'seconds': 0.001, 'peak_rss_mb': 0.0},
+    }
+    results = {
+        'rfm@10000': {'seconds': 1.5, 'peak_rss_mb': 200.0},
+        'woe_iv@10000': {'seconds': 0.003, 'peak_rss_mb': 1.0},
+        'predict@10000': {'error': 'RuntimeError: boom'},
+        'rfm@100000': {'seconds': 9.0, 'peak_rss_mb': 10.0},
+    }
+    regressions = compare(results, baseline, threshold=0.2)
+
+    assert len(regressions) == 3
+    assert any(r.startswith('rfm@10000 time') for r in regressions)
+    assert any(r.startswith('rfm@10000 peak RSS') for r in regressions)
+    assert any(r.startswith('predict@10000 failed') for r in regressions)
+    assert compare({'rfm@10000': {'seconds': 1.1, 'peak_rss_mb': 100.0}}, baseline) == []
+
+
+def _killed(results):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_collect_records_a_killed_child():
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    child = context.Process(target=_killed, args=(results,))
+    child.start()
+    result = _collect(child, results, timeout=30)
+    assert result == {'error': f"child exited with code {-signal.SIGKILL} without a result"}
@@ -36,3 +36,88 @@ def test_preprocess_features():
     # Assert feature columns are as expected
     expected_features = {'Feature1', 'Feature2'}
     assert set(X.columns) == expected_features, f"Features columns mismatch. Expected {expected_features}, got {set(X.columns)}"
+
+
+def test_write_and_read_table_keep_typed_schema(tmp_path):
+    from data_io import read_table, write_table
+
+    df = pd.DataFrame({
+        'CustomerId': ['CustomerId_1', 'CustomerId_2', 'CustomerId_1'],
+        'Amount': [1000.0, -20.0, 500.0],
+        'TransactionStartTime': ['2018-11-15T02:18:49Z', '2018-11-15T02:19:08Z',
+                                 '2018-11-15T02:44:21Z'],
+        'FraudResult': [0, 1, 0],
+    })
+
+    for suffix in ['parquet', 'arrow', 'csv']:
+        path = str(tmp_path / f"data.{suffix}")
+        write_table(df, path)
+        loaded = read_table(path)
+        assert isinstance(loaded['CustomerId'].dtype, pd.CategoricalDtype), suffix
+        assert pd.api.types.is_datetime64_any_dtype(loaded['TransactionStartTime']), suffix
+        assert loaded['FraudResult'].dtype == 'int8', suffix
+
+        projected = read_table(path, columns=['CustomerId', 'Amount'])
+        assert list(projected.columns) == ['CustomerId', 'Amount'], suffix
+
+
+def test_write_table_round_trips_sparse_encoded_features(tmp_path):
+    from data_io import read_table, write_table
+    from feature_eng_process import CategoricalEncoder
+
+    df = pd.DataFrame({'ProductCategory': ['airtime', 'tv', 'airtime'], 'Amount': [1.0, 2.0, 3.0]})
+    encoded = CategoricalEncoder(['ProductCategory'], output='sparse').fit(df).transform(df)
+    assert isinstance(encoded['ProductCategory_airtime'].dtype, pd.SparseDtype)
+
+    for suffix in ['parquet', 'arrow', 'csv']:
+        path = str(tmp_path / f"sparse.{suffix}")
+        write_table(encoded, path)
+        loaded = read_table(path)
+        assert loaded['ProductCategory_airtime'].tolist() == [1, 0, 1], suffix
+        assert loaded['ProductCategory_tv'].tolist() == [0, 1, 0], suffix
+
+
+def test_streaming_profile_matches_exact_profile(tmp_path):
+    import numpy as np
+    from data_io import write_table
+    from data_processing import profile_dataframe, profile_file
+
+    rng = np.random.default_rng(0)
+    n = 20_000
+    df = pd.DataFrame({
+        'Amount': rng.lognormal(6, 1.5, n),
+        'PricingStrategy': rng.choice([0, 2, 2, 2, 4], n),
+        'ProductCategory': rng.choice(['airtime', 'financial_services', 'utility_bill'], n),
+    })
+    path = str(tmp_path / "data.parquet")
+    write_table(df, path)
+
+    exact = profile_dataframe(df, bins=20)
+    streamed = profile_file(path, chunksize=3_000, bins=20, sketch_capacity=512)
+
+    for col in ['Amount', 'PricingStrategy']:
+        e, s = exact['numeric'][col], streamed['numeric'][col]
+        assert s['count'] == e['count'] == n
+        assert s['mean'] == pytest.approx(e['mean'])
+        assert s['std'] == pytest.approx(e['std'])
+        assert sum(s['histogram']['counts']) == pytest.approx(n, abs=len(s['histogram']['counts']))
+        assert s['outliers'] == pytest.approx(e['outliers'], abs=0.01 * n)
+    median = streamed['numeric']['Amount']['q50']
+    assert np.mean(df['Amount'] <= median) == pytest.approx(0.5, abs=0.01)
+    assert streamed['categorical']['ProductCategory']['top'] == \
+        exact['categorical']['ProductCategory']['top']
+
+
+def test_profiles_handle_an_all_missing_numeric_column(tmp_path):
+    import numpy as np
+    from data_processing import profile_dataframe, profile_file
+
+    df = pd.DataFrame({'Amount': [1.0, 2.0, 3.0], 'Value': [np.nan] * 3})
+    path = str(tmp_path / "data.csv")
+    df.to_csv(path, index=False)
+
+    for report in (profile_dataframe(df), profile_file(path)):
+        stats = report['numeric']['Value']
+        assert (stats['count'], stats['missing']) == (0, 3)
+        assert stats['histogram']['counts'] == []
+        assert report['numeric']['Amount']['count'] == 3
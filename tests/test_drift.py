@@ -0,0 +1,118 @@
+import sys
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Add src folder to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from drift import (  # noqa: E402
+    DriftMonitor, DriftReference, HistogramSet, drift_report_file, ks, psi
+)
+
+
+def make_features(n=5000, shift=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Amount': rng.normal(shift, 1.0, size=n),
+        'flag': rng.integers(0, 2, size=n),
+        'count': rng.poisson(3, size=n).astype(float),
+    })
+
+
+def test_histograms_use_fixed_edges_and_a_missing_bin():
+    histograms = HistogramSet([np.array([0.0, 1.0]), np.array([5.0])])
+    X = np.array([[-1.0, 4.0], [0.0, 5.0], [0.5, np.nan], [1.0, 6.0], [np.nan, 7.0]])
+    counts = histograms.counts(X, block_rows=2)
+
+    # Column 0: (-inf, 0), [0, 1), [1, inf), NaN; column 1 has one padded (empty) bin
+    assert counts[0].tolist() == [1, 2, 1, 1]
+    assert counts[1].tolist() == [1, 3, 0, 1]
+
+
+def test_psi_and_ks_separate_stable_from_shifted_data(tmp_path):
+    train = make_features()
+    scores = 1 / (1 + np.exp(-train['Amount'].to_numpy()))
+    reference = DriftReference.from_training(train, scores)
+    path = str(tmp_path / "drift_reference.json")
+    reference.save(path)
+    reference = DriftReference.load(path)
+
+    same = DriftMonitor(reference)
+    same.update(make_features(seed=1).to_numpy(), scores)
+    report = same.report()
+    assert report['rows'] == 5000
+    assert all(stats['psi'] < 0.05 for stats in report['features'].values())
+    assert report['drifted'] == []
+
+    shifted = make_features(shift=1.0, seed=2)
+    monitor = DriftMonitor(reference)
+    monitor.update(shifted.to_numpy(), 1 / (1 + np.exp(-shifted['Amount'].to_numpy())))
+    report = monitor.report()
+    assert report['drifted'] == ['Amount', 'risk_probability']
+    assert report['features']['Amount']['ks'] > 0.3
+    assert psi([10, 10], [10, 10]) == 0.0 and ks(np.array([5, 5, 0]), np.array([5, 5, 0])) == 0
+
+
+def test_monitor_merges_per_thread_buffers_and_matches_offline(tmp_path):
+    reference = DriftReference.from_training(make_features(), np.full(5000, 0.5))
+    data = make_features(n=4000, seed=3)
+
+    # Columns arrive in a different order than the reference
+    order = ['count', 'Amount', 'flag']
+    monitor = DriftMonitor(reference, columns=[order.index(n) for n in reference.feature_names])
+    blocks = np.array_split(data[order].to_numpy(), 8)
+    threads = [threading.Thread(target=monitor.update, args=(block,)) for block in blocks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(monitor._buffers) == 8
+
+    path = str(tmp_path / "batch.csv")
+    data.to_csv(path, index=False)
+    offline = drift_report_file(path, reference, chunksize=700)
+    live = monitor.report()
+    assert offline['rows'] == live['rows'] == 4000
+    assert offline['features'] == live['features']
+
+
+def test_offline_report_scales_pipeline_output_like_training(tmp_path):
+    from sklearn.preprocessing import StandardScaler
+    from feature_eng_process import build_feature_engineering_pipeline
+    from transform_plan import FeatureTransforms, TransformPlan
+
+    rng = np.random.default_rng(0)
+    n = 3000
+    raw = pd.DataFrame({
+        'CustomerId': rng.choice([f"C{i}" for i in range(50)], size=n),
+        'ProductCategory': rng.choice(['airtime', 'tv'], size=n),
+        'ChannelId': rng.choice(['ChannelId_2', 'ChannelId_3'], size=n),
+        'ProviderId': rng.choice(['ProviderId_1', 'ProviderId_6'], size=n),
+        'Amount': rng.normal(1000, 300, size=n),
+        'Value': rng.normal(1000, 300, size=n).round(),
+        'PricingStrategy': rng.choice([0, 2, 4], size=n),
+        'TransactionStartTime': pd.Timestamp('2018-11-15', tz='UTC')
+        + pd.to_timedelta(rng.integers(0, 86400 * 60, size=n), unit='s'),
+        'FraudResult': 0,
+    })
+    pipeline = build_feature_engineering_pipeline().fit(raw)
+    output = pipeline.transform(raw)
+    plan = TransformPlan.from_pipeline(pipeline)
+    names = [name for name in plan.feature_names if name in output.columns]
+
+    # As in train.py: the reference is built from the train-scaled frame
+    scaler = StandardScaler().fit(output[names])
+    reference = DriftReference.from_training(
+        pd.DataFrame(scaler.transform(output[names]), columns=names), np.full(n, 0.5))
+    path = str(tmp_path / "features.csv")
+    output.to_csv(path, index=False)
+
+    unscaled = drift_report_file(path, reference, chunksize=1000)
+    assert 'total_transaction_amount' in unscaled['drifted']
+
+    transforms = FeatureTransforms(plan, names, scaler.mean_, scaler.scale_)
+    report = drift_report_file(path, reference, chunksize=1000, transforms=transforms)
+    assert report['rows'] == n
+    assert report['drifted'] == []
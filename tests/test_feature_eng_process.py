@@ -0,0 +1,218 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest  # type: ignore
+
+# Add project root and src folder to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from feature_eng_process import (  # noqa: E402
+    CategoricalEncoder, OutlierFlagger, RollingWindowFeatures, WOEEncoder,
+    build_feature_engineering_pipeline, calculate_woe_iv, calculate_woe_table,
+    rolling_window_columns, window_timedelta
+)
+
+
+def make_raw(n=300, seed=0):
+    """Small frame in the data_cleaned.csv layout."""
+    rng = np.random.default_rng(seed)
+    amount = np.round(rng.normal(1000, 400, size=n), 0)
+    return pd.DataFrame({
+        'TransactionId': [f"TransactionId_{i}" for i in range(n)],
+        'CustomerId': [f"CustomerId_{i}" for i in rng.integers(0, 20, size=n)],
+        'ProviderId': rng.choice([f"ProviderId_{i}" for i in range(1, 7)], size=n),
+        'ProductCategory': rng.choice(['airtime', 'financial_services', 'tv'], size=n),
+        'ChannelId': rng.choice(['ChannelId_2', 'ChannelId_3'], size=n),
+        'Amount': amount,
+        'Value': np.abs(amount).astype(int),
+        'TransactionStartTime': pd.date_range('2018-11-15', periods=n, freq='37min')
+        .strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'PricingStrategy': rng.choice([0, 2, 4], size=n),
+        'FraudResult': (rng.random(n) < 0.1).astype(int),
+    })
+
+
+@pytest.fixture
+def transactions():
+    rng = np.random.default_rng(7)
+    n = 400
+    return pd.DataFrame({
+        'ProviderId': rng.choice(['ProviderId_1', 'ProviderId_4', 'ProviderId_6', None], size=n),
+        'Amount': rng.normal(1000, 300, size=n),
+        'FraudResult': (rng.random(n) < 0.15).astype(int),
+    })
+
+
+def test_woe_table_matches_per_value_definition(transactions):
+    df = transactions
+    eps = 0.0001
+    n_good, n_bad = (df['FraudResult'] == 0).sum(), (df['FraudResult'] == 1).sum()
+
+    iv_dict, tables = calculate_woe_iv(df, ['ProviderId'], return_tables=True)
+    table = tables['ProviderId']
+
+    for val in df['ProviderId'].dropna().unique():
+        rows = df[df['ProviderId'] == val]
+        dist_good = (rows['FraudResult'] == 0).sum() / n_good
+        dist_bad = (rows['FraudResult'] == 1).sum() / n_bad
+        woe = np.log((dist_good + eps) / (dist_bad + eps))
+        assert table.loc[val, 'woe'] == pytest.approx(woe)
+    assert iv_dict['ProviderId'] == pytest.approx(table['iv'].sum())
+
+
+def test_numeric_column_is_binned(transactions):
+    table = calculate_woe_table(transactions, 'Amount', bins=5)
+    assert len(table) == 5
+    assert table['count'].sum() == len(transactions)
+
+
+def test_woe_encoder_uses_fitted_table_and_zero_for_unseen(transactions):
+    df = transactions.dropna()
+    encoder = WOEEncoder(categorical_cols=['ProviderId']).fit(df)
+    table = calculate_woe_table(df, 'ProviderId')
+
+    encoded = encoder.transform(pd.DataFrame({'ProviderId': ['ProviderId_4', 'ProviderId_9']}))
+
+    assert encoded['ProviderId'].dtype == np.float32
+    assert encoded['ProviderId'].iloc[0] == pytest.approx(table.loc['ProviderId_4', 'woe'])
+    assert encoded['ProviderId'].iloc[1] == 0, "Unseen categories should carry no evidence"
+
+
+def test_woe_pipeline_has_one_column_per_categorical():
+    df = make_raw()
+    onehot = build_feature_engineering_pipeline().fit_transform(df)
+    woe = build_feature_engineering_pipeline(categorical_encoding='woe').fit_transform(df)
+
+    assert {'ProductCategory', 'ChannelId', 'ProviderId'} <= set(woe.columns)
+    assert woe.shape[1] == onehot.shape[1] - (3 + 2 + 6) + 3
+
+
+def test_categorical_encoder_output_modes_agree():
+    df = make_raw()
+    cols = ['ProductCategory', 'ChannelId']
+    dense = CategoricalEncoder(cols).fit(df).transform(df)
+    sparse = CategoricalEncoder(cols, output='sparse').fit(df).transform(df)
+    encoder = CategoricalEncoder(cols, output='codes').fit(df)
+    codes = encoder.transform(pd.concat([df.head(2), df.head(1).assign(ChannelId='new')]))
+
+    ohe_cols = list(encoder.ohe.get_feature_names_out(cols))
+    assert list(sparse.columns) == list(dense.columns)
+    assert isinstance(sparse[ohe_cols[0]].dtype, pd.SparseDtype)
+    np.testing.assert_array_equal(
+        sparse[ohe_cols].sparse.to_dense().to_numpy(), dense[ohe_cols].to_numpy()
+    )
+    assert codes['ChannelId'].dtype == np.int8
+    assert codes['ChannelId'].iloc[-1] == -1, "Unseen categories should get code -1"
+
+
+def test_categorical_codes_widen_for_many_categories():
+    from sklearn.base import clone
+
+    df = pd.DataFrame({'ProviderId': [f"P{i}" for i in range(40_000)]})
+    codes = CategoricalEncoder(['ProviderId'], output='codes').fit(df).transform(df)
+    assert codes['ProviderId'].dtype == np.int32
+    assert codes['ProviderId'].max() == 39_999, "Codes must not wrap past int16"
+
+    encoder = CategoricalEncoder(['ProviderId'], output='bogus')
+    assert clone(encoder).output == 'bogus', "Parameters are validated in fit, not __init__"
+    with pytest.raises(ValueError):
+        encoder.fit(df)
+
+
+def test_outlier_flagger_reuses_fitted_bounds(tmp_path):
+    train = make_raw(n=2000)
+    flagger = OutlierFlagger().fit(train)
+
+    q1, q3 = train['Amount'].quantile([0.25, 0.75])
+    assert flagger.bounds_['Amount'] == pytest.approx((q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)))
+
+    flagged = flagger.transform(train)
+    assert flagged['Amount_outlier_flag'].dtype == np.int8
+    expected = (train['Amount'] < flagger.bounds_['Amount'][0]) | \
+        (train['Amount'] > flagger.bounds_['Amount'][1])
+    assert flagged['Amount_outlier_flag'].tolist() == expected.astype(int).tolist()
+
+    # A single record is flagged against the training bounds, not its own quantiles
+    single = flagger.transform(train.iloc[[0]].assign(Amount=1e9))
+    assert single['Amount_outlier_flag'].iloc[0] == 1
+
+    path = str(tmp_path / "bounds.json")
+    flagger.save(path)
+    assert OutlierFlagger.load(path).bounds_ == flagger.bounds_
+
+    streamed = OutlierFlagger()
+    for start in range(0, len(train), 300):
+        streamed.partial_fit(train.iloc[start:start + 300])
+    for col, (lower, upper) in flagger.bounds_.items():
+        assert streamed.bounds_[col] == pytest.approx((lower, upper), rel=0.05, abs=1.0)
+
+
+def test_outlier_flagger_can_be_cloned():
+    from sklearn.base import clone
+
+    flagger = OutlierFlagger(columns=('Amount', 'Value'))
+    copy = clone(flagger)
+    assert copy.get_params() == flagger.get_params()
+    assert list(copy.fit(make_raw()).bounds_) == ['Amount', 'Value']
+
+
+def brute_force_rolling(df, window):
+    times = pd.to_datetime(df['TransactionStartTime'])
+    counts, sums = [], []
+    for i in range(len(df)):
+        earlier = ((df['CustomerId'] == df['CustomerId'].iloc[i])
+                   & (times < times.iloc[i]) & (times >= times.iloc[i] - window_timedelta(window)))
+        counts.append(int(earlier.sum()))
+        sums.append(float(df.loc[earlier, 'Amount'].fillna(0).sum()))
+    return np.array(counts), np.array(sums)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_rolling_window_features_are_point_in_time(n_jobs):
+    rng = np.random.default_rng(3)
+    n = 300
+    times = pd.Timestamp('2018-11-15') + pd.to_timedelta(rng.integers(0, 5 * 86400, n), 's')
+    df = pd.DataFrame({
+        'CustomerId': rng.choice([f"CustomerId_{i}" for i in range(8)], size=n),
+        'TransactionStartTime': times.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'Amount': rng.normal(1000, 300, size=n).round(),
+    })
+    df.loc[5, 'Amount'] = np.nan
+    df.loc[10, 'TransactionStartTime'] = df.loc[11, 'TransactionStartTime']  # same-time tie
+    df.loc[10, 'CustomerId'] = df.loc[11, 'CustomerId']
+
+    windows = ('1h', '24h', '7d')
+    result = RollingWindowFeatures(windows=windows, n_jobs=n_jobs).fit_transform(df)
+
+    assert list(result.index) == list(df.index), "Rows keep their input order"
+    for window in windows:
+        counts, sums = brute_force_rolling(df, window)
+        np.testing.assert_array_equal(result[f'transaction_count_{window}'], counts)
+        np.testing.assert_allclose(result[f'total_transaction_amount_{window}'], sums)
+
+    # The first transaction of each customer has no history at all
+    first = times.to_series(index=df.index).groupby(df['CustomerId']).idxmin()
+    assert (result.loc[first, 'transaction_count_7d'] == 0).all()
+
+
+def test_pipeline_with_rolling_windows_adds_velocity_columns():
+    pipeline = build_feature_engineering_pipeline(rolling_windows=['1h', '24h'])
+    out = pipeline.fit_transform(make_raw())
+    for name in ['transaction_count_1h', 'total_transaction_amount_24h', 'transaction_count']:
+        assert name in out.columns
+    assert sorted(rolling_window_columns(out.columns)) == [
+        'total_transaction_amount_1h', 'total_transaction_amount_24h',
+        'transaction_count_1h', 'transaction_count_24h']
+
+
+def test_rolling_windows_are_rejected_for_serving_and_training():
+    from train import preprocess
+    from transform_plan import TransformPlan
+
+    pipeline = build_feature_engineering_pipeline(rolling_windows=['1h'])
+    out = pipeline.fit_transform(make_raw())
+    with pytest.raises(TypeError, match="rolling_windows"):
+        TransformPlan.from_pipeline(pipeline)
+    with pytest.raises(ValueError, match="--rolling-windows"):
+        preprocess(out.assign(is_high_risk=0))
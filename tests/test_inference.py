@@ -0,0 +1,73 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest  # type: ignore
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+# Add project root and src folder to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from inference_engine import compile_model, load_compiled, save_compiled  # noqa: E402
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(42)
+    X = pd.DataFrame(rng.normal(size=(500, 8)), columns=[f"f{i}" for i in range(8)])
+    y = (X["f0"] + rng.normal(scale=0.5, size=500) > 0).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("model", [
+    RandomForestClassifier(n_estimators=100, max_depth=5, random_state=42),
+    LogisticRegression(C=1.0, solver='lbfgs', max_iter=500),
+])
+def test_compiled_matches_sklearn(model, data, tmp_path):
+    X, y = data
+    model.fit(X, y)
+
+    path = tmp_path / "compiled.npz"
+    save_compiled(compile_model(model), path)
+    compiled = load_compiled(path)
+
+    expected = model.predict_proba(X)
+    np.testing.assert_allclose(compiled.predict_proba(X.to_numpy()), expected, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(compiled.predict_proba(X.to_numpy()[0]), expected[:1], atol=1e-12)
+    assert (compiled.predict(X.to_numpy()) == model.predict(X)).all()
+    assert list(compiled.feature_names_in_) == list(X.columns)
+
+
+def test_compiled_forest_handles_missing_values(data):
+    X, y = data
+    X = X.mask(np.random.default_rng(0).random(X.shape) < 0.1)
+    model = RandomForestClassifier(n_estimators=20, max_depth=5, random_state=0).fit(X, y)
+
+    compiled = compile_model(model)
+    np.testing.assert_array_equal(compiled.predict_proba(X.to_numpy()), model.predict_proba(X))
+
+
+def test_loader_caches_compiled_model_outside_model_dir_and_recompiles(data, tmp_path,
+                                                                       monkeypatch):
+    import shutil
+    import mlflow.sklearn
+    import model_loader
+
+    X, y = data
+    monkeypatch.setattr(model_loader, "MODEL_CACHE_DIR", str(tmp_path / "cache"))
+    model_dir = str(tmp_path / "model")
+    first = LogisticRegression().fit(X, y)
+    mlflow.sklearn.save_model(first, model_dir, serialization_format="cloudpickle")
+
+    loaded = model_loader.load_local_model(model_dir)
+    assert not [name for name in os.listdir(model_dir) if name.endswith(".npz")]
+    assert os.path.exists(model_loader.compiled_cache_path(model_dir))
+    np.testing.assert_allclose(loaded.predict_proba(X.to_numpy()), first.predict_proba(X))
+
+    # A new model saved to the same directory must not be served from the stale cache
+    shutil.rmtree(model_dir)
+    second = LogisticRegression().fit(X, 1 - y)
+    mlflow.sklearn.save_model(second, model_dir, serialization_format="cloudpickle")
+    reloaded = model_loader.load_local_model(model_dir)
+    np.testing.assert_allclose(reloaded.predict_proba(X.to_numpy()), second.predict_proba(X))
@@ -0,0 +1,48 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest  # type: ignore
+
+# Add src folder to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from model_search import data_fingerprint, run_search  # noqa: E402
+
+SPACES = {
+    'LogisticRegression': {'C': [0.1, 1.0], 'max_iter': [200]},
+    'RandomForest': {'n_estimators': [10], 'max_depth': [2, 4]},
+    'XGBoost': {'n_estimators': [20], 'max_depth': [2]},
+}
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 5)), columns=[f"f{i}" for i in range(5)])
+    y = pd.Series((X['f0'] + rng.normal(scale=0.5, size=300) > 0).astype(int))
+    return X, y
+
+
+def test_search_ranks_trials_and_reuses_cache(data, tmp_path, capsys):
+    X, y = data
+    cache_dir = str(tmp_path / "cache")
+    results = run_search(X, y, models=list(SPACES), cv=3, n_jobs=2, cache_dir=cache_dir,
+                         search_spaces=SPACES)
+
+    assert len(results) == 5
+    assert results['mean_roc_auc'].is_monotonic_decreasing
+    assert set(results['model']) == set(SPACES)
+    assert len(os.listdir(cache_dir)) == 5
+
+    capsys.readouterr()
+    rerun = run_search(X, y, models=list(SPACES), cv=3, n_jobs=2, cache_dir=cache_dir,
+                       search_spaces=SPACES)
+    assert "0 trials to run, 5 reused" in capsys.readouterr().out
+    pd.testing.assert_series_equal(rerun['mean_roc_auc'], results['mean_roc_auc'])
+
+
+def test_fingerprint_tracks_data(data):
+    X, y = data
+    assert data_fingerprint(X, y) == data_fingerprint(X.copy(), y.copy())
+    assert data_fingerprint(X, y) != data_fingerprint(X, 1 - y)
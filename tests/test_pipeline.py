@@ -0,0 +1,44 @@
+import sys
+import os
+import pytest  # type: ignore
+
+# Add src and benchmarks folders to sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+
+from pipeline import build_stages, run_pipeline  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    from synthetic import make_transactions
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data/Data")
+    make_transactions(3000, n_customers=300).to_csv("data/Data/data.csv", index=False)
+    return tmp_path
+
+
+def test_pipeline_runs_dag_and_reuses_cache(workdir):
+    stages = ['clean', 'eda', 'features', 'label']
+    report = run_pipeline(build_stages(plot_jobs=1), only=stages, n_jobs=2)
+    assert [report[name]['status'] for name in stages] == ['ran'] * 4
+    assert report['features']['peak_rss_mb'] > 0
+    assert os.path.exists("data/processed/feature_engineered_labeled.parquet")
+    assert os.path.exists("models/transform_plan.npz")
+    assert os.path.exists("reports/pipeline_report.json")
+
+    report = run_pipeline(build_stages(plot_jobs=1), only=stages, n_jobs=2)
+    assert all(row['status'] == 'cached' for row in report.values())
+
+    # A parameter change reruns that stage and everything downstream of it only
+    report = run_pipeline(build_stages(plot_jobs=1, cluster_method='minibatch'), only=stages)
+    assert [report[name]['status'] for name in stages] == ['cached'] * 3 + ['ran']
+
+
+def test_pipeline_reports_missing_input(workdir):
+    os.remove("data/Data/data.csv")
+    report = run_pipeline(build_stages(), only=['clean', 'features'], n_jobs=1)
+    assert report['clean']['status'] == 'failed'
+    assert report['features']['status'].startswith('skipped')
@@ -0,0 +1,64 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest  # type: ignore
+from sklearn.ensemble import RandomForestClassifier
+
+# Add project root and src folder to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from predict import score_file  # noqa: E402
+
+
+@pytest.mark.parametrize("n_jobs, suffix", [(1, "csv"), (2, "parquet")])
+def test_score_file_streams_all_rows(tmp_path, monkeypatch, n_jobs, suffix):
+    import mlflow.sklearn
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'TransactionId': [f"T{i}" for i in range(250)],
+        'CustomerId': [f"C{i % 7}" for i in range(250)],
+        'Amount': rng.normal(size=250),
+        'Value': rng.normal(size=250),
+        'is_high_risk': rng.integers(0, 2, size=250),
+    })
+    model = RandomForestClassifier(n_estimators=5, max_depth=3, random_state=0)
+    model.fit(df[['Amount', 'Value']], df['is_high_risk'])
+    model_dir = str(tmp_path / "model")
+    mlflow.sklearn.save_model(model, model_dir, serialization_format="cloudpickle")
+    monkeypatch.setenv("MODEL_PATH", model_dir)
+
+    input_path = str(tmp_path / f"input.{suffix}")
+    output_path = str(tmp_path / f"scores.{suffix}")
+    if suffix == "csv":
+        df.to_csv(input_path, index=False)
+    else:
+        df.to_parquet(input_path, index=False)
+
+    rows = score_file(input_path, output_path, chunksize=60, n_jobs=n_jobs)
+    scores = pd.read_csv(output_path) if suffix == "csv" else pd.read_parquet(output_path)
+
+    assert rows == 250
+    assert scores['TransactionId'].tolist() == df['TransactionId'].tolist(), "Order must be kept"
+    expected = model.predict_proba(df[['Amount', 'Value']])[:, 1]
+    np.testing.assert_allclose(scores['risk_probability'], expected, atol=1e-12)
+
+
+def test_score_file_resolves_the_production_version_once(tmp_path, monkeypatch):
+    import predict
+
+    calls = []
+    monkeypatch.delenv("MODEL_PATH", raising=False)
+    monkeypatch.delenv("MODEL_VERSION", raising=False)
+    monkeypatch.setattr(predict.model_loader, "resolve_production_version",
+                        lambda name: calls.append(name) or 7)
+    loaded = []
+    monkeypatch.setattr(predict, "score_chunk",
+                        lambda chunk, version, model_path: loaded.append(version) or chunk)
+
+    input_path = str(tmp_path / "input.csv")
+    pd.DataFrame({'TransactionId': range(250)}).to_csv(input_path, index=False)
+    assert score_file(input_path, str(tmp_path / "scores.csv"), chunksize=60) == 250
+    assert calls == ["CreditRiskModel"]
+    assert loaded == [7] * 5
@@ -0,0 +1,115 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest  # type: ignore
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+# Add src folder to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from data_io import read_table, write_table  # noqa: E402
+from proxy_labeling import (  # noqa: E402
+    RFM_FEATURES, RFMClusterer, calculate_rfm, calculate_rfm_chunked,
+    label_high_risk_customers, write_labeled_chunked
+)
+
+
+@pytest.fixture
+def transactions():
+    rng = np.random.default_rng(0)
+    n = 3000
+    customers = rng.zipf(1.5, size=n) % 200
+    return pd.DataFrame({
+        'CustomerId': [f"CustomerId_{c}" for c in customers],
+        'Amount': np.round(rng.lognormal(7, 1, size=n)),
+        'TransactionStartTime': (pd.Timestamp('2018-11-15', tz='UTC') + pd.to_timedelta(
+            rng.integers(0, 90 * 86400, size=n), unit='s')).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    })
+
+
+def legacy_rfm(df):
+    df = df.copy()
+    df['TransactionStartTime'] = pd.to_datetime(df['TransactionStartTime'])
+    snapshot_date = df['TransactionStartTime'].max() + pd.Timedelta(days=1)
+    rfm = df.groupby('CustomerId').agg({
+        'TransactionStartTime': lambda x: (snapshot_date - x.max()).days,
+        'CustomerId': 'count',
+        'Amount': 'sum'
+    })
+    rfm.columns = ['Recency', 'Frequency', 'Monetary']
+    return rfm.reset_index()
+
+
+def test_rfm_matches_legacy_and_does_not_mutate(transactions, tmp_path):
+    original = transactions.copy()
+    rfm = calculate_rfm(transactions)
+    pd.testing.assert_frame_equal(transactions, original)
+    pd.testing.assert_frame_equal(rfm, legacy_rfm(transactions), check_dtype=False)
+
+    path = str(tmp_path / "transactions.parquet")
+    write_table(transactions, path)
+    chunked = calculate_rfm_chunked(path, chunksize=700)
+    pd.testing.assert_frame_equal(chunked, rfm, check_dtype=False)
+    chunked = calculate_rfm_chunked(path, chunksize=200, combine_every=4)
+    pd.testing.assert_frame_equal(chunked, rfm, check_dtype=False)
+
+
+def test_labels_match_full_kmeans_and_persist(transactions, tmp_path):
+    rfm = calculate_rfm(transactions)
+    path = str(tmp_path / "centroids.json")
+    labels = label_high_risk_customers(rfm, centroids_path=path)
+
+    clusters = KMeans(n_clusters=3, random_state=42).fit_predict(
+        StandardScaler().fit_transform(rfm[['Recency', 'Frequency', 'Monetary']]))
+    scores = rfm[['Frequency', 'Monetary']].groupby(clusters).mean().sum(axis=1)
+    expected = (clusters == scores.idxmin()).astype(int)
+    assert labels['is_high_risk'].tolist() == expected.tolist()
+
+    # New customers are labeled with the saved centroids, without refitting
+    restored = RFMClusterer.load(path)
+    assert restored.label(rfm)['is_high_risk'].tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("suffix", ["parquet", "csv"])
+def test_chunked_labeling_matches_the_full_merge(transactions, tmp_path, suffix):
+    path = str(tmp_path / f"transactions.{suffix}")
+    write_table(transactions, path)
+    labels = label_high_risk_customers(calculate_rfm_chunked(path, chunksize=700))
+
+    out = str(tmp_path / f"labeled.{suffix}")
+    write_labeled_chunked(path, labels, out, chunksize=700)
+    df = read_table(path)
+    labels['CustomerId'] = labels['CustomerId'].astype(df['CustomerId'].dtype)
+    expected = df.merge(labels, on='CustomerId', how='left')
+
+    labeled = read_table(out)
+    assert len(labeled) == len(transactions)
+    assert labeled['is_high_risk'].dtype == 'int8'
+    assert labeled['is_high_risk'].tolist() == expected['is_high_risk'].tolist()
+    assert labeled['CustomerId'].astype(str).tolist() == transactions['CustomerId'].tolist()
+
+
+def test_minibatch_partial_fit(transactions):
+    rfm = calculate_rfm(transactions)
+    clusterer = RFMClusterer(method='minibatch', batch_size=64)
+    for start in range(0, len(rfm), 50):
+        clusterer.partial_fit(rfm.iloc[start:start + 50])
+    labels = clusterer.label(rfm)
+    assert labels['is_high_risk'].isin([0, 1]).all()
+    assert clusterer.centers_.shape == (3, 3)
+    with pytest.raises(ValueError):
+        RFMClusterer().partial_fit(rfm)
+
+
+def test_partial_fit_keeps_centroids_when_the_scaler_moves(transactions):
+    rfm = calculate_rfm(transactions)
+    clusterer = RFMClusterer(method='minibatch', batch_size=64)
+    clusterer.partial_fit(rfm.iloc[:100])
+    raw = clusterer.centers_ * clusterer.scale_ + clusterer.mean_
+
+    # Customers sitting exactly on the centroids shift the scaler but not the centroids
+    clusterer.partial_fit(pd.DataFrame(np.repeat(raw, 20, axis=0), columns=RFM_FEATURES))
+    assert not np.allclose(clusterer.mean_, rfm.iloc[:100][RFM_FEATURES].mean())
+    np.testing.assert_allclose(clusterer.centers_ * clusterer.scale_ + clusterer.mean_, raw)
@@ -0,0 +1,51 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+# Add src folder to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import tracking  # noqa: E402
+
+
+def test_offline_logging_then_sync(tmp_path, monkeypatch):
+    import mlflow
+    import train
+
+    offline_uri = f"sqlite:///{tmp_path / 'offline.db'}"
+    monkeypatch.setattr(tracking, "OFFLINE_TRACKING_URI", offline_uri)
+    monkeypatch.setattr(train, "FEATURE_OUTPUT_PATH", str(tmp_path / "feature_names.txt"))
+    monkeypatch.chdir(tmp_path)
+
+    # Nothing listens on this port, so runs go to the local store
+    assert tracking.configure_tracking("http://127.0.0.1:9") == offline_uri
+    mlflow.set_experiment("offline-test")
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, 3)), columns=['a', 'b', 'c'])
+    y = (X['a'] > 0).astype(int)
+    model, run_id = train.train_and_log_model(
+        "LogisticRegression", LogisticRegression(), {'C': 1.0}, X, y, X, y
+    )
+    assert train.register_model(run_id, "logisticregression_model") == 1
+    assert not tracking.write_if_changed(train.FEATURE_OUTPUT_PATH, "a\nb\nc")
+
+    target_uri = f"sqlite:///{tmp_path / 'server.db'}"
+    synced = tracking.sync_runs("offline-test", source_uri=offline_uri, target_uri=target_uri)
+    assert len(synced) == 1
+    run = mlflow.MlflowClient(target_uri).get_run(synced[0])
+    assert run.data.params['C'] == '1.0'
+    assert run.data.metrics['roc_auc'] > 0.99
+
+    # The logged model and its registered production version are served from the target
+    client = mlflow.MlflowClient(target_uri)
+    version = client.get_model_version(train.MODEL_NAME, "1")
+    assert version.run_id == synced[0]
+    assert version.tags['stage'] == "production"
+    mlflow.set_tracking_uri(target_uri)
+    synced_model = mlflow.sklearn.load_model(f"models:/{train.MODEL_NAME}/1")
+    np.testing.assert_allclose(synced_model.predict_proba(X), model.predict_proba(X))
+    assert tracking.sync_runs("offline-test", source_uri=offline_uri,
+                              target_uri=target_uri) == []
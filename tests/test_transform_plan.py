@@ -0,0 +1,107 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest  # type: ignore
+
+# Add src folder to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from feature_eng_process import OutlierFlagger, build_feature_engineering_pipeline  # noqa: E402
+from transform_plan import TransformPlan  # noqa: E402
+
+
+def make_raw(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    amount = np.round(rng.lognormal(6, 1.2, size=n) * rng.choice([-1, 1], size=n, p=[.2, .8]))
+    return pd.DataFrame({
+        'TransactionId': [f"TransactionId_{i}" for i in range(n)],
+        'CustomerId': [f"CustomerId_{i}" for i in rng.integers(0, 40, size=n)],
+        'ProviderId': rng.choice([f"ProviderId_{i}" for i in range(1, 7)], size=n),
+        'ProductCategory': rng.choice(['airtime', 'financial_services', 'tv'], size=n),
+        'ChannelId': rng.choice(['ChannelId_2', 'ChannelId_3'], size=n),
+        'Amount': amount,
+        'Value': np.abs(amount),
+        'TransactionStartTime': pd.date_range('2018-11-15', periods=n, freq='97min')
+        .strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'PricingStrategy': rng.choice([0, 2, 4], size=n),
+        'FraudResult': (rng.random(n) < 0.1).astype(int),
+    })
+
+
+@pytest.mark.parametrize("encoding", ['onehot', 'codes', 'woe'])
+def test_plan_matches_pandas_pipeline(encoding, tmp_path):
+    train = make_raw()
+    pipeline = build_feature_engineering_pipeline(categorical_encoding=encoding).fit(train)
+    flagger = OutlierFlagger().fit(train)
+    plan = TransformPlan.from_pipeline(pipeline, outlier_flagger=flagger)
+    path = str(tmp_path / "plan.npz")
+    plan.save(path)
+    plan = TransformPlan.load(path)
+
+    new = make_raw(n=50, seed=1)
+    new.loc[0, 'CustomerId'] = 'CustomerId_unseen'
+    new.loc[1, 'ProviderId'] = None
+    new.loc[2, 'ProductCategory'] = 'movies'
+    new.loc[3, 'Amount'] = np.nan
+
+    expected = pipeline.transform(flagger.transform(new))[plan.feature_names]
+    records = new.astype(object).where(new.notna(), None).to_dict(orient='records')
+    actual = plan.transform_records(records)
+
+    np.testing.assert_array_equal(actual, expected.to_numpy(np.float64))
+    np.testing.assert_array_equal(plan.transform_one(records[5]), actual[5])
+
+
+def test_plan_reorders_and_overrides_aggregates():
+    train = make_raw()
+    pipeline = build_feature_engineering_pipeline().fit(train)
+    plan = TransformPlan.from_pipeline(pipeline, outlier_flagger=OutlierFlagger().fit(train))
+    record = train.iloc[0].to_dict()
+
+    names = plan.feature_names[::-1]
+    reordered = plan.transform_one(record)[plan.indexer(names)]
+    assert reordered[-1] == plan.transform_one(record)[0]
+    with pytest.raises(ValueError):
+        plan.indexer(['not_a_feature'])
+
+    override = {'total_transaction_amount': 1.0, 'avg_transaction_amount': 1.0,
+                'transaction_count': 1, 'std_transaction_amount': 0.0}
+    x = plan.transform_one(record, aggregates=override)
+    assert x[plan.indexer(['transaction_count'])][0] == 1
+
+
+def test_model_bundle_reproduces_training_features(tmp_path):
+    import mlflow.sklearn
+    from sklearn.linear_model import LogisticRegression
+    from model_loader import load_local_model
+    from train import preprocess
+    from transform_plan import ScoringBundle, save_feature_bundle
+
+    train = make_raw()
+    pipeline = build_feature_engineering_pipeline().fit(train)
+    flagger = OutlierFlagger().fit(train)
+    features = pipeline.transform(flagger.transform(train))
+    features['is_high_risk'] = (train['Amount'] > train['Amount'].median()).astype(int)
+    X, y, scaler = preprocess(features, return_scaler=True)
+    model = LogisticRegression(max_iter=500).fit(X, y)
+
+    # A fitted scaler is reused, not refit
+    X_again, _ = preprocess(features.iloc[:10], scaler=scaler)
+    np.testing.assert_allclose(X_again.to_numpy(), X.iloc[:10].to_numpy())
+
+    plan = TransformPlan.from_pipeline(pipeline, outlier_flagger=flagger)
+    extra_files = save_feature_bundle(str(tmp_path / "bundle"), scaler, X.columns, plan)
+    model_dir = str(tmp_path / "model")
+    mlflow.sklearn.save_model(model, model_dir, serialization_format="cloudpickle",
+                              extra_files=extra_files)
+
+    bundle = load_local_model(model_dir)
+    assert isinstance(bundle, ScoringBundle)
+    new = make_raw(n=20, seed=3)
+    records = new.to_dict(orient='records')
+    expected = pipeline.transform(flagger.transform(new))
+    expected['is_high_risk'] = 0
+    X_new, _ = preprocess(expected, scaler=scaler)
+    np.testing.assert_allclose(bundle.transform_records(records), X_new.to_numpy(), atol=1e-9)
+    np.testing.assert_allclose(bundle.score_records(records), model.predict_proba(X_new)[:, 1])